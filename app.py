@@ -1,5 +1,4 @@
 import json
-import unicodedata
 from pathlib import Path
 
 import pandas as pd
@@ -7,8 +6,14 @@ import plotly.express as px
 import plotly.graph_objects as go
 import streamlit as st
 
+from src.leitura_bases import carregar_base
+from src.normalizacao import aplicar_por_valores_unicos, normalize_upper
+from src.snapshots import versao_publicada
+
 BASE_PARQUET = Path("data/processado/base_estrutural_normalizado.parquet")
 GEOJSON_MUN = Path("src/geojs-25-mun.json")
+# o mapa só usa GRE e municipio; as demais colunas da base não são lidas
+COLUNAS_MAPA = ["gRE", "gre", "GRE", "municipio"]
 
 ALIASES_MUNICIPIOS_RAW = {
     "Joca Claudino": "Santarem",
@@ -20,37 +25,29 @@ ALIASES_MUNICIPIOS_RAW = {
 st.set_page_config(page_title="SIAVE 2025", layout="wide")
 
 
-def remove_accents(text: str) -> str:
-    nfkd = unicodedata.normalize("NFKD", str(text))
-    return "".join([c for c in nfkd if not unicodedata.combining(c)])
-
-
-def normalize_upper(txt: str) -> str:
-    """Remove acentos, coloca em maiusculas e tira espacos extras."""
-    return remove_accents(txt).upper().strip()
-
-
 ALIASES_MUNICIPIOS = {
     normalize_upper(src): normalize_upper(dst) for src, dst in ALIASES_MUNICIPIOS_RAW.items()
 }
 
 
 @st.cache_data
-def load_base() -> pd.DataFrame:
-    if not BASE_PARQUET.exists():
+def load_base(versao: str | None) -> pd.DataFrame:
+    # `versao` (do snapshot publicado) só entra na chave do cache de st.cache_data
+    try:
+        df = carregar_base(BASE_PARQUET, COLUNAS_MAPA)
+    except FileNotFoundError:
         st.error("Base processada nao encontrada. Execute o loader primeiro.")
         st.stop()
-    df = pd.read_parquet(BASE_PARQUET)
     gre_cols = [c for c in df.columns if c.lower() == "gre"]
     if gre_cols:
         df = df.rename(columns={gre_cols[0]: "gRE"})
     if "gRE" not in df.columns:
         df["gRE"] = pd.NA
-    df["gRE"] = df["gRE"].apply(normalize_upper)
+    df["gRE"] = aplicar_por_valores_unicos(df["gRE"], normalize_upper)
     if "municipio" not in df.columns:
         df["municipio"] = pd.NA
-    df["municipio"] = df["municipio"].apply(normalize_upper)
-    df["municipio_norm"] = df["municipio"].apply(lambda x: ALIASES_MUNICIPIOS.get(x, x))
+    df["municipio"] = aplicar_por_valores_unicos(df["municipio"], normalize_upper)
+    df["municipio_norm"] = aplicar_por_valores_unicos(df["municipio"], lambda x: ALIASES_MUNICIPIOS.get(x, x))
     return df
 
 
@@ -84,9 +81,9 @@ def preparar_mapa(df: pd.DataFrame, geojson_mun: dict) -> tuple[pd.DataFrame, pd
         .dropna(subset=["municipio", "gRE"])
         .copy()
     )
-    df_map["municipio"] = df_map["municipio"].apply(normalize_upper)
-    df_map["municipio_norm"] = df_map["municipio_norm"].apply(lambda x: ALIASES_MUNICIPIOS.get(x, x))
-    df_map["gRE"] = df_map["gRE"].apply(normalize_upper)
+    df_map["municipio"] = aplicar_por_valores_unicos(df_map["municipio"], normalize_upper)
+    df_map["municipio_norm"] = aplicar_por_valores_unicos(df_map["municipio_norm"], lambda x: ALIASES_MUNICIPIOS.get(x, x))
+    df_map["gRE"] = aplicar_por_valores_unicos(df_map["gRE"], normalize_upper)
     df_map = df_map.drop_duplicates(subset=["municipio_norm"])
 
     missing_geo = df_map[~df_map["municipio_norm"].isin(geo_names)][
@@ -167,7 +164,7 @@ st.write(
     """
 )
 
-df_base = load_base()
+df_base = load_base(versao_publicada(BASE_PARQUET.parent))
 geojson_mun = load_geojson(GEOJSON_MUN)
 
 df_map, missing_geo = preparar_mapa(df_base, geojson_mun)
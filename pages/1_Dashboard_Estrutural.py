@@ -1,4 +1,3 @@
-import unicodedata
 from pathlib import Path
 
 import pandas as pd
@@ -6,48 +5,68 @@ import plotly.express as px
 import streamlit as st
 
 BASE_PARQUET = Path("data/processado/base_estrutural_normalizado.parquet")
-from src.firebase_client import load_collection_df
+from src.cubo_estrutural import CuboEstrutural, montar_cubo, padronizar_gre
+from src.data_paths import ARQ_BASE_CUBO_ESTRUTURAL
+from src.espelho_firestore import versao_colecao
+from src.leitura_bases import carregar_leitura
+from src.snapshots import Manifesto, ler_manifesto
 
 st.title("Dashboard Estrutural - SIAVE 2025")
 
+# colunas exibidas pela página (telefones, observações etc. não são lidos)
+COLUNAS_PAGINA = [
+    "GRE",
+    "gRE",
+    "gre",
+    "municipio",
+    "escola",
+    "polo",
+    "coEscolaCenso",
+    "coTurmaCenso",
+    "turma",
+    "serie",
+    "turno",
+]
+
 
 @st.cache_data(show_spinner=False)
-def load_base_estrutural() -> pd.DataFrame:
-    # 1) Tenta Firestore
-    df_fs = load_collection_df("siave_estrutural")
-    if df_fs is not None and not df_fs.empty:
-        return df_fs
-
-    # 2) Fallback para parquet local
-    if not BASE_PARQUET.exists():
+def load_base_estrutural(
+    versao: str | None, versao_fs: int, _manifesto: Manifesto | None = None
+) -> tuple[pd.DataFrame, str]:
+    # `versao` (do snapshot de `_manifesto`) e `versao_fs` (da coleção no
+    # Firestore) só entram na chave do cache de st.cache_data
+    # Firestore primeiro, com fallback para o parquet local
+    try:
+        leitura = carregar_leitura(BASE_PARQUET, COLUNAS_PAGINA, colecao="siave_estrutural", manifesto=_manifesto)
+        return leitura.df, leitura.fonte
+    except FileNotFoundError:
         st.error("Base estrutural não encontrada. Execute o loader para gerar os dados.")
         st.stop()
-
-    try:
-        return pd.read_parquet(BASE_PARQUET)
     except Exception as exc:
         st.error(f"Falha ao ler o parquet processado: {exc}")
         st.stop()
 
 
-df = load_base_estrutural()
-
-def remove_accents(text):
-    if text is None:
-        return text
-    text = str(text)
-    nfkd = unicodedata.normalize("NFKD", text)
-    return "".join([c for c in nfkd if not unicodedata.combining(c)])
+@st.cache_data(show_spinner=False)
+def load_cubo(
+    versao: str | None, versao_fs: int, _df: pd.DataFrame, _manifesto: Manifesto | None = None
+) -> tuple[CuboEstrutural, str]:
+    # `versao` e `versao_fs` só entram na chave do cache de st.cache_data;
+    # `_df` (a base já carregada) fica fora dela e só é usada sem cubo publicado
+    try:
+        leitura = carregar_leitura(ARQ_BASE_CUBO_ESTRUTURAL, manifesto=_manifesto)
+        return CuboEstrutural(leitura.df), leitura.fonte
+    except FileNotFoundError:
+        return CuboEstrutural(montar_cubo(_df)), "calculado na página"
 
 
-# Normalizar coluna GRE padronizada
-if "GRE" not in df.columns:
-    gre_alt = [c for c in df.columns if c.lower() == "gre"]
-    if gre_alt:
-        df = df.rename(columns={gre_alt[0]: "GRE"})
-    else:
-        df["GRE"] = pd.NA
-df["GRE"] = df["GRE"].apply(remove_accents).str.upper().str.strip()
+# snapshot publicado, lido uma vez: a base e o cubo vêm da mesma versão
+MANIFESTO = ler_manifesto(BASE_PARQUET.parent)
+VERSAO = MANIFESTO.versao if MANIFESTO else None
+df, fonte_dados = load_base_estrutural(VERSAO, versao_colecao("siave_estrutural"), MANIFESTO)
+df = padronizar_gre(df)
+cubo, fonte_cubo = load_cubo(VERSAO, versao_colecao("siave_estrutural"), df, MANIFESTO)
+st.caption(f"Fonte dos dados: {fonte_dados}; cubo de contagens - {fonte_cubo}")
 
 # colunas obrigatórias para exibição
 required = ["municipio", "escola", "polo", "GRE"]
@@ -61,13 +80,14 @@ if missing:
     for col in missing:
         df[col] = pd.NA
 
-# KPIs
+# KPIs (contagens distintas pré-calculadas no cubo)
+total = cubo.total()
 col1, col2, col3, col4 = st.columns(4)
 
-col1.metric("GREs", df["GRE"].nunique())
-col2.metric("Polos", df["polo"].nunique())
-col3.metric("Municipios", df["municipio"].nunique())
-col4.metric("Escolas", df["coEscolaCenso"].nunique())
+col1.metric("GREs", int(total["gres"]))
+col2.metric("Polos", int(total["polos"]))
+col3.metric("Municipios", int(total["municipios"]))
+col4.metric("Escolas", int(total["escolas"]))
 
 st.divider()
 
@@ -75,9 +95,8 @@ st.divider()
 st.subheader("Turmas por GRE")
 
 g1 = (
-    df.groupby("GRE")["coTurmaCenso"]
-    .nunique()
-    .reset_index(name="total_turmas")
+    cubo.fatiar({}, ["GRE"])
+    .rename(columns={"turmas": "total_turmas"})
     .sort_values("total_turmas", ascending=True)
 )
 
@@ -97,25 +116,18 @@ st.subheader("Exploracao por GRE")
 
 gre_escolhida = st.selectbox(
     "Selecione a GRE:",
-    ["(Todas)"] + sorted(df["GRE"].dropna().astype(str).unique()),
+    ["(Todas)"] + sorted(g1["GRE"].astype(str).unique()),
 )
-
-# --- Correcao do filtro da GRE ---
-if gre_escolhida != "(Todas)":
-    df = df[df["GRE"].astype(str) == gre_escolhida]
+filtros = {"GRE": None if gre_escolhida == "(Todas)" else gre_escolhida}
 
 # --- Visao por Polo ---
 st.subheader("Visao por Polo")
 
-polo_opcoes = ["(Todos)"] + sorted(df["polo"].dropna().astype(str).unique())
+polo_opcoes = ["(Todos)"] + sorted(cubo.fatiar(filtros, ["polo"])["polo"].astype(str).unique())
 polo_escolhido = st.selectbox("Selecione o polo:", polo_opcoes)
-df_polo = df
-if polo_escolhido != "(Todos)":
-    df_polo = df[df["polo"].astype(str) == polo_escolhido]
+filtros["polo"] = None if polo_escolhido == "(Todos)" else polo_escolhido
 
-polos = (
-    df_polo.groupby("polo")["coTurmaCenso"].nunique().reset_index(name="total_turmas")
-)
+polos = cubo.fatiar(filtros, ["polo"]).rename(columns={"turmas": "total_turmas"})
 fig_polo = px.bar(
     polos,
     text_auto=True,
@@ -129,20 +141,12 @@ st.plotly_chart(fig_polo, use_container_width=True)
 st.subheader("Visao por Municipio")
 
 municipio_opcoes = ["(Todos)"] + sorted(
-    df_polo["municipio"].dropna().astype(str).unique()
+    cubo.fatiar(filtros, ["municipio"])["municipio"].astype(str).unique()
 )
 municipio_escolhido = st.selectbox("Selecione o municipio:", municipio_opcoes)
-df_municipio = df_polo
-if municipio_escolhido != "(Todos)":
-    df_municipio = df_municipio[
-        df_municipio["municipio"].astype(str) == municipio_escolhido
-    ]
-
-municipios = (
-    df_municipio.groupby("municipio")["coTurmaCenso"]
-    .nunique()
-    .reset_index(name="total_turmas")
-)
+filtros["municipio"] = None if municipio_escolhido == "(Todos)" else municipio_escolhido
+
+municipios = cubo.fatiar(filtros, ["municipio"]).rename(columns={"turmas": "total_turmas"})
 fig_municipio = px.bar(
     municipios,
     text_auto=True,
@@ -155,19 +159,13 @@ st.plotly_chart(fig_municipio, use_container_width=True)
 # --- Visao por Escola ---
 st.subheader("Visao por Escola")
 
-escola_opcoes = ["(Todas)"] + sorted(df_municipio["escola"].dropna().astype(str).unique())
+escola_opcoes = ["(Todas)"] + sorted(cubo.fatiar(filtros, ["escola"])["escola"].astype(str).unique())
 escola_escolhida = st.selectbox("Selecione a escola:", escola_opcoes)
-df_escola = df_municipio
-if escola_escolhida != "(Todos)":
-    df_escola = df_escola[df_escola["escola"].astype(str) == escola_escolhida]
-
-escolas = (
-    df_escola.groupby(["coEscolaCenso", "escola"])["coTurmaCenso"]
-    .nunique()
-    .reset_index(name="total_turmas")
-)
+filtros["escola"] = None if escola_escolhida == "(Todas)" else escola_escolhida
+
+escolas = cubo.top_escolas(filtros).rename(columns={"turmas": "total_turmas"})
 fig_escolas = px.bar(
-    escolas.sort_values("total_turmas", ascending=False).head(50),
+    escolas,
     x="escola",
     y="total_turmas",
     text_auto=True,
@@ -177,11 +175,7 @@ st.plotly_chart(fig_escolas, use_container_width=True)
 
 # --- Visao por Turma ---
 st.subheader("Visao por Turma")
-turmas = (
-    df_escola.groupby(["serie", "turno"])["coTurmaCenso"]
-    .nunique()
-    .reset_index(name="total_turmas")
-)
+turmas = cubo.fatiar(filtros, ["serie", "turno"]).rename(columns={"turmas": "total_turmas"})
 fig_turmas = px.bar(
     turmas,
     text_auto=True,
@@ -193,4 +187,9 @@ fig_turmas = px.bar(
 )
 st.plotly_chart(fig_turmas, use_container_width=True)
 
+# linhas da base no recorte selecionado
+df_escola = df
+for coluna, valor in filtros.items():
+    if valor is not None:
+        df_escola = df_escola[df_escola[coluna].astype(str) == valor]
 st.dataframe(df_escola)
@@ -1,16 +1,19 @@
 import ast
 import json
-import unicodedata
 from pathlib import Path
 
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import streamlit as st
-from src.firebase_client import load_collection_df
+from src.espelho_firestore import versao_colecao
+from src.leitura_bases import carregar_leitura
+from src.normalizacao import aplicar_por_valores_unicos, normalizar_colunas, normalize_upper
+from src.snapshots import versao_publicada
 
 BASE_PARQUET = Path("data/processado/base_estrutural_normalizado.parquet")
 GEOJSON_MUN = Path("src/geojs-25-mun.json")
+COLUNAS_MAPA = ["gRE", "gre", "GRE", "municipio"]
 
 ALIASES_MUNICIPIOS_RAW = {
     "Joca Claudino": "Santarem",
@@ -24,46 +27,35 @@ LOGISTICA_DIR = Path("data/logistica")
 st.set_page_config(page_title="Logistica SIAVE 2025", layout="wide")
 
 
-def remove_accents(text: str) -> str:
-    nfkd = unicodedata.normalize("NFKD", str(text))
-    return "".join([c for c in nfkd if not unicodedata.combining(c)])
-
-
-def normalize_upper(txt: str) -> str:
-    return remove_accents(txt).upper().strip()
-
-
 ALIASES_MUNICIPIOS = {
     normalize_upper(src): normalize_upper(dst) for src, dst in ALIASES_MUNICIPIOS_RAW.items()
 }
 
 
 @st.cache_data(show_spinner=False)
-def load_base_estrutural() -> pd.DataFrame:
-    df_fs = load_collection_df("siave_estrutural")
-    if df_fs is not None and not df_fs.empty:
-        return df_fs
-
-    if not BASE_PARQUET.exists():
+def load_base_estrutural(versao: str | None, versao_fs: int) -> tuple[pd.DataFrame, str]:
+    # `versao` (do snapshot publicado) e `versao_fs` (da coleção no Firestore)
+    # só entram na chave do cache de st.cache_data
+    try:
+        leitura = carregar_leitura(BASE_PARQUET, COLUNAS_MAPA, colecao="siave_estrutural")
+    except FileNotFoundError:
         st.error("Base estrutural não encontrada. Execute o loader para gerar os dados.")
         st.stop()
-
-    try:
-        df = pd.read_parquet(BASE_PARQUET)
     except Exception as exc:
         st.error(f"Falha ao ler o parquet processado: {exc}")
         st.stop()
+    df = leitura.df
     gre_cols = [c for c in df.columns if c.lower() == "gre"]
     if gre_cols:
         df = df.rename(columns={gre_cols[0]: "gRE"})
     if "gRE" not in df.columns:
         df["gRE"] = pd.NA
-    df["gRE"] = df["gRE"].apply(normalize_upper)
+    df["gRE"] = aplicar_por_valores_unicos(df["gRE"], normalize_upper)
     if "municipio" not in df.columns:
         df["municipio"] = pd.NA
-    df["municipio"] = df["municipio"].apply(normalize_upper)
-    df["municipio_norm"] = df["municipio"].apply(lambda x: ALIASES_MUNICIPIOS.get(x, x))
-    return df
+    df["municipio"] = aplicar_por_valores_unicos(df["municipio"], normalize_upper)
+    df["municipio_norm"] = aplicar_por_valores_unicos(df["municipio"], lambda x: ALIASES_MUNICIPIOS.get(x, x))
+    return df, leitura.fonte
 
 
 @st.cache_data
@@ -106,10 +98,7 @@ def load_logistica(dir_path: Path = LOGISTICA_DIR) -> pd.DataFrame:
     frames = []
     for f in files:
         df = pd.read_excel(f)
-        df.columns = [
-            unicodedata.normalize("NFKD", c).encode("ascii", "ignore").decode().strip()
-            for c in df.columns
-        ]
+        df.columns = normalizar_colunas(df.columns, "ascii")
         df["GRE_file"] = "".join(ch for ch in f.stem if ch.isdigit()) or f.stem
         frames.append(df)
 
@@ -131,9 +120,9 @@ def preparar_mapa(df: pd.DataFrame, geojson_mun: dict) -> tuple[pd.DataFrame, pd
         .dropna(subset=["municipio", "gRE"])
         .copy()
     )
-    df_map["municipio"] = df_map["municipio"].apply(normalize_upper)
-    df_map["municipio_norm"] = df_map["municipio"].apply(lambda x: ALIASES_MUNICIPIOS.get(x, x))
-    df_map["gRE"] = df_map["gRE"].apply(normalize_upper)
+    df_map["municipio"] = aplicar_por_valores_unicos(df_map["municipio"], normalize_upper)
+    df_map["municipio_norm"] = aplicar_por_valores_unicos(df_map["municipio"], lambda x: ALIASES_MUNICIPIOS.get(x, x))
+    df_map["gRE"] = aplicar_por_valores_unicos(df_map["gRE"], normalize_upper)
     df_map = df_map.drop_duplicates(subset=["municipio_norm"])
 
     missing_geo = df_map[~df_map["municipio_norm"].isin(geo_names)][
@@ -157,8 +146,8 @@ def preparar_logistica(df_map: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame
     if "COD" not in df_log.columns:
         df_log["COD"] = df_log["Pacote"] if "Pacote" in df_log.columns else None
 
-    df_log["municipio"] = df_log["Municipio"].apply(normalize_upper)
-    df_log["municipio_norm"] = df_log["municipio"].apply(lambda x: ALIASES_MUNICIPIOS.get(x, x))
+    df_log["municipio"] = aplicar_por_valores_unicos(df_log["Municipio"], normalize_upper)
+    df_log["municipio_norm"] = aplicar_por_valores_unicos(df_log["municipio"], lambda x: ALIASES_MUNICIPIOS.get(x, x))
 
     df_log = df_log.merge(
         df_map[["municipio_norm", "gRE", "municipio"]],
@@ -242,7 +231,8 @@ st.write(
     """
 )
 
-df_base = load_base_estrutural()
+df_base, fonte_dados = load_base_estrutural(versao_publicada(BASE_PARQUET.parent), versao_colecao("siave_estrutural"))
+st.caption(f"Fonte dos dados: {fonte_dados}")
 geojson_mun = load_geojson(GEOJSON_MUN)
 info_raw, info_norm = load_info_por_cidade()
 
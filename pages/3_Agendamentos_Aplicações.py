@@ -1,12 +1,15 @@
 from datetime import date, datetime
-from pathlib import Path
 
 import pandas as pd
 import streamlit as st
 
+from src.aplicacoes_presenca import AVISO_SEM_CORRESPONDENCIA, diagnostico_tabela
 from src.data_paths import ARQ_BASE_AGENDAMENTOS
+from src.normalizacao import aplicar_por_valores_unicos
+from src.snapshots import Manifesto, ler_manifesto, resolver_arquivo
 from src.utils import format_timestamp_brazil
-from src.firebase_client import load_collection_df
+from src.espelho_firestore import versao_colecao
+from src.leitura_bases import carregar_aplicacoes
 
 MONTH_ABBR_PT = [
     "jan",
@@ -31,44 +34,6 @@ TEAM_GRE_GROUPS = {
 }
 
 
-def prep(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Normaliza colunas para o padrão do Loader, aceitando tanto esquemas novos
-    (parquet) quanto planilhas antigas.
-    """
-    df = df.copy()
-    df.columns = df.columns.str.strip().str.lower()
-
-    rename_map = {
-        # chaves básicas
-        "coescolacenso": "coEscolaCenso",
-        "municipio": "municipio",
-        "gre": "gRE",
-        "polo": "polo",
-
-        # previstos / presentes podem vir com nomes antigos ou novos
-        "previstos": "previstos",
-        "qtdalunosprevistos": "previstos",
-        "presentes": "presentes",
-        "qtdalunospresentes": "presentes",
-
-        # percentual
-        "percentual": "percentual",
-
-        # datas
-        "dataagendamento": "dataAgendamento",
-        "dataagendmento": "dataAgendamento",
-        "dataaplicacaoreal": "dataAplicacaoReal",
-        "datareal": "dataAplicacaoReal",
-
-        # eventual suporte
-        "qtdiasaplicacao": "qtdDiasAplicacao",
-    }
-
-    df.rename(columns=rename_map, inplace=True)
-    return df
-
-
 def format_short_date_pt(day_value: date) -> str:
     return f"{day_value.day:02d}/{MONTH_ABBR_PT[day_value.month - 1]}"
 
@@ -142,25 +107,17 @@ def build_calendar_table(
 
 
 @st.cache_data
-def load_base_agendamentos(path: Path = ARQ_BASE_AGENDAMENTOS) -> pd.DataFrame:
-    # 1) Tenta Firestore
-    df_fs = load_collection_df("siave_agendamentos")
-    if df_fs is not None and not df_fs.empty:
-        df_fs.columns = df_fs.columns.str.strip()
-        return df_fs
-
-    # 2) Fallback para parquet
-    if not path.exists():
-        st.error("Base de agendamentos não encontrada. Execute o loader antes.")
-        st.stop()
-
-    try:
-        df = pd.read_parquet(path)
-        df.columns = df.columns.str.strip()
-        return df
-    except Exception as exc:
-        st.error(f"Falha ao ler base de agendamentos: {exc}")
-        st.stop()
+def load_aplicacoes(
+    versao: str | None, versoes_fs: tuple[int, int] = (0, 0), _manifesto: Manifesto | None = None
+) -> tuple[pd.DataFrame | None, str | None]:
+    # `versao` (do snapshot de `_manifesto`) e `versoes_fs` (das coleções no
+    # Firestore) só entram na chave do cache de st.cache_data; `_manifesto`
+    # fica fora dela e fixa o snapshot lido
+    # tabela de aplicações montada pelo loader (ver src.leitura_bases)
+    leitura = carregar_aplicacoes(_manifesto)
+    if leitura is None:
+        return None, None
+    return leitura.df, leitura.fonte
 
 
 def get_calendar_dates(df: pd.DataFrame) -> list[date]:
@@ -175,42 +132,12 @@ def format_percent(value: float | None) -> str:
     return f"{value:.1f}%"
 
 
-def merge_presence(base: pd.DataFrame, presence: pd.DataFrame) -> pd.DataFrame:
-    """
-    Junta agendamentos (base) com presença (presence) usando o padrão do Loader.
-    Chaves do merge: coEscolaCenso + municipio + gRE + polo.
-    """
-    if base is None or base.empty:
-        return base
-
-    if presence is None or presence.empty:
-        df = base.copy()
-        for col in ["previstos", "presentes", "percentual", "dataAplicacaoReal"]:
-            if col not in df.columns:
-                df[col] = pd.NA
-        return df
-
-    df = base.merge(
-        presence,
-        on=["coEscolaCenso", "municipio", "gRE", "polo"],
-        how="left",
-        suffixes=("", "_pres"),
-    )
-
-    for col in ["previstos", "presentes", "percentual", "dataAplicacaoReal"]:
-        pres_col = f"{col}_pres"
-        if pres_col in df.columns:
-            df[col] = df[pres_col].where(df[pres_col].notna(), df.get(col))
-            df.drop(columns=[pres_col], inplace=True)
-        elif col not in df.columns:
-            df[col] = pd.NA
-
-    return df
-
-
 st.title("Aplicacoes - SIAVE 2025")
 
-arquivo_agend = ARQ_BASE_AGENDAMENTOS
+# snapshot publicado, lido uma vez por execução: o caminho exibido, a chave
+# do cache e a leitura vêm todos dele
+MANIFESTO = ler_manifesto(ARQ_BASE_AGENDAMENTOS.parent)
+arquivo_agend = resolver_arquivo(ARQ_BASE_AGENDAMENTOS, MANIFESTO)
 nome_arq = arquivo_agend.name if arquivo_agend.exists() else "Nenhum arquivo encontrado"
 dt_br = (
     format_timestamp_brazil(datetime.fromtimestamp(arquivo_agend.stat().st_mtime))
@@ -238,19 +165,22 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
-base_df = prep(load_base_agendamentos())
-presence_path = Path("data/processado/base_percentual_presenca.parquet")
-presence_df = prep(pd.read_parquet(presence_path)) if presence_path.exists() else pd.DataFrame()
-
-df = merge_presence(base_df, presence_df)
-
-if "dataAgendamento" in df.columns:
-    df["dataAgendamento"] = pd.to_datetime(df["dataAgendamento"], errors="coerce")
-if "dataAplicacaoReal" in df.columns:
-    df["dataAplicacaoReal"] = pd.to_datetime(df["dataAplicacaoReal"], errors="coerce")
-for num_col in ["previstos", "presentes"]:
-    if num_col in df.columns:
-        df[num_col] = pd.to_numeric(df[num_col], errors="coerce").fillna(0)
+try:
+    df, fonte_dados = load_aplicacoes(
+        MANIFESTO.versao if MANIFESTO else None,
+        (versao_colecao("siave_agendamentos"), versao_colecao("siave_presenca")),
+        MANIFESTO,
+    )
+except Exception as exc:
+    st.error(f"Falha ao ler as bases de agendamentos e presença: {exc}")
+    st.stop()
+if df is None:
+    st.error("Base de agendamentos não encontrada. Execute o loader antes.")
+    st.stop()
+st.caption(f"Fonte dos dados: {fonte_dados}")
+diagnostico = diagnostico_tabela(df)
+if diagnostico is not None and diagnostico.sem_correspondencia:
+    st.warning(AVISO_SEM_CORRESPONDENCIA)
 
 st.subheader("Visao Agenda - Resumo")
 current_day = date.today()
@@ -328,11 +258,9 @@ else:
             st.info("Base sem coluna de GRE para aplicar o filtro por equipe.")
         else:
             allowed_digits = TEAM_GRE_GROUPS[team_selected]
-            mask = (
-                df["gRE"]
-                .apply(lambda value: extract_gre_digits(value) in allowed_digits)
-                .fillna(False)
-            )
+            mask = aplicar_por_valores_unicos(
+                df["gRE"], lambda value: extract_gre_digits(value) in allowed_digits
+            ).fillna(False)
             polo_source_df = df[mask]
     if "polo" not in polo_source_df.columns:
         st.info("Base sem coluna de polo para montar o calendario.")
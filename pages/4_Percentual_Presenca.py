@@ -1,89 +1,53 @@
-from pathlib import Path
 from datetime import datetime
 
 import pandas as pd
 import plotly.express as px
 import streamlit as st
 
-from src.data_paths import ARQ_BASE_AGENDAMENTOS
+from src.aplicacoes_presenca import AVISO_SEM_CORRESPONDENCIA, diagnostico_tabela
+from src.data_paths import ARQ_BASE_AGENDAMENTOS, ARQ_BASE_PRESENCA
+from src.snapshots import Manifesto, ler_manifesto, resolver_arquivo
 from src.utils import format_timestamp_brazil
-from src.firebase_client import load_collection_df
-
-DATA_PROCESSADO = Path("data/processado")
-PRESENCE_PARQUET = DATA_PROCESSADO / "base_percentual_presenca.parquet"
-
-
-def prep(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Normaliza colunas de agendamentos e presença para o padrão do Loader.
-    """
-    df = df.copy()
-    df.columns = df.columns.str.strip().str.lower()
-
-    rename_map = {
-        "coescolacenso": "coEscolaCenso",
-        "municipio": "municipio",
-        "gre": "gRE",
-        "polo": "polo",
-
-        "previstos": "previstos",
-        "qtdalunosprevistos": "previstos",
-        "presentes": "presentes",
-        "qtdalunospresentes": "presentes",
-
-        "percentual": "percentual",
-
-        "dataagendamento": "dataAgendamento",
-        "dataagendmento": "dataAgendamento",
-        "dataaplicacaoreal": "dataAplicacaoReal",
-        "datareal": "dataAplicacaoReal",
-        "qtdiasaplicacao": "qtdDiasAplicacao",
-    }
-
-    df.rename(columns=rename_map, inplace=True)
-    return df
-
-
-def load_df(path: Path) -> pd.DataFrame | None:
-    if not path.exists():
-        return None
-    try:
-        return pd.read_parquet(path)
-    except Exception:
-        return None
-
-
-# Tenta ler do Firestore primeiro
-base_df_raw = load_collection_df("siave_agendamentos")
-presence_df_raw = load_collection_df("siave_presenca")
-
-# Se Firestore vier vazio, usa fallback em parquet
-if base_df_raw is None or base_df_raw.empty:
-    if ARQ_BASE_AGENDAMENTOS.exists():
-        try:
-            base_df_raw = pd.read_parquet(ARQ_BASE_AGENDAMENTOS)
-        except Exception as exc:
-            st.error(f"Falha ao ler base_agendamentos.parquet: {exc}")
-            st.stop()
-    else:
-        base_df_raw = None
-
-if presence_df_raw is None or presence_df_raw.empty:
-    if PRESENCE_PARQUET.exists():
-        try:
-            presence_df_raw = pd.read_parquet(PRESENCE_PARQUET)
-        except Exception as exc:
-            st.error(f"Falha ao ler base_percentual_presenca.parquet: {exc}")
-            st.stop()
-    else:
-        presence_df_raw = None
+from src.espelho_firestore import versao_colecao
+from src.leitura_bases import carregar_aplicacoes
+
+# snapshot publicado, lido uma vez por execução: caminhos, chave do cache e
+# leitura vêm todos dele (ver src.snapshots)
+MANIFESTO = ler_manifesto(ARQ_BASE_AGENDAMENTOS.parent)
+AGENDAMENTOS_PARQUET = resolver_arquivo(ARQ_BASE_AGENDAMENTOS, MANIFESTO)
+PRESENCE_PARQUET = resolver_arquivo(ARQ_BASE_PRESENCA, MANIFESTO)
+
+
+@st.cache_data
+def load_aplicacoes(
+    versao: str | None, versoes_fs: tuple[int, int] = (0, 0), _manifesto: Manifesto | None = None
+) -> tuple[pd.DataFrame | None, str | None]:
+    # `versao` (do snapshot de `_manifesto`) e `versoes_fs` (das coleções no
+    # Firestore) só entram na chave do cache de st.cache_data; `_manifesto`
+    # fica fora dela e fixa o snapshot lido
+    # tabela de aplicações montada pelo loader (ver src.leitura_bases)
+    leitura = carregar_aplicacoes(_manifesto)
+    if leitura is None:
+        return None, None
+    return leitura.df, leitura.fonte
+
+
+try:
+    df, fonte_dados = load_aplicacoes(
+        MANIFESTO.versao if MANIFESTO else None,
+        (versao_colecao("siave_agendamentos"), versao_colecao("siave_presenca")),
+        MANIFESTO,
+    )
+except Exception as exc:
+    st.error(f"Falha ao ler as bases de agendamentos e presença: {exc}")
+    st.stop()
 
 st.title("Registro de Aplicacoes - Presenca")
 
-nome_ag = ARQ_BASE_AGENDAMENTOS.name if ARQ_BASE_AGENDAMENTOS.exists() else "Nao encontrado"
+nome_ag = AGENDAMENTOS_PARQUET.name if AGENDAMENTOS_PARQUET.exists() else "Nao encontrado"
 dt_ag = (
-    format_timestamp_brazil(datetime.fromtimestamp(ARQ_BASE_AGENDAMENTOS.stat().st_mtime))
-    if ARQ_BASE_AGENDAMENTOS.exists()
+    format_timestamp_brazil(datetime.fromtimestamp(AGENDAMENTOS_PARQUET.stat().st_mtime))
+    if AGENDAMENTOS_PARQUET.exists()
     else "Data nao identificada"
 )
 nome_pres = PRESENCE_PARQUET.name if PRESENCE_PARQUET.exists() else "Nao encontrado"
@@ -111,60 +75,18 @@ Parquet presenca: {nome_pres} (atualizado em {dt_pres})
 """,
     unsafe_allow_html=True,
 )
+st.caption(f"Fonte dos dados: {fonte_dados or 'não encontrada'}")
 
-if base_df_raw is None:
+if df is None:
     st.warning("Parquet base_agendamentos.parquet nao encontrado. Execute o loader para gerar os dados.")
     st.stop()
 
-base_df = prep(base_df_raw)
-presence_df = prep(presence_df_raw) if presence_df_raw is not None else pd.DataFrame()
-
-def merge_presence(base: pd.DataFrame, presence: pd.DataFrame) -> pd.DataFrame:
-    """
-    Junta agendamentos (base) com presença (presence) usando o padrão do Loader.
-    Chaves do merge: coEscolaCenso + municipio + gRE + polo.
-    """
-    if base is None or base.empty:
-        return base
-
-    if presence is None or presence.empty:
-        df = base.copy()
-        for col in ["previstos", "presentes", "percentual", "dataAplicacaoReal"]:
-            if col not in df.columns:
-                df[col] = pd.NA
-        return df
-
-    df = base.merge(
-        presence,
-        on=["coEscolaCenso", "municipio", "gRE", "polo"],
-        how="left",
-        suffixes=("", "_pres"),
-    )
-
-    for col in ["previstos", "presentes", "percentual", "dataAplicacaoReal"]:
-        pres_col = f"{col}_pres"
-        if pres_col in df.columns:
-            df[col] = df[pres_col].where(df[pres_col].notna(), df.get(col))
-            df.drop(columns=[pres_col], inplace=True)
-        elif col not in df.columns:
-            df[col] = pd.NA
-
-    return df
-
-
-df = merge_presence(base_df, presence_df)
-
-if "dataAplicacaoReal" in df.columns:
-    df["dataAplicacaoReal"] = pd.to_datetime(df["dataAplicacaoReal"], errors="coerce")
-if "dataAgendamento" in df.columns:
-    df["dataAgendamento"] = pd.to_datetime(df["dataAgendamento"], errors="coerce")
-for num_col in ["previstos", "presentes"]:
-    if num_col in df.columns:
-        df[num_col] = pd.to_numeric(df[num_col], errors="coerce").fillna(0)
-
 if df.empty:
     st.info("Nenhum registro encontrado nas bases padronizadas.")
     st.stop()
+diagnostico = diagnostico_tabela(df)
+if diagnostico is not None and diagnostico.sem_correspondencia:
+    st.warning(AVISO_SEM_CORRESPONDENCIA)
 
 total_previstos = int(df["previstos"].sum()) if "previstos" in df.columns else 0
 total_presentes = int(df["presentes"].sum()) if "presentes" in df.columns else 0
@@ -179,7 +101,7 @@ st.divider()
 st.subheader("Presenca por GRE")
 if "gRE" in df.columns:
     percent_gre = (
-        df.groupby("gRE", as_index=False)
+        df.groupby("gRE", as_index=False, observed=True)
         .agg(previstos=("previstos", "sum"), presentes=("presentes", "sum"))
     )
     percent_gre["percentual"] = (percent_gre["presentes"] / percent_gre["previstos"].replace(0, 1)) * 100
@@ -198,7 +120,7 @@ else:
 st.subheader("Presenca por Polo")
 if "polo" in df.columns:
     percent_polo = (
-        df.groupby("polo", as_index=False)
+        df.groupby("polo", as_index=False, observed=True)
         .agg(previstos=("previstos", "sum"), presentes=("presentes", "sum"))
     )
     percent_polo["percentual"] = (percent_polo["presentes"] / percent_polo["previstos"].replace(0, 1)) * 100
@@ -1,4 +1,3 @@
-import unicodedata
 from datetime import date, datetime
 from pathlib import Path
 
@@ -6,12 +5,16 @@ import pandas as pd
 import plotly.express as px
 import streamlit as st
 
-from src.data_paths import ARQ_TURMAS_GRE
-from src.firebase_client import load_collection_df
+from src.data_paths import ARQ_BASE_PENDENTES, ARQ_TURMAS_GRE
+from src.espelho_firestore import versao_colecao
+from src.leitura_bases import carregar_leitura
+from src.normalizacao import ascii_fold, normalizar_coluna
+from src.snapshots import resolver_arquivo
+from src.uploads import salvar_upload
 
 SENHA_CORRETA = "A9C3B"
 PENDENTES_PATTERN = "Registros_Pendentes-*.xlsx"
-PARQUET_REGISTROS = Path("data/processado/base_registros_pendentes.parquet")
+PARQUET_REGISTROS = resolver_arquivo(ARQ_BASE_PENDENTES)
 
 COLUMN_HINTS = {
     "gre": {"gre", "regional", "gerenciaregional", "gerencia", "gremetro"},
@@ -131,21 +134,13 @@ COLUMN_LABELS = {
 
 
 def normalize_col(name: str) -> str:
-    text = unicodedata.normalize("NFKD", str(name)).encode("ascii", "ignore").decode()
-    return (
-        text.strip()
-        .lower()
-        .replace(" ", "")
-        .replace("_", "")
-        .replace("-", "")
-    )
+    return normalizar_coluna(name, "compacto")
 
 
 def normalize_value(value) -> str | None:
     if value is None or (isinstance(value, float) and pd.isna(value)):
         return None
-    text = unicodedata.normalize("NFKD", str(value)).encode("ascii", "ignore").decode()
-    clean = text.strip().lower()
+    clean = ascii_fold(value).strip().lower()
     return clean or None
 
 
@@ -172,35 +167,31 @@ def localizar_arquivo_padrao() -> Path | None:
 
 
 @st.cache_data(show_spinner=False)
-def carregar_planilha(path: str | None) -> pd.DataFrame | None:
-    # 1) Tenta Firestore
-    df_fs = load_collection_df("siave_pendencias")
-    if df_fs is not None and not df_fs.empty:
-        return df_fs
-
-    # 2) Fallback para parquet
-    if path is None:
-        return None
-
+def carregar_planilha(path: str | None, versao_fs: int = 0) -> tuple[pd.DataFrame | None, str | None]:
+    # `versao_fs` (da coleção no Firestore) só entra na chave do cache de st.cache_data
+    # Firestore primeiro, com fallback para o parquet (ver src.leitura_bases);
+    # sem parquet (path None) ainda pode vir do Firestore ou do espelho local
     try:
-        return pd.read_parquet(path)
+        leitura = carregar_leitura(Path(path) if path else ARQ_BASE_PENDENTES, colecao="siave_pendencias")
+    except FileNotFoundError:
+        return None, None
     except Exception as exc:
         st.error(f"Falha ao ler base_registros_pendentes.parquet: {exc}")
-        return None
+        return None, None
+    return leitura.df, leitura.fonte
 
 
 def carregar_df_pendentes(uploaded_file) -> tuple[pd.DataFrame | None, str | None]:
     arquivo_padrao = localizar_arquivo_padrao()
     if arquivo_padrao is None:
         # mesmo assim tenta Firestore via carregar_planilha(None)
-        df = carregar_planilha(None)
+        df, fonte = carregar_planilha(None, versao_colecao("siave_pendencias"))
         if df is not None and not df.empty:
-            return df, None
+            return df, fonte
         st.warning("Nenhum arquivo base_registros_pendentes.parquet foi encontrado em data/processado.")
         return None, None
     try:
-        df = carregar_planilha(str(arquivo_padrao))
-        return df, arquivo_padrao.name
+        return carregar_planilha(str(arquivo_padrao), versao_colecao("siave_pendencias"))
     except Exception as exc:
         st.error(f"Não foi possível ler {arquivo_padrao.name}: {exc}")
         return None, arquivo_padrao.name
@@ -285,7 +276,7 @@ def agrupar_contagens(
     if not coluna or coluna not in df.columns:
         st.info(f"A planilha não possui coluna identificada como {titulo.lower()} para gerar o gráfico.")
         return
-    serie = df[coluna].fillna("Sem informação").astype(str)
+    serie = df[coluna].astype(object).fillna("Sem informação").astype(str)
     if serie.empty:
         st.info(f"Sem dados suficientes para montar o gráfico de {titulo.lower()}.")
         return
@@ -337,20 +328,22 @@ st.title("Registros Pendentes - SIAVE 2025")
 
 uploaded_file = st.file_uploader("Envie o arquivo de Registros Pendentes (.xlsx)", type=["xlsx"])
 
-from pathlib import Path
 import os
 
-PASTA = Path("data/origem/Registros_Pendentes")
-PASTA.mkdir(parents=True, exist_ok=True)
-
-if uploaded_file:
-    nome_arquivo = PASTA / uploaded_file.name
-
-    with open(nome_arquivo, "wb") as f:
-        f.write(uploaded_file.getbuffer())
-
-    st.success(f"Arquivo salvo em: {nome_arquivo}")
-    st.info(f"Atualizado em: {datetime.now().strftime('%d/%m/%Y %H:%M')}")
+# salvo com o nome que o loader procura (Registros_Pendentes-<data>Z.xlsx) e
+# convertido para Parquet em segundo plano; entra na base no próximo loader
+if uploaded_file and st.session_state.get("upload_pendentes_salvo") != uploaded_file.file_id:
+    try:
+        nome_arquivo = salvar_upload(uploaded_file, "pendentes")
+    except ValueError as exc:
+        st.error(f"Arquivo rejeitado: {exc}")
+    else:
+        st.session_state["upload_pendentes_salvo"] = uploaded_file.file_id
+        st.success(f"Arquivo salvo em: {nome_arquivo}")
+        st.info(
+            f"Atualizado em: {datetime.now().strftime('%d/%m/%Y %H:%M')}. "
+            "Os dados aparecem aqui após a próxima execução do loader."
+        )
 
 arquivo_recente = PARQUET_REGISTROS if PARQUET_REGISTROS.exists() else None
 nome_arq = arquivo_recente.name if arquivo_recente else "Nenhum arquivo encontrado"
@@ -8,7 +8,6 @@ Gera os arquivos:
 from __future__ import annotations
 
 from pathlib import Path
-import unicodedata
 
 import pandas as pd
 
@@ -18,18 +17,10 @@ from src.data_paths import (
     ARQ_BASE_APLICACOES,
     ARQ_BASE_FINAL_NORMALIZADO,
 )
+from src.normalizacao import normalizar_colunas
 from src.utils import log
 
 
-def normalize_col(name: str) -> str:
-    """Normaliza nomes de colunas para camelCase sem acentos."""
-    nfkd = unicodedata.normalize("NFKD", name)
-    no_accents = "".join([c for c in nfkd if not unicodedata.combining(c)])
-    clean = no_accents.replace(" ", "").replace("_", "").replace("-", "")
-    clean = clean[0].lower() + clean[1:]
-    return clean
-
-
 def _coerce_time(series: pd.Series) -> pd.Series:
     """Converte textos de hora para objetos time."""
     parsed = pd.to_datetime(
@@ -45,7 +36,7 @@ def _load_raw_agendamentos(source_path: Path = ARQ_AGENDAMENTOS) -> pd.DataFrame
         raise FileNotFoundError(f"Arquivo de agendamentos nao encontrado: {source_path}")
     log(f"Lendo planilha de agendamentos: {source_path.name}")
     df = pd.read_excel(source_path)
-    df.columns = [normalize_col(c) for c in df.columns]
+    df.columns = normalizar_colunas(df.columns, "camel")
 
     log("Convertendo campos de data e hora...")
     if "dataAgendmento" in df.columns:
@@ -0,0 +1,209 @@
+"""
+Tabela de aplicações: agendamentos com a presença de cada turma.
+
+O loader (src.pipeline) grava a tabela pronta em base_aplicacoes_presenca,
+já com as colunas padronizadas (prep), a junção com a presença
+(juntar_presenca) e as datas e quantidades convertidas (tipar); as páginas de
+agendamentos e de presença leem essa base em vez de refazer a junção a cada
+interação. Sem a base publicada, as páginas montam a tabela com as mesmas
+funções a partir das duas bases.
+
+A junção é feita por turma e dia de aplicação (CHAVES_JUNCAO), em um índice
+das linhas de presença (IndicePresenca): cada agendamento recebe no máximo uma
+linha de presença, então a tabela tem exatamente as linhas de agendamentos e
+previstos/presentes não são contados mais de uma vez. As chaves são comparadas
+na forma canônica (texto_canonico), para que "1003.0" case com "1003". O
+DiagnosticoJuncao conta agendamentos sem presença, presença sem agendamento e
+chaves ambíguas, e segue com a tabela em df.attrs (também no Parquet gravado),
+para que as páginas avisem quando nada casou (diagnostico_tabela).
+
+Uso (comparação com a junção antiga, por escola):
+    python -m src.bench_juncao --escolas 2000 --turmas 8
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass
+
+import numpy as np
+import pandas as pd
+
+from src.normalizacao import texto_canonico
+
+# chaves da junção, no padrão do Loader
+CHAVES_JUNCAO = ["coTurmaCenso", "diaAplicacao"]
+COLUNAS_PRESENCA = ["previstos", "presentes", "percentual", "dataAplicacaoReal"]
+# chave de df.attrs com o DiagnosticoJuncao da tabela de aplicações
+ATRIBUTO_DIAGNOSTICO = "diagnostico_juncao"
+AVISO_SEM_CORRESPONDENCIA = (
+    "Nenhum agendamento casou com a presença por turma e dia, embora as duas bases "
+    "tenham linhas; confira os formatos de coTurmaCenso e diaAplicacao nas planilhas."
+)
+
+RENOMEAR = {
+    # chaves básicas
+    "coescolacenso": "coEscolaCenso",
+    "coturmacenso": "coTurmaCenso",
+    "municipio": "municipio",
+    "gre": "gRE",
+    "polo": "polo",
+    "diaaplicacao": "diaAplicacao",
+    # previstos / presentes podem vir com nomes antigos ou novos
+    "previstos": "previstos",
+    "qtdalunosprevistos": "previstos",
+    "presentes": "presentes",
+    "qtdalunospresentes": "presentes",
+    # percentual
+    "percentual": "percentual",
+    # datas
+    "dataagendamento": "dataAgendamento",
+    "dataagendmento": "dataAgendamento",
+    "dataaplicacaoreal": "dataAplicacaoReal",
+    "datareal": "dataAplicacaoReal",
+    # eventual suporte
+    "qtdiasaplicacao": "qtdDiasAplicacao",
+}
+
+
+def prep(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normaliza colunas para o padrão do Loader, aceitando tanto esquemas novos
+    (parquet) quanto planilhas antigas.
+    """
+    df = df.copy()
+    df.columns = df.columns.str.strip().str.lower()
+    return df.rename(columns=RENOMEAR)
+
+
+@dataclass
+class DiagnosticoJuncao:
+    agendamentos: int
+    presenca: int
+    com_presenca: int
+    # agendamentos cuja turma/dia não está na presença
+    sem_presenca: int
+    # agendamentos sem turma ou sem dia de aplicação
+    chaves_vazias: int
+    # turmas/dias da presença sem agendamento
+    presenca_sem_agendamento: int
+    # turmas/dias com mais de uma linha de presença (vale a última)
+    chaves_ambiguas: int
+
+    def resumo(self) -> str:
+        return (
+            f"{self.com_presenca} de {self.agendamentos} agendamentos com presença; "
+            f"{self.sem_presenca} sem presença, {self.chaves_vazias} sem turma/dia, "
+            f"{self.presenca_sem_agendamento} turmas/dias de presença sem agendamento, "
+            f"{self.chaves_ambiguas} turmas/dias com mais de uma linha de presença"
+        )
+
+    @property
+    def sem_correspondencia(self) -> bool:
+        """As duas bases têm linhas, mas nenhuma chave casou."""
+        return self.com_presenca == 0 and self.agendamentos > 0 and self.presenca > 0
+
+
+def _chaves(df: pd.DataFrame) -> tuple[pd.MultiIndex, np.ndarray]:
+    # chaves na forma canônica; devolve também as linhas com chave vazia
+    colunas = [texto_canonico(df[c]) for c in CHAVES_JUNCAO]
+    vazias = np.zeros(len(df), dtype=bool)
+    for coluna in colunas:
+        vazias |= coluna.isna().to_numpy()
+    return pd.MultiIndex.from_arrays(colunas, names=CHAVES_JUNCAO), vazias
+
+
+class IndicePresenca:
+    """
+    Linhas de presença indexadas por turma e dia. Se uma chave aparece mais
+    de uma vez, vale a última linha (a mais recente na planilha).
+    """
+
+    def __init__(self, presence: pd.DataFrame):
+        chaves, vazias = _chaves(presence)
+        repetidas = chaves.duplicated(keep=False) & ~vazias
+        self.linhas_presenca = len(presence)
+        self.ambiguas = int(chaves[repetidas].nunique())
+        manter = ~vazias & ~chaves.duplicated(keep="last")
+        self.chaves = chaves[manter]
+        colunas = [c for c in COLUNAS_PRESENCA if c in presence.columns]
+        self.valores = presence.loc[manter, colunas].reset_index(drop=True)
+
+    def posicoes(self, base: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+        """Linha de presença de cada agendamento (-1 sem presença) e as chaves vazias."""
+        chaves, vazias = _chaves(base)
+        posicoes = self.chaves.get_indexer(chaves)
+        posicoes[vazias] = -1
+        return posicoes, vazias
+
+
+def juntar_presenca(
+    base: pd.DataFrame, presence: pd.DataFrame | None, indice: IndicePresenca | None = None
+) -> tuple[pd.DataFrame, DiagnosticoJuncao]:
+    """
+    Junta agendamentos (base) com presença (presence), já padronizados por
+    prep, por turma e dia. previstos vem da presença quando houver; colunas de
+    presença ausentes ficam vazias. `indice` reaproveita um IndicePresenca já
+    montado para `presence`.
+    """
+    sem_chaves = any(c not in base.columns for c in CHAVES_JUNCAO)
+    if presence is None or presence.empty or sem_chaves or any(c not in presence.columns for c in CHAVES_JUNCAO):
+        df = base.copy()
+        for col in COLUNAS_PRESENCA:
+            if col not in df.columns:
+                df[col] = pd.NA
+        vazias = len(base) if sem_chaves else int(_chaves(base)[1].sum())
+        linhas_presenca = 0 if presence is None else len(presence)
+        return df, DiagnosticoJuncao(len(base), linhas_presenca, 0, len(base) - vazias, vazias, 0, 0)
+
+    indice = indice or IndicePresenca(presence)
+    posicoes, vazias = indice.posicoes(base)
+    # posição -1 não existe no índice da presença: vira linha vazia
+    valores = indice.valores.reindex(posicoes).set_axis(base.index)
+    df = base.copy()
+    for col in COLUNAS_PRESENCA:
+        if col in valores.columns:
+            df[col] = valores[col].where(valores[col].notna(), df.get(col)) if col in df.columns else valores[col]
+        elif col not in df.columns:
+            df[col] = pd.NA
+
+    casadas = posicoes >= 0
+    usadas = np.unique(posicoes[casadas])
+    diagnostico = DiagnosticoJuncao(
+        agendamentos=len(base),
+        presenca=indice.linhas_presenca,
+        com_presenca=int(casadas.sum()),
+        sem_presenca=int((~casadas & ~vazias).sum()),
+        chaves_vazias=int(vazias.sum()),
+        presenca_sem_agendamento=len(indice.chaves) - len(usadas),
+        chaves_ambiguas=indice.ambiguas,
+    )
+    return df, diagnostico
+
+
+def tipar(df: pd.DataFrame) -> pd.DataFrame:
+    """Datas como datetime e previstos/presentes numéricos (vazios viram 0)."""
+    conversoes = {}
+    for col in ["dataAgendamento", "dataAplicacaoReal"]:
+        if col in df.columns:
+            conversoes[col] = pd.to_datetime(df[col], errors="coerce")
+    for col in ["previstos", "presentes"]:
+        if col in df.columns:
+            conversoes[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
+    return df.assign(**conversoes) if conversoes else df
+
+
+def montar_aplicacoes_presenca(
+    agendamentos: pd.DataFrame, presenca: pd.DataFrame | None
+) -> tuple[pd.DataFrame, DiagnosticoJuncao]:
+    """Tabela de aplicações a partir das bases de agendamentos e de presença."""
+    presenca = prep(presenca) if presenca is not None and not presenca.empty else None
+    df, diagnostico = juntar_presenca(prep(agendamentos), presenca)
+    df = tipar(df).reset_index(drop=True)
+    df.attrs[ATRIBUTO_DIAGNOSTICO] = asdict(diagnostico)
+    return df, diagnostico
+
+
+def diagnostico_tabela(df: pd.DataFrame) -> DiagnosticoJuncao | None:
+    """DiagnosticoJuncao guardado na tabela de aplicações; None se ela não tiver."""
+    dados = df.attrs.get(ATRIBUTO_DIAGNOSTICO)
+    return DiagnosticoJuncao(**dados) if dados else None
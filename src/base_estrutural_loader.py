@@ -6,23 +6,8 @@ Normaliza TUDO. Nunca mais haverá diferença de nomes de colunas.
 import pandas as pd
 from pathlib import Path
 from src.data_paths import ARQ_TURMAS_GRE, ARQ_BASE_FINAL
+from src.normalizacao import normalizar_colunas
 from src.utils import log
-import unicodedata
-
-
-def normalize_col(name: str) -> str:
-    """Normaliza qualquer nome de coluna para camelCase sem acento."""
-    # remover acentos
-    nfkd = unicodedata.normalize("NFKD", name)
-    no_accents = "".join([c for c in nfkd if not unicodedata.combining(c)])
-
-    # remover espaços e deixar tudo minusculo
-    clean = no_accents.replace(" ", "").replace("_", "")
-
-    # primeira letra sempre minúscula
-    clean = clean[0].lower() + clean[1:]
-
-    return clean
 
 
 class BaseEstruturalLoader:
@@ -33,7 +18,7 @@ class BaseEstruturalLoader:
 
         log("Normalizando colunas...")
         # aplicar normalização definitiva
-        df.columns = [normalize_col(c) for c in df.columns]
+        df.columns = normalizar_colunas(df.columns, "camel_estrutural")
 
         log("Normalização aplicada com sucesso.")
         log(f"Colunas finais: {df.columns.tolist()}")
@@ -0,0 +1,311 @@
+"""
+Benchmark da sincronização com o Firestore, sem projeto real:
+- bases sintéticas com as colunas de ESTRUTURAL_SCHEMA, AGENDAMENTOS_SCHEMA e
+  PRESENCA_SCHEMA, nos tamanhos pedidos, com os dtypes de src.esquemas;
+- estratégias de escrita: IDs automáticos (save_dataframe), upsert com IDs
+  determinísticos com 1 e com N workers, e blocos de Parquet (MODO_BLOCOS);
+- estratégias de leitura: coleção inteira paginada (load_collection_df),
+  só as colunas de uma página (máscara de campos) e blocos.
+
+Por padrão usa o cliente em memória de src.firestore_falso, com `--latencia`
+segundos por commit; com `--emulador`, o emulador de FIRESTORE_EMULATOR_HOST
+(ex.: gcloud emulators firestore start --host-port=localhost:8080).
+
+Para cada ciclo são informados documentos, vazão, percentis da latência de
+cada commit (escrita) ou página/bloco (leitura) e o pico de memória do Python
+(tracemalloc, medido em uma segunda execução para não afetar os tempos).
+
+Uso:
+    python -m src.bench_firestore --linhas 1000 10000 --latencia 0.02
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python -m src.bench_firestore --emulador
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable
+
+import numpy as np
+import pandas as pd
+
+from src.esquemas import aplicar_esquema
+from src.firebase_client import (
+    PROJETO_EMULADOR,
+    chunks_collection,
+    dataframe_from_pages,
+    delete_collection,
+    iter_collection_pages,
+    load_dataframe_chunks,
+    save_dataframe,
+    save_dataframe_chunks,
+    set_client,
+    upsert_operations,
+)
+from src.firestore_falso import ClienteFirestoreFalso
+from src.firestore_lotes import escrever_documentos
+from src.pipeline import (
+    AGENDAMENTOS_SCHEMA,
+    ESTRUTURAL_SCHEMA,
+    PRESENCA_SCHEMA,
+    ids_documentos,
+    normalize_columns,
+)
+
+SCHEMAS = {
+    "estrutural": ESTRUTURAL_SCHEMA,
+    "agendamentos": AGENDAMENTOS_SCHEMA,
+    "presenca": PRESENCA_SCHEMA,
+}
+# colunas lidas na leitura com máscara de campos (como a página 3 usaria)
+CAMPOS_PROJECAO = ("coescolacenso", "coturmacenso", "municipio", "gre", "diaaplicacao")
+
+MUNICIPIOS = ["JOÃO PESSOA", "CAMPINA GRANDE", "SANTA RITA", "PATOS", "SOUSA", "CAJAZEIRAS", "GUARABIRA"]
+TURMAS_POR_ESCOLA = 12
+
+
+def _coluna_sintetica(coluna: str, nome: str, linhas: int, rng: np.random.Generator) -> Any:
+    i = np.arange(linhas)
+    # presença tem uma linha por turma e dia de aplicação
+    turma = i // 2 if nome == "presenca" else i
+    escolha = lambda valores: rng.choice(np.array(valores, dtype=object), linhas)  # noqa: E731
+    municipio = rng.integers(0, len(MUNICIPIOS), linhas)
+    previstos = rng.integers(15, 36, linhas)
+    geradores: dict[str, Callable[[], Any]] = {
+        "uf": lambda: "PB",
+        "polo": lambda: [f"{MUNICIPIOS[m]} 0{m % 3 + 1}" for m in municipio],
+        "municipio": lambda: [MUNICIPIOS[m] for m in municipio],
+        "coescolacenso": lambda: (25_000_000 + turma // TURMAS_POR_ESCOLA).astype(str),
+        "escola": lambda: [f"ESCOLA ESTADUAL {e}" for e in turma // TURMAS_POR_ESCOLA],
+        "coturmacenso": lambda: (90_000_000 + turma).astype(str),
+        "turma": lambda: [f"TURMA {t % 40}" for t in turma],
+        "localizacao": lambda: escolha(["Urbana", "Rural"]),
+        "rede": lambda: escolha(["Estadual", "Municipal"]),
+        "tiporede": lambda: escolha(["Estadual", "Municipal"]),
+        "telefone1": lambda: (8_399_000_000 + rng.integers(0, 999_999, linhas)).astype(str),
+        "telefone2": lambda: (8_398_000_000 + rng.integers(0, 999_999, linhas)).astype(str),
+        "serie": lambda: escolha(["2º ano", "5º ano", "9º ano"]),
+        "turno": lambda: escolha(["Manhã", "Tarde"]),
+        "observacoesdaescola": lambda: np.where(rng.random(linhas) < 0.9, None, "Acesso por estrada de terra"),
+        "temciencias": lambda: escolha(["Sim", "Não"]),
+        "qtddiasaplicacao": lambda: rng.integers(1, 3, linhas),
+        "gre": lambda: [f"{g}ª GRE" for g in rng.integers(1, 17, linhas)],
+        "diaaplicacao": lambda: (1 + i % 2).astype(str) if nome == "presenca" else escolha(["1", "2"]),
+        "tipoaplic": lambda: "Regular",
+        "statusaplicacao": lambda: escolha(["Agendada", "Realizada", "Cancelada"]),
+        "aplicador": lambda: [f"APLICADOR {a}" for a in rng.integers(0, 500, linhas)],
+        "cpf": lambda: rng.integers(10**10, 10**11 - 1, linhas).astype(str),
+        "qtdalunosprevistos": lambda: previstos,
+        "qtdalunospresentes": lambda: (previstos * rng.uniform(0.5, 1.0, linhas)).astype(int),
+        "dataagendamento": lambda: pd.Timestamp("2025-11-24") + pd.to_timedelta(rng.integers(0, 10, linhas), unit="D"),
+        "datareal": lambda: pd.Timestamp("2025-11-24") + pd.to_timedelta(rng.integers(0, 10, linhas), unit="D"),
+        "aplicacaoid": lambda: [f"APL{n:08d}" for n in i],
+    }
+    gerador = geradores.get(coluna.lower())
+    return gerador() if gerador is not None else [f"{coluna} {n % 50}" for n in i]
+
+
+def gerar_base(nome: str, linhas: int, seed: int = 42) -> pd.DataFrame:
+    """Base sintética `nome` com as colunas do schema, como o loader a envia ao Firestore."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({coluna: _coluna_sintetica(coluna, nome, linhas, rng) for coluna in SCHEMAS[nome]})
+    if "percentual" in df.columns.str.lower():
+        df["percentual"] = (df["qtdAlunosPresentes"] / df["qtdAlunosPrevistos"] * 100).round(1)
+    if nome != "presenca":
+        # estrutural e agendamentos são publicados com os nomes de normalize_columns
+        df = normalize_columns(df)
+    return normalize_columns(aplicar_esquema(df, nome))
+
+
+class ClienteMedido:
+    """Repassa as chamadas ao cliente e registra a duração de cada commit."""
+
+    def __init__(self, db: Any):
+        self.db = db
+        self.latencias: list[float] = []
+        self._lock = threading.Lock()
+
+    def __getattr__(self, nome: str) -> Any:
+        return getattr(self.db, nome)
+
+    def batch(self) -> Any:
+        return _LoteMedido(self.db.batch(), self)
+
+    def registrar(self, segundos: float) -> None:
+        with self._lock:
+            self.latencias.append(segundos)
+
+
+class _LoteMedido:
+    def __init__(self, lote: Any, cliente: ClienteMedido):
+        self.lote = lote
+        self.cliente = cliente
+
+    def __getattr__(self, nome: str) -> Any:
+        return getattr(self.lote, nome)
+
+    def commit(self) -> Any:
+        inicio = time.perf_counter()
+        try:
+            return self.lote.commit()
+        finally:
+            self.cliente.registrar(time.perf_counter() - inicio)
+
+
+@dataclass
+class Ciclo:
+    operacao: str
+    estrategia: str
+    # executa o ciclo e devolve a quantidade de documentos gravados ou lidos
+    executar: Callable[[ClienteMedido], int]
+
+
+def _ler_paginas(colecao: str, campos: tuple[str, ...] | None, latencias: list[float]) -> pd.DataFrame:
+    def paginas():
+        inicio = time.perf_counter()
+        for pagina in iter_collection_pages(colecao, campos):
+            latencias.append(time.perf_counter() - inicio)
+            yield pagina
+            inicio = time.perf_counter()
+
+    return dataframe_from_pages(paginas())
+
+
+def ciclos(df: pd.DataFrame, nome: str, colecao: str, workers: int) -> list[Ciclo]:
+    """Ciclos na ordem de execução: cada leitura lê o que a escrita anterior gravou."""
+    ids = ids_documentos(df, nome).tolist()
+    leituras: list[float] = []
+
+    def escrever_upsert(n: int) -> Callable[[ClienteMedido], int]:
+        return lambda db: escrever_documentos(db, colecao, upsert_operations(df, ids), workers=n).documentos
+
+    def ler_blocos(db: ClienteMedido) -> int:
+        inicio = time.perf_counter()
+        lido = load_dataframe_chunks(colecao)
+        db.registrar(time.perf_counter() - inicio)
+        return len(lido)
+
+    def ler(campos: tuple[str, ...] | None) -> Callable[[ClienteMedido], int]:
+        def executar(db: ClienteMedido) -> int:
+            leituras.clear()
+            lido = _ler_paginas(colecao, campos, leituras)
+            db.latencias.extend(leituras)
+            return len(lido)
+
+        return executar
+
+    return [
+        Ciclo("escrita", "ids automaticos", lambda db: save_dataframe(colecao, df).documentos),
+        Ciclo("escrita", "upsert 1 worker", escrever_upsert(1)),
+        Ciclo("escrita", f"upsert {workers} workers", escrever_upsert(workers)),
+        Ciclo("leitura", "colecao inteira", ler(None)),
+        Ciclo("leitura", "mascara de campos", ler(CAMPOS_PROJECAO)),
+        Ciclo("escrita", "blocos", lambda db: (len(save_dataframe_chunks(colecao, df)["blocos"]) + 1)),
+        Ciclo("leitura", "blocos", ler_blocos),
+    ]
+
+
+def _percentil(valores: list[float], q: float) -> float:
+    return float(np.percentile(valores, q)) * 1000 if valores else float("nan")
+
+
+def medir_ciclo(db: Any, ciclo: Ciclo, preparar: Callable[[], None]) -> dict[str, Any]:
+    medido = ClienteMedido(db)
+    set_client(medido)
+    preparar()
+    medido.latencias.clear()
+    inicio = time.perf_counter()
+    documentos = ciclo.executar(medido)
+    segundos = time.perf_counter() - inicio
+    latencias = list(medido.latencias)
+
+    # segunda execução, só para o pico de memória
+    preparar()
+    tracemalloc.start()
+    try:
+        ciclo.executar(ClienteMedido(db))
+        pico = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    set_client(db)
+
+    return {
+        "operacao": ciclo.operacao,
+        "estrategia": ciclo.estrategia,
+        "documentos": documentos,
+        "segundos": segundos,
+        "docs_s": documentos / segundos if segundos else float("nan"),
+        "p50_ms": _percentil(latencias, 50),
+        "p95_ms": _percentil(latencias, 95),
+        "p99_ms": _percentil(latencias, 99),
+        "pico_mb": pico / 1024**2,
+    }
+
+
+def executar_benchmark(
+    db: Any, bases: list[str], tamanhos: list[int], workers: int, seed: int = 42
+) -> pd.DataFrame:
+    resultados = []
+    for nome in bases:
+        for linhas in tamanhos:
+            df = gerar_base(nome, linhas, seed)
+            colecao = f"bench_{nome}"
+
+            def limpar() -> None:
+                delete_collection(colecao)
+                delete_collection(chunks_collection(colecao))
+
+            for ciclo in ciclos(df, nome, colecao, workers):
+                # escritas partem da coleção vazia; leituras leem o que a
+                # escrita anterior gravou
+                preparar = limpar if ciclo.operacao == "escrita" else (lambda: None)
+                linha = medir_ciclo(db, ciclo, preparar)
+                resultados.append({"base": nome, "linhas": linhas, **linha})
+            limpar()
+    return pd.DataFrame(resultados)
+
+
+def cliente(emulador: bool, latencia: float) -> Any:
+    if not emulador:
+        return ClienteFirestoreFalso(latencia=latencia)
+    if not os.environ.get("FIRESTORE_EMULATOR_HOST"):
+        raise SystemExit("Defina FIRESTORE_EMULATOR_HOST (ex.: localhost:8080) para usar o emulador.")
+    from google.auth.credentials import AnonymousCredentials
+    from google.cloud import firestore as gcf
+
+    return gcf.Client(
+        project=os.environ.get("GCLOUD_PROJECT", PROJETO_EMULADOR), credentials=AnonymousCredentials()
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bases", nargs="+", choices=list(SCHEMAS), default=list(SCHEMAS))
+    parser.add_argument("--linhas", nargs="+", type=int, default=[1_000, 10_000])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latencia", type=float, default=0.02, help="segundos por commit no cliente em memória")
+    parser.add_argument("--emulador", action="store_true", help="usa o emulador de FIRESTORE_EMULATOR_HOST")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    db = cliente(args.emulador, args.latencia)
+    set_client(db)
+    try:
+        resultado = executar_benchmark(db, args.bases, args.linhas, args.workers, args.seed)
+    finally:
+        set_client(None)
+    backend = "emulador" if args.emulador else f"cliente em memoria, {args.latencia * 1000:.0f} ms/commit"
+    print(f"Firestore: {backend}")
+    print(
+        resultado.set_index(["base", "linhas", "operacao", "estrategia"])
+        .round({"segundos": 3, "docs_s": 0, "p50_ms": 1, "p95_ms": 1, "p99_ms": 1, "pico_mb": 1})
+        .to_string()
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Benchmark da junção agendamentos × presença:
+- junção antiga das páginas: merge por escola (coEscolaCenso + municipio +
+  gRE + polo), em que cada turma da escola casa com todas as linhas de
+  presença da escola;
+- juntar_presenca, por turma e dia, montando o índice da presença;
+- juntar_presenca com o índice já montado.
+
+Para cada uma informa linhas resultantes, tempo, memória e os totais de
+previstos/presentes, que a junção por escola multiplica. As bases sintéticas
+têm uma fração de turmas sem presença e de linhas de presença repetidas
+(--ambiguas), que aparecem no diagnóstico da junção.
+
+Uso:
+    python -m src.bench_juncao --escolas 2000 --turmas 8 --dias 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from typing import Any, Callable
+
+import pandas as pd
+
+from src.aplicacoes_presenca import (
+    COLUNAS_PRESENCA,
+    IndicePresenca,
+    juntar_presenca,
+    montar_aplicacoes_presenca,
+    prep,
+    tipar,
+)
+
+POLOS = ["JOAO PESSOA 01", "CAMPINA GRANDE 02", "PATOS 01", "SOUSA 02", "GUARABIRA 01"]
+
+
+def juntar_por_escola(base: pd.DataFrame, presence: pd.DataFrame) -> pd.DataFrame:
+    """Junção usada pelas páginas antes de juntar_presenca (referência)."""
+    df = base.merge(
+        presence,
+        on=["coEscolaCenso", "municipio", "gRE", "polo"],
+        how="left",
+        suffixes=("", "_pres"),
+    )
+    for col in COLUNAS_PRESENCA:
+        pres_col = f"{col}_pres"
+        if pres_col in df.columns:
+            df[col] = df[pres_col].where(df[pres_col].notna(), df.get(col))
+            df.drop(columns=[pres_col], inplace=True)
+        elif col not in df.columns:
+            df[col] = pd.NA
+    return df
+
+
+def gerar_bases(
+    escolas: int, turmas: int, dias: int, ambiguas: float, seed: int = 42
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Agendamentos (nomes de normalize_columns) e presença (nomes camelCase) sintéticos."""
+    rng = random.Random(seed)
+    agendamentos = []
+    presenca = []
+    for e in range(escolas):
+        polo = POLOS[e % len(POLOS)]
+        escola = {"coescolacenso": str(25_000_000 + e), "municipio": polo[:-3].strip(), "gre": str(e % 16 + 1), "polo": polo}
+        for t in range(turmas):
+            turma = str(900_000 + e * turmas + t)
+            dia = str(rng.randint(1, dias))
+            previstos = rng.randint(15, 40)
+            agendamentos.append(
+                {**escola, "coturmacenso": turma, "diaaplicacao": dia, "qtdalunosprevistos": previstos, "dataagendamento": "2025-11-24"}
+            )
+            if rng.random() < 0.05:
+                continue  # turma sem presença registrada
+            linha = {
+                "coEscolaCenso": escola["coescolacenso"],
+                "municipio": escola["municipio"],
+                "gRE": escola["gre"],
+                "polo": polo,
+                "coTurmaCenso": turma,
+                "diaAplicacao": dia,
+                "qtdAlunosPrevistos": previstos,
+                "qtdAlunosPresentes": rng.randint(0, previstos),
+                "dataReal": "2025-11-24",
+            }
+            presenca.append(linha)
+            if rng.random() < ambiguas:
+                presenca.append({**linha, "qtdAlunosPresentes": rng.randint(0, previstos)})
+    df_presenca = pd.DataFrame(presenca)
+    df_presenca["percentual"] = df_presenca["qtdAlunosPresentes"] / df_presenca["qtdAlunosPrevistos"] * 100
+    return pd.DataFrame(agendamentos), df_presenca
+
+
+def medir(func: Callable[[], Any], repeticoes: int) -> tuple[Any, float]:
+    melhor = float("inf")
+    resultado = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = func()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return resultado, melhor
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--escolas", type=int, default=2000)
+    parser.add_argument("--turmas", type=int, default=8, help="turmas por escola")
+    parser.add_argument("--dias", type=int, default=2)
+    parser.add_argument("--ambiguas", type=float, default=0.01, help="fração de turmas com presença repetida")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    agendamentos, presenca = gerar_bases(args.escolas, args.turmas, args.dias, args.ambiguas)
+    base, pres = prep(agendamentos), prep(presenca)
+    indice = IndicePresenca(pres)
+
+    casos = [
+        ("por escola (antiga)", lambda: tipar(juntar_por_escola(base, pres))),
+        ("turma/dia", lambda: montar_aplicacoes_presenca(agendamentos, presenca)[0]),
+        ("turma/dia, indice pronto", lambda: tipar(juntar_presenca(base, pres, indice)[0])),
+    ]
+    print(f"{len(agendamentos)} agendamentos, {len(presenca)} linhas de presenca")
+    print(f"{'juncao':<26}{'linhas':>10}{'segundos':>10}{'MB':>8}{'previstos':>12}{'presentes':>12}")
+    for nome, func in casos:
+        df, segundos = medir(func, args.repeticoes)
+        mb = df.memory_usage(deep=True).sum() / 1e6
+        print(
+            f"{nome:<26}{len(df):>10,}{segundos:>10.3f}{mb:>8.1f}"
+            f"{int(df['previstos'].sum()):>12,}{int(df['presentes'].sum()):>12,}"
+        )
+    print()
+    print("diagnostico:", juntar_presenca(base, pres, indice)[1].resumo())
+
+
+if __name__ == "__main__":
+    main()
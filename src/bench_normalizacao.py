@@ -0,0 +1,94 @@
+"""
+Micro-benchmark da normalização de textos:
+- remoção de acentos: NFKD caractere a caractere (implementação antiga das
+  páginas) versus tabela de tradução, sem e com o cache LRU;
+- Series.apply linha a linha versus aplicar_por_valores_unicos.
+
+Uso:
+    python -m src.bench_normalizacao --linhas 300000 --distintos 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+import unicodedata
+from typing import Any, Callable
+
+import pandas as pd
+
+from src.normalizacao import _remover_acentos, aplicar_por_valores_unicos, normalize_upper
+from src.pipeline import normalizar_gre, normalizar_municipio
+
+MUNICIPIOS_BASE = ["João Pessoa", "Campina Grande", "Santa Rita", "Patos", "Sousa", "Cajazeiras", "Guarabira"]
+
+
+def remove_accents_nfkd(text: str) -> str:
+    nfkd = unicodedata.normalize("NFKD", str(text))
+    return "".join([c for c in nfkd if not unicodedata.combining(c)])
+
+
+def gerar_series(linhas: int, distintos: int, seed: int = 42) -> dict[str, pd.Series]:
+    rng = random.Random(seed)
+    municipios = [f"{rng.choice(MUNICIPIOS_BASE)} {i:03d} " for i in range(distintos)]
+    gres = [f"{i}ª GRE" for i in range(1, 17)] + [f"{i} a gre" for i in range(1, 17)]
+    col_municipio = [rng.choice(municipios) for _ in range(linhas)]
+    col_gre = [rng.choice(gres) if rng.random() > 0.02 else None for _ in range(linhas)]
+    return {
+        "municipio": pd.Series(col_municipio, dtype="string"),
+        "gRE": pd.Series(col_gre, dtype="string"),
+    }
+
+
+def medir(func: Callable[[], Any], repeticoes: int) -> float:
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        func()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, default=300_000)
+    parser.add_argument("--distintos", type=int, default=500)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    series = gerar_series(args.linhas, args.distintos)
+    textos = series["municipio"].tolist()
+
+    def sem_cache() -> None:
+        _remover_acentos.cache_clear()
+        for t in textos:
+            _remover_acentos.__wrapped__(t)
+
+    remocao = [
+        ("NFKD por caractere", lambda: [remove_accents_nfkd(t) for t in textos]),
+        ("tabela de traducao", sem_cache),
+        ("tabela + cache LRU", lambda: [_remover_acentos(t) for t in textos]),
+    ]
+    print(f"remocao de acentos ({args.linhas} textos)")
+    for nome, func in remocao:
+        print(f"  {nome:<22}{args.linhas / medir(func, args.repeticoes):>14,.0f} textos/s")
+    print()
+
+    casos = [
+        ("normalizar_municipio", series["municipio"], normalizar_municipio),
+        ("normalize_upper", series["municipio"], normalize_upper),
+        ("normalizar_gre", series["gRE"], normalizar_gre),
+    ]
+
+    print(f"{args.linhas} linhas, {args.distintos} municipios distintos")
+    print(f"{'funcao':<22}{'apply (linhas/s)':>20}{'por valor unico (linhas/s)':>30}{'ganho':>10}")
+    for nome, serie, funcao in casos:
+        antes = medir(lambda: serie.apply(funcao), args.repeticoes)
+        depois = medir(lambda: aplicar_por_valores_unicos(serie, funcao), args.repeticoes)
+        pd.testing.assert_series_equal(serie.apply(funcao), aplicar_por_valores_unicos(serie, funcao))
+        print(f"{nome:<22}{args.linhas / antes:>20,.0f}{args.linhas / depois:>30,.0f}{antes / depois:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
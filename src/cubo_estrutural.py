@@ -0,0 +1,143 @@
+"""
+Cubo de contagens distintas da base estrutural, para o Dashboard Estrutural.
+
+Para cada combinação dos filtros da página (GRE, polo, município, escola),
+com e sem série × turno, o cubo guarda um nível com as contagens distintas de
+GREs, polos, municípios, escolas e turmas por grupo (grouping sets). O loader
+grava o cubo em base_cubo_estrutural; a página só recorta o nível e os valores
+filtrados (CuboEstrutural.fatiar), sem groupby na base a cada interação.
+
+Contagens distintas não se somam entre níveis (uma turma tem várias linhas na
+base), então cada nível é calculado sobre a base, e não a partir do nível mais
+detalhado. Nos níveis agrupados por escola, `posicao` ordena as escolas de
+cada recorte pelas turmas (1 = mais turmas), para o gráfico das maiores.
+"""
+
+from __future__ import annotations
+
+import itertools
+from typing import Mapping, Sequence
+
+import pandas as pd
+
+from src.normalizacao import aplicar_por_valores_unicos, remove_accents
+
+FILTROS = ("GRE", "polo", "municipio", "escola")
+DETALHE = ("serie", "turno")
+# colunas de cada dimensão, na ordem do índice de cada nível: os filtros
+# ativos formam sempre um prefixo do índice (escola é filtrada pelo nome)
+COLUNAS_DIMENSAO = {
+    "GRE": ["GRE"],
+    "polo": ["polo"],
+    "municipio": ["municipio"],
+    "escola": ["escola", "coEscolaCenso"],
+    "serie": ["serie"],
+    "turno": ["turno"],
+}
+MEDIDAS = {
+    "gres": "GRE",
+    "polos": "polo",
+    "municipios": "municipio",
+    "escolas": "coEscolaCenso",
+    "turmas": "coTurmaCenso",
+}
+COLUNA_NIVEL = "nivel"
+COLUNA_POSICAO = "posicao"
+NIVEL_TOTAL = "total"
+TOP_ESCOLAS = 50
+
+
+def nome_nivel(dimensoes: Sequence[str]) -> str:
+    return "+".join(dimensoes) or NIVEL_TOTAL
+
+
+def niveis() -> list[tuple[str, ...]]:
+    """Conjuntos de dimensões do cubo: cada combinação de filtros, com e sem série × turno."""
+    resultado = []
+    for n in range(len(FILTROS) + 1):
+        for combinacao in itertools.combinations(FILTROS, n):
+            resultado += [combinacao, combinacao + DETALHE]
+    return resultado
+
+
+def padronizar_gre(df: pd.DataFrame) -> pd.DataFrame:
+    """Coluna GRE (de GRE, gRE ou gre) sem acentos, maiúscula e sem espaços nas pontas."""
+    if "GRE" not in df.columns:
+        gre_alt = [c for c in df.columns if c.lower() == "gre"]
+        if gre_alt:
+            df = df.rename(columns={gre_alt[0]: "GRE"})
+        else:
+            df = df.assign(GRE=pd.NA)
+    gre = aplicar_por_valores_unicos(df["GRE"], lambda v: v if v is None else remove_accents(v))
+    return df.assign(GRE=gre.str.upper().str.strip())
+
+
+def _nivel(df: pd.DataFrame, dimensoes: tuple[str, ...]) -> pd.DataFrame:
+    colunas = [c for d in dimensoes for c in COLUNAS_DIMENSAO[d]]
+    if not colunas:
+        return pd.DataFrame([{nome: df[coluna].nunique() for nome, coluna in MEDIDAS.items()}])
+    # medidas que são dimensões do nível valem 1 em cada grupo
+    medidas = {nome: (coluna, "nunique") for nome, coluna in MEDIDAS.items() if coluna not in colunas}
+    nivel = df.groupby(colunas, observed=True).agg(**medidas).reset_index()
+    for nome, coluna in MEDIDAS.items():
+        if coluna in colunas:
+            nivel[nome] = 1
+    if "escola" in dimensoes:
+        particao = [c for c in colunas if c not in COLUNAS_DIMENSAO["escola"]]
+        ordem = nivel.sort_values("turmas", ascending=False, kind="stable")
+        posicao = ordem.groupby(particao, observed=True).cumcount() if particao else pd.Series(range(len(ordem)), index=ordem.index)
+        nivel[COLUNA_POSICAO] = posicao + 1
+    return nivel
+
+
+def montar_cubo(df: pd.DataFrame) -> pd.DataFrame:
+    """Cubo da base estrutural normalizada, um bloco de linhas por nível (coluna `nivel`)."""
+    df = padronizar_gre(df)
+    faltantes = {coluna: pd.NA for coluna in [*COLUNAS_DIMENSAO, "coEscolaCenso", "coTurmaCenso"] if coluna not in df.columns}
+    if faltantes:
+        df = df.assign(**faltantes)
+    partes = [_nivel(df, dimensoes).assign(**{COLUNA_NIVEL: nome_nivel(dimensoes)}) for dimensoes in niveis()]
+    cubo = pd.concat(partes, ignore_index=True)
+    cubo[COLUNA_POSICAO] = cubo[COLUNA_POSICAO].astype("Int32")
+    return cubo
+
+
+class CuboEstrutural:
+    """Níveis do cubo indexados pelas suas dimensões, para recortes por busca no índice."""
+
+    def __init__(self, cubo: pd.DataFrame):
+        self._niveis: dict[str, pd.DataFrame] = {}
+        for dimensoes in niveis():
+            nome = nome_nivel(dimensoes)
+            colunas = [c for d in dimensoes for c in COLUNAS_DIMENSAO[d]]
+            extras = [COLUNA_POSICAO] if "escola" in dimensoes else []
+            parte = cubo.loc[cubo[COLUNA_NIVEL] == nome, colunas + list(MEDIDAS) + extras]
+            self._niveis[nome] = parte.set_index(colunas).sort_index() if colunas else parte.reset_index(drop=True)
+
+    def total(self) -> pd.Series:
+        """Contagens distintas da base inteira."""
+        return self._niveis[NIVEL_TOTAL].iloc[0]
+
+    def fatiar(self, filtros: Mapping[str, str | None], grupo: Sequence[str]) -> pd.DataFrame:
+        """
+        Contagens agrupadas por `grupo` nas linhas que atendem `filtros`
+        ({dimensão: valor}; None = todos). Os filtros precisam vir antes do
+        grupo na hierarquia GRE > polo > município > escola > série/turno.
+        """
+        ativos = {d: v for d, v in filtros.items() if v is not None}
+        dimensoes = [d for d in (*FILTROS, *DETALHE) if d in ativos or d in grupo]
+        tabela = self._niveis[nome_nivel(dimensoes)]
+        if ativos:
+            chave = tuple(ativos[d] for d in dimensoes if d in ativos)
+            try:
+                tabela = tabela.xs(chave, level=list(range(len(chave))), drop_level=False)
+            except KeyError:
+                tabela = tabela.iloc[0:0]
+        return tabela.reset_index()
+
+    def top_escolas(self, filtros: Mapping[str, str | None], n: int = TOP_ESCOLAS) -> pd.DataFrame:
+        """As `n` escolas com mais turmas no recorte (com a escola filtrada, só ela)."""
+        escolas = self.fatiar(filtros, ["escola"])
+        if filtros.get("escola") is None:
+            escolas = escolas[escolas[COLUNA_POSICAO] <= n]
+        return escolas.sort_values(COLUNA_POSICAO)
@@ -12,3 +12,17 @@ ARQ_BASE_FINAL_NORMALIZADO = DATA_PROCESSADO / "base_estrutural_normalizado.parq
 ARQ_AGENDAMENTOS = DATA_ORIGEM / "Agendamentos-2025-11-24T13_16_36.058Z.xlsx"
 ARQ_BASE_AGENDAMENTOS = DATA_PROCESSADO / "base_agendamentos.parquet"
 ARQ_BASE_APLICACOES = DATA_PROCESSADO / "base_aplicacoes.parquet"
+ARQ_BASE_PRESENCA = DATA_PROCESSADO / "base_percentual_presenca.parquet"
+# agendamentos × presença, montada pelo loader (src.aplicacoes_presenca)
+ARQ_BASE_APLICACOES_PRESENCA = DATA_PROCESSADO / "base_aplicacoes_presenca.parquet"
+# contagens distintas da base estrutural por nível, para o Dashboard Estrutural (src.cubo_estrutural)
+ARQ_BASE_CUBO_ESTRUTURAL = DATA_PROCESSADO / "base_cubo_estrutural.parquet"
+ARQ_BASE_PENDENTES = DATA_PROCESSADO / "base_registros_pendentes.parquet"
+
+DATA_CACHE = Path("data/cache")
+DIR_CACHE_INGESTAO = DATA_CACHE / "ingestao"
+
+DIR_JOBS = Path("data/jobs")
+
+# espelho local das coleções do Firestore (src.espelho_firestore)
+DIR_ESPELHO = DATA_CACHE / "firestore"
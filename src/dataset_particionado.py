@@ -0,0 +1,142 @@
+"""
+Bases processadas em layout Parquet particionado (Hive).
+
+Além do arquivo único (usado nos downloads), o loader pode gravar cada base
+como um diretório com o mesmo nome do arquivo, particionado por GRE e dia de
+aplicação, ex.:
+
+    data/processado/snapshots/<versao>/base_agendamentos/gre=1%C2%AA%20GRE/diaaplicacao=1/parte-0.parquet
+
+ler_base aplica os filtros como predicados do pyarrow: só as partições
+correspondentes são abertas e, dentro delas, os row groups são descartados
+pelas estatísticas. Sem o diretório, a leitura cai no arquivo único, com os
+mesmos filtros. O layout serve a leituras filtradas por GRE ou dia fora dos
+dashboards (análises, exportações): as páginas precisam da base inteira para
+os totais e leem o arquivo único, mais rápido que percorrer as partições.
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Sequence
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from src.esquemas import ordenar_categorias
+
+ARQUIVO_SCHEMA = "_common_metadata"
+CHAVE_PARTICOES = b"siave_particoes"
+MAX_PARTICOES = 10_000
+
+# valor único (igualdade) ou lista/tupla/conjunto de valores (isin)
+Filtros = dict[str, Any]
+
+
+def diretorio_dataset(arquivo: Path) -> Path:
+    """Diretório particionado correspondente ao Parquet único (mesmo nome, sem extensão)."""
+    return arquivo.with_suffix("")
+
+
+def _particionamento(schema: pa.Schema, particoes: Sequence[str]) -> ds.Partitioning:
+    # colunas categóricas (ver src.esquemas) são particionadas pelo texto
+    campos = [schema.field(c) for c in particoes]
+    campos = [c.with_type(c.type.value_type) if pa.types.is_dictionary(c.type) else c for c in campos]
+    return ds.partitioning(pa.schema(campos), flavor="hive")
+
+
+def gravar_dataset(base: pd.DataFrame | Path, destino: Path, particoes: Sequence[str]) -> None:
+    """
+    Grava `base` em `destino` particionado pelas colunas `particoes` (as que
+    não existirem na base são ignoradas). Bases em arquivo (modo streaming) são
+    copiadas em lotes, sem carregar tudo em memória.
+    """
+    if isinstance(base, Path):
+        fonte = ds.dataset(base, format="parquet")
+        schema = fonte.schema
+    else:
+        fonte = pa.Table.from_pandas(base, preserve_index=False)
+        schema = fonte.schema
+
+    colunas = [c for c in particoes if c in schema.names]
+    ds.write_dataset(
+        fonte,
+        destino,
+        format="parquet",
+        partitioning=_particionamento(schema, colunas),
+        basename_template="parte-{i}.parquet",
+        max_partitions=MAX_PARTICOES,
+        existing_data_behavior="delete_matching",
+    )
+    # schema completo (com as colunas de partição e os metadados do pandas)
+    metadados = {**(schema.metadata or {}), CHAVE_PARTICOES: json.dumps(colunas).encode()}
+    pq.write_metadata(schema.with_metadata(metadados), destino / ARQUIVO_SCHEMA)
+
+
+def _expressao(filtros: Filtros | None) -> ds.Expression | None:
+    expressao = None
+    for coluna, valor in (filtros or {}).items():
+        if isinstance(valor, (list, tuple, set, frozenset)):
+            termo = ds.field(coluna).isin(list(valor))
+        elif valor is None:
+            termo = ds.field(coluna).is_null()
+        else:
+            termo = ds.field(coluna) == valor
+        expressao = termo if expressao is None else expressao & termo
+    return expressao
+
+
+def abrir_dataset(arquivo: Path) -> ds.Dataset:
+    """Dataset particionado de `arquivo` se existir; senão o próprio arquivo único."""
+    pasta = diretorio_dataset(arquivo)
+    if (pasta / ARQUIVO_SCHEMA).exists():
+        schema = pq.read_schema(pasta / ARQUIVO_SCHEMA)
+        metadados = dict(schema.metadata)
+        particoes = json.loads(metadados.pop(CHAVE_PARTICOES))
+        schema = schema.with_metadata(metadados)
+        for coluna in particoes:
+            i = schema.get_field_index(coluna)
+            if pa.types.is_dictionary(schema.field(i).type):
+                schema = schema.set(i, schema.field(i).with_type(schema.field(i).type.value_type))
+        return ds.dataset(
+            pasta,
+            format="parquet",
+            schema=schema,
+            partitioning=_particionamento(schema, particoes),
+        )
+    return ds.dataset(arquivo, format="parquet")
+
+
+def ler_base(
+    arquivo: Path,
+    filtros: Filtros | None = None,
+    colunas: Sequence[str] | None = None,
+) -> pd.DataFrame:
+    """
+    Lê uma base processada aplicando `filtros` ({coluna: valor ou lista de
+    valores}) e, opcionalmente, apenas as `colunas` pedidas. O layout
+    particionado só é usado com filtros; sem eles, o arquivo único é lido
+    direto, se existir.
+    """
+    dataset = ds.dataset(arquivo, format="parquet") if not filtros and arquivo.exists() else abrir_dataset(arquivo)
+    if colunas is not None:
+        colunas = [c for c in colunas if c in dataset.schema.names]
+    tabela = dataset.to_table(columns=colunas, filter=_expressao(filtros))
+    return ordenar_categorias(_codificar_categoricas(tabela).to_pandas())
+
+
+def _codificar_categoricas(tabela: pa.Table) -> pa.Table:
+    # colunas de partição voltam como texto; as que eram categóricas na base
+    # (segundo os metadados do pandas) são codificadas de novo como dictionary
+    for coluna in (tabela.schema.pandas_metadata or {}).get("columns", []):
+        nome = coluna["name"]
+        if coluna["pandas_type"] != "categorical" or nome not in tabela.column_names:
+            continue
+        i = tabela.schema.get_field_index(nome)
+        if not pa.types.is_dictionary(tabela.schema.field(i).type):
+            tabela = tabela.set_column(i, nome, pc.dictionary_encode(tabela.column(i)))
+    return tabela
@@ -0,0 +1,194 @@
+"""
+Ingestão incremental: diferença entre dois snapshots de uma base.
+
+Cada exportação de Alocacoes é um snapshot completo. As linhas do snapshot novo
+são comparadas com as da base publicada anteriormente pela chave do registro
+(aplicacaoid, ou coturmacenso + diaaplicacao quando o id está vazio) e
+classificadas como inseridas, atualizadas ou removidas. Só esse delta é
+aplicado à base armazenada e gravado para os consumidores (caches, sync).
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Sequence
+
+import pandas as pd
+
+COLUNA_CHAVE = "_chave"
+COLUNA_OPERACAO = "_operacao"
+INSERIDO = "inserido"
+ATUALIZADO = "atualizado"
+REMOVIDO = "removido"
+
+# quantidade de arquivos de delta mantidos por base
+DELTAS_MANTIDOS = 20
+
+
+@dataclass
+class ResumoDelta:
+    inseridos: int
+    atualizados: int
+    removidos: int
+    inalterados: int
+    arquivo: Path | None = None
+
+    @property
+    def vazio(self) -> bool:
+        return not (self.inseridos or self.atualizados or self.removidos)
+
+
+@dataclass
+class DeltaBase:
+    """Linhas alteradas, indexadas pela chave do registro (ver chaves_registro)."""
+
+    inseridos: pd.DataFrame
+    atualizados: pd.DataFrame
+    removidos: pd.DataFrame
+    inalterados: int
+
+    @property
+    def vazio(self) -> bool:
+        return self.inseridos.empty and self.atualizados.empty and self.removidos.empty
+
+    def resumo(self, arquivo: Path | None = None) -> ResumoDelta:
+        return ResumoDelta(len(self.inseridos), len(self.atualizados), len(self.removidos), self.inalterados, arquivo)
+
+    def como_frame(self) -> pd.DataFrame:
+        """
+        Delta em formato tabular, com as colunas COLUNA_CHAVE e COLUNA_OPERACAO;
+        linhas removidas trazem os valores que estavam na base anterior.
+        """
+        partes = [
+            df.assign(**{COLUNA_OPERACAO: operacao})
+            for df, operacao in [
+                (self.inseridos, INSERIDO),
+                (self.atualizados, ATUALIZADO),
+                (self.removidos, REMOVIDO),
+            ]
+        ]
+        frame = pd.concat(partes).rename_axis(COLUNA_CHAVE).reset_index()
+        return frame.astype({COLUNA_CHAVE: "string", COLUNA_OPERACAO: "string"})
+
+
+def chaves_registro(df: pd.DataFrame, coluna_id: str, colunas_alternativas: Sequence[str]) -> pd.Index:
+    """
+    Chave de cada linha: o id quando preenchido, senão a combinação das colunas
+    alternativas. Chaves repetidas recebem o número da ocorrência (#0, #1, ...)
+    para que cada linha tenha uma chave única.
+    """
+    vazio = pd.Series(pd.NA, index=df.index, dtype="string")
+    ids = df[coluna_id].astype("string").str.strip() if coluna_id in df.columns else vazio
+    partes = [
+        (df[c].astype("string").str.strip() if c in df.columns else vazio).fillna("")
+        for c in colunas_alternativas
+    ]
+    alternativa = partes[0].str.cat(partes[1:], sep="|") if partes else vazio.fillna("")
+
+    tem_id = ids.notna() & (ids != "")
+    chave = ("id:" + ids).where(tem_id, "alt:" + alternativa)
+    ocorrencia = chave.groupby(chave, sort=False).cumcount()
+    return pd.Index((chave + "#" + ocorrencia.astype("string")).astype(str), name=COLUNA_CHAVE)
+
+
+def _assinaturas(df: pd.DataFrame, colunas: list[str]) -> pd.Series:
+    # compara pelo texto de cada valor: a base lida do Parquet e o snapshot
+    # recém-processado podem ter dtypes diferentes para os mesmos dados
+    return pd.util.hash_pandas_object(df.reindex(columns=colunas).astype("string"), index=False)
+
+
+def _alinhar_tipos(df: pd.DataFrame, modelo: pd.DataFrame) -> pd.DataFrame:
+    """Converte as colunas de `df` para os dtypes de `modelo`, quando possível."""
+    df = df.reindex(columns=modelo.columns)
+    for col, dtype in modelo.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            # categorias de outro snapshot viram NA no astype; usa o tipo dos
+            # valores e deixa a recategorização para a publicação
+            dtype = dtype.categories.dtype
+        if df[col].dtype != dtype:
+            try:
+                df[col] = df[col].astype(dtype)
+            except (TypeError, ValueError):
+                pass
+    return df
+
+
+def calcular_delta(
+    anterior: pd.DataFrame,
+    novo: pd.DataFrame,
+    coluna_id: str,
+    colunas_alternativas: Sequence[str],
+) -> DeltaBase:
+    """Classifica as linhas de `novo` em relação a `anterior` pela chave do registro."""
+    colunas = list(novo.columns)
+    anterior = _alinhar_tipos(anterior, novo).set_axis(chaves_registro(anterior, coluna_id, colunas_alternativas))
+    novo = novo.set_axis(chaves_registro(novo, coluna_id, colunas_alternativas))
+
+    existe_antes = novo.index.isin(anterior.index)
+    comuns = novo.index[existe_antes]
+    alterado = (
+        _assinaturas(novo.loc[comuns], colunas).to_numpy()
+        != _assinaturas(anterior.loc[comuns], colunas).to_numpy()
+    )
+
+    return DeltaBase(
+        inseridos=novo[~existe_antes],
+        atualizados=novo.loc[comuns[alterado]],
+        removidos=anterior[~anterior.index.isin(novo.index)],
+        inalterados=int((~alterado).sum()),
+    )
+
+
+def aplicar_delta(
+    anterior: pd.DataFrame,
+    delta: DeltaBase,
+    coluna_id: str,
+    colunas_alternativas: Sequence[str],
+) -> pd.DataFrame:
+    """
+    Aplica o delta à base anterior: linhas atualizadas mantêm a posição,
+    removidas são descartadas e inseridas vão para o final. O resultado tem
+    os dtypes do snapshot novo.
+    """
+    base = _alinhar_tipos(anterior, delta.inseridos).set_axis(
+        chaves_registro(anterior, coluna_id, colunas_alternativas)
+    )
+    base = base[~base.index.isin(delta.removidos.index)]
+    ordem = base.index.append(delta.inseridos.index)
+
+    resultado = pd.concat(
+        [
+            base[~base.index.isin(delta.atualizados.index)],
+            delta.atualizados,
+            delta.inseridos,
+        ]
+    )
+    return resultado.loc[ordem].reset_index(drop=True)
+
+
+def gravar_delta(delta: DeltaBase, pasta: Path) -> Path | None:
+    """
+    Grava o delta em `pasta` (um Parquet por execução, com COLUNA_OPERACAO),
+    mantendo os DELTAS_MANTIDOS mais recentes. Delta vazio não gera arquivo.
+    """
+    if delta.vazio:
+        return None
+    pasta.mkdir(parents=True, exist_ok=True)
+    destino = pasta / f"delta-{datetime.now().strftime('%Y%m%dT%H%M%S%f')}.parquet"
+    tmp = destino.with_name(destino.name + ".tmp")
+    delta.como_frame().to_parquet(tmp, index=False)
+    os.replace(tmp, destino)
+
+    for antigo in listar_deltas(pasta)[:-DELTAS_MANTIDOS]:
+        antigo.unlink(missing_ok=True)
+    return destino
+
+
+def listar_deltas(pasta: Path) -> list[Path]:
+    """Arquivos de delta da pasta, do mais antigo para o mais recente."""
+    if not pasta.exists():
+        return []
+    return sorted(pasta.glob("delta-*.parquet"))
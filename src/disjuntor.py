@@ -0,0 +1,67 @@
+"""
+Disjuntor (circuit breaker) para serviços remotos.
+
+Depois de `limite` falhas consecutivas o disjuntor abre e permitir() devolve
+False por `espera` segundos, para que as leituras usem a alternativa local
+sem esperar o prazo do serviço a cada vez. Passada a espera, uma única
+chamada de teste é liberada (meio aberto): se der certo o disjuntor fecha, se
+falhar volta a abrir.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable
+
+FECHADO = "fechado"
+ABERTO = "aberto"
+MEIO_ABERTO = "meio aberto"
+
+
+class Disjuntor:
+    def __init__(self, nome: str, limite: int = 3, espera: float = 60.0, relogio: Callable[[], float] = time.monotonic):
+        self.nome = nome
+        self.limite = limite
+        self.espera = espera
+        self._relogio = relogio
+        self._lock = threading.Lock()
+        self._falhas = 0
+        self._aberto_em: float | None = None
+        self._testando = False
+
+    @property
+    def estado(self) -> str:
+        with self._lock:
+            return self._estado()
+
+    def _estado(self) -> str:
+        if self._aberto_em is None:
+            return FECHADO
+        if self._relogio() - self._aberto_em < self.espera:
+            return ABERTO
+        return MEIO_ABERTO
+
+    def permitir(self) -> bool:
+        """Indica se a chamada ao serviço pode ser feita agora."""
+        with self._lock:
+            estado = self._estado()
+            if estado == FECHADO:
+                return True
+            if estado == MEIO_ABERTO and not self._testando:
+                self._testando = True
+                return True
+            return False
+
+    def registrar_sucesso(self) -> None:
+        with self._lock:
+            self._falhas = 0
+            self._aberto_em = None
+            self._testando = False
+
+    def registrar_falha(self) -> None:
+        with self._lock:
+            self._falhas += 1
+            if self._testando or self._falhas >= self.limite:
+                self._aberto_em = self._relogio()
+            self._testando = False
@@ -0,0 +1,312 @@
+"""
+Espelho local das coleções do Firestore.
+
+carregar_colecao lê a coleção de um Parquet em data/cache/firestore
+(DIR_ESPELHO), atualizado a partir do Firestore antes da leitura:
+
+- sem espelho, a coleção inteira é baixada e gravada;
+- com espelho, o documento de controle da coleção (gravado por
+  src.pipeline.sincronizar_base) é lido primeiro; se não mudou desde a última
+  atualização, nada mais é consultado;
+- caso contrário, só os documentos com CAMPO_ATUALIZACAO a partir da marca
+  d'água (o maior valor do espelho, menos MARGEM_MARCA) são baixados e
+  substituem as linhas de mesmo ID;
+- se a quantidade de documentos do controle não bate com a do espelho, os IDs
+  da coleção são listados (sem o conteúdo) e as linhas de documentos
+  removidos são descartadas;
+- coleções gravadas em blocos (modo "blocos" no controle) são relidas
+  inteiras, do manifesto e dos blocos (load_dataframe_chunks).
+
+A margem cobre documentos de uma sincronização ainda em andamento e relógios
+diferentes entre as máquinas que executam o loader. Se o Firestore falhar, o
+espelho existente é usado como está.
+
+Com o Firestore disponível, as coleções lidas ficam em memória no processo
+(OuvinteColecoes): um listener (on_snapshot) na coleção de controle recebe o
+fim de cada sincronização, atualiza o espelho e a cópia em memória da coleção
+e incrementa a versão dela. As páginas incluem versao_colecao na chave de
+st.cache_data, então passam a ver os dados novos sem reler a coleção inteira.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+import pyarrow.parquet as pq
+import streamlit as st
+
+from src.data_paths import DIR_ESPELHO
+from src.firebase_client import (
+    CAMPO_ATUALIZACAO,
+    COLECAO_CONTROLE,
+    MODO_BLOCOS,
+    dataframe_from_pages,
+    get_client,
+    is_configured,
+    iter_collection_pages,
+    list_document_ids,
+    load_dataframe_chunks,
+    read_control,
+)
+from src.planilhas_preparadas import tabela_arrow
+from src.utils import log
+
+COLUNA_ID = "_id"
+MARGEM_MARCA = timedelta(minutes=10)
+# documento de controle vigente na última atualização do espelho
+CHAVE_CONTROLE = b"siave.controle"
+
+_lock = threading.Lock()
+_locks_colecao: dict[str, threading.Lock] = {}
+
+
+def arquivo_espelho(colecao: str, pasta: Path = DIR_ESPELHO) -> Path:
+    return pasta / f"{colecao}.parquet"
+
+
+def _lock_colecao(colecao: str) -> threading.Lock:
+    with _lock:
+        return _locks_colecao.setdefault(colecao, threading.Lock())
+
+
+def _controle_texto(controle: dict[str, Any] | None) -> str | None:
+    if controle is None:
+        return None
+    return json.dumps(controle, default=str, sort_keys=True)
+
+
+def _controle_espelho(caminho: Path) -> str | None:
+    valor = (pq.read_schema(caminho).metadata or {}).get(CHAVE_CONTROLE)
+    return valor.decode() if valor else None
+
+
+def marca_dagua(df: pd.DataFrame) -> datetime | None:
+    """Maior CAMPO_ATUALIZACAO do espelho; None se nenhum documento tiver o campo."""
+    if CAMPO_ATUALIZACAO not in df.columns:
+        return None
+    marca = pd.to_datetime(df[CAMPO_ATUALIZACAO], utc=True, errors="coerce").max()
+    return None if pd.isna(marca) else marca.to_pydatetime()
+
+
+def _gravar(df: pd.DataFrame, caminho: Path, controle: str | None) -> None:
+    tabela = tabela_arrow(df.reset_index(drop=True))
+    metadados = dict(tabela.schema.metadata or {})
+    if controle is not None:
+        metadados[CHAVE_CONTROLE] = controle.encode()
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    tmp = caminho.with_name(caminho.name + ".tmp")
+    try:
+        pq.write_table(tabela.replace_schema_metadata(metadados), tmp)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    os.replace(tmp, caminho)
+
+
+def _baixar(colecao: str, desde: datetime | None = None) -> pd.DataFrame:
+    return dataframe_from_pages(iter_collection_pages(colecao, updated_since=desde, id_field=COLUNA_ID))
+
+
+def _atualizar(colecao: str, caminho: Path) -> None:
+    controle = read_control(colecao)
+    texto = _controle_texto(controle)
+    if caminho.exists() and texto is not None and _controle_espelho(caminho) == texto:
+        return
+
+    if (controle or {}).get("modo") == MODO_BLOCOS:
+        # a base inteira em poucos documentos: relê todos os blocos
+        df = load_dataframe_chunks(colecao)
+        if df is None:
+            raise RuntimeError(f"Manifesto dos blocos de '{colecao}' não encontrado.")
+        log(f"Espelho '{colecao}': {len(df)} linhas lidas em blocos.")
+        _gravar(df, caminho, texto)
+        return
+
+    anterior = pd.read_parquet(caminho) if caminho.exists() else None
+    marca = marca_dagua(anterior) if anterior is not None else None
+    if anterior is None or marca is None:
+        df = _baixar(colecao)
+        log(f"Espelho '{colecao}': {len(df)} documentos baixados.")
+    else:
+        novos = _baixar(colecao, marca - MARGEM_MARCA)
+        df = anterior
+        if not novos.empty:
+            df = pd.concat([anterior[~anterior[COLUNA_ID].isin(novos[COLUNA_ID])], novos], ignore_index=True)
+        documentos = (controle or {}).get("documentos")
+        removidos = 0
+        if documentos is None or documentos != len(df):
+            ids = list_document_ids(colecao) or set()
+            mantidos = df[COLUNA_ID].isin(ids)
+            removidos = int((~mantidos).sum())
+            df = df[mantidos]
+        log(f"Espelho '{colecao}': {len(novos)} documentos recebidos desde a marca d'água, {removidos} removidos.")
+    _gravar(df, caminho, texto)
+
+
+def atualizar_espelho(colecao: str, pasta: Path = DIR_ESPELHO) -> Path | None:
+    """
+    Atualiza o espelho da coleção e devolve o caminho do Parquet; None sem
+    Firestore. Se a atualização falhar, devolve o espelho anterior, se houver.
+    """
+    if not is_configured():
+        return None
+    caminho = arquivo_espelho(colecao, pasta)
+    with _lock_colecao(colecao):
+        try:
+            _atualizar(colecao, caminho)
+        except Exception as exc:
+            if not caminho.exists():
+                raise
+            log(f"Espelho '{colecao}' não atualizado, usando a cópia local: {exc}")
+    return caminho
+
+
+def _ler_espelho(caminho: Path, campos: tuple[str, ...] | None = None) -> pd.DataFrame:
+    internas = (COLUNA_ID, CAMPO_ATUALIZACAO)
+    colunas = [
+        c for c in pq.read_schema(caminho).names if c not in internas and (campos is None or c in campos)
+    ]
+    return pd.read_parquet(caminho, columns=colunas)
+
+
+class OuvinteColecoes:
+    """
+    Cópias em memória das coleções lidas no processo, atualizadas pelo
+    listener da coleção de controle. A versão de uma coleção só é
+    incrementada depois que a cópia nova está pronta, então um cache com a
+    versão na chave nunca guarda dados antigos sob a versão nova.
+    """
+
+    def __init__(self, pasta: Path = DIR_ESPELHO):
+        self.pasta = pasta
+        self._lock = threading.Lock()
+        self._locks: dict[str, threading.Lock] = {}
+        self._copias: dict[str, pd.DataFrame] = {}
+        self._versoes: dict[str, int] = {}
+        self._controles: dict[str, str | None] = {}
+        self._inscricao: Any | None = None
+
+    def iniciar(self, db: Any) -> None:
+        self._inscricao = db.collection(COLECAO_CONTROLE).on_snapshot(self._ao_mudar)
+
+    def parar(self) -> None:
+        if self._inscricao is not None:
+            self._inscricao.unsubscribe()
+            self._inscricao = None
+
+    def _lock_colecao(self, colecao: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(colecao, threading.Lock())
+
+    def versao(self, colecao: str) -> int:
+        with self._lock:
+            return self._versoes.get(colecao, 0)
+
+    def ler(self, colecao: str) -> pd.DataFrame:
+        """Cópia em memória da coleção (sem as colunas internas do espelho)."""
+        with self._lock_colecao(colecao):
+            df = self._copias.get(colecao)
+            if df is None:
+                caminho = atualizar_espelho(colecao, self.pasta)
+                df = _ler_espelho(caminho) if caminho is not None else pd.DataFrame()
+                self._copias[colecao] = df
+            return df
+
+    def _ao_mudar(self, docs: list, changes: list, read_time: Any) -> None:
+        # chamado na thread do listener; uma falha aqui encerraria o listener
+        for change in changes:
+            colecao = change.document.id
+            dados = change.document.to_dict() or {}
+            if change.type.name != "REMOVED" and dados.get("documentos") is None:
+                continue  # sincronização em andamento
+            texto = _controle_texto(dados)
+            with self._lock:
+                if self._controles.get(colecao) == texto:
+                    continue
+                self._controles[colecao] = texto
+            try:
+                self._recarregar(colecao)
+            except Exception as exc:
+                log(f"Coleção '{colecao}' não recarregada após a sincronização: {exc}")
+
+    def _recarregar(self, colecao: str) -> None:
+        with self._lock_colecao(colecao):
+            if colecao in self._copias:
+                caminho = atualizar_espelho(colecao, self.pasta)
+                self._copias[colecao] = _ler_espelho(caminho) if caminho is not None else pd.DataFrame()
+            with self._lock:
+                self._versoes[colecao] = self._versoes.get(colecao, 0) + 1
+        log(f"Coleção '{colecao}' sincronizada; versão {self.versao(colecao)}.")
+
+
+@st.cache_resource(show_spinner=False)
+def ouvinte_colecoes() -> OuvinteColecoes | None:
+    """Ouvinte único do processo; None sem Firestore ou sem suporte a listeners."""
+    db = get_client()
+    if db is None:
+        return None
+    ouvinte = OuvinteColecoes()
+    try:
+        ouvinte.iniciar(db)
+    except Exception as exc:
+        log(f"Listener do Firestore indisponível: {exc}")
+        return None
+    return ouvinte
+
+
+def versao_colecao(colecao: str) -> int:
+    """Versão da coleção no processo, para a chave de st.cache_data das páginas."""
+    ouvinte = ouvinte_colecoes()
+    return ouvinte.versao(colecao) if ouvinte is not None else 0
+
+
+@st.cache_data(show_spinner=False)
+def _carregar_colecao_espelho(colecao: str, campos: tuple[str, ...] | None = None) -> pd.DataFrame:
+    caminho = atualizar_espelho(colecao)
+    return _ler_espelho(caminho, campos) if caminho is not None else pd.DataFrame()
+
+
+def ler_colecao(
+    colecao: str, campos: tuple[str, ...] | None = None, ouvinte: OuvinteColecoes | None = None
+) -> pd.DataFrame:
+    """
+    Como carregar_colecao, mas sem chamadas ao Streamlit e propagando os erros
+    do Firestore, para leituras em outra thread (ver src.leitura_bases).
+    """
+    if ouvinte is None:
+        caminho = atualizar_espelho(colecao)
+        return _ler_espelho(caminho, campos) if caminho is not None else pd.DataFrame()
+    df = ouvinte.ler(colecao)
+    if campos is not None:
+        df = df[[c for c in df.columns if c in campos]]
+    # a cópia é compartilhada entre as sessões
+    return df.copy()
+
+
+def ler_espelho_local(colecao: str, campos: tuple[str, ...] | None = None) -> pd.DataFrame:
+    """Espelho gravado em disco, sem consultar o Firestore; vazio se não houver."""
+    caminho = arquivo_espelho(colecao)
+    return _ler_espelho(caminho, campos) if caminho.exists() else pd.DataFrame()
+
+
+def carregar_colecao(colecao: str, campos: tuple[str, ...] | None = None) -> pd.DataFrame:
+    """
+    Lê a coleção do Firestore pelo espelho local. Mesmo contrato de
+    load_collection_df: só os `campos` pedidos e DataFrame vazio sem Firestore
+    ou com a coleção vazia. Com o listener ativo, a leitura vem da cópia em
+    memória, atualizada a cada sincronização.
+    """
+    try:
+        ouvinte = ouvinte_colecoes()
+        if ouvinte is None:
+            return _carregar_colecao_espelho(colecao, campos)
+        return ler_colecao(colecao, campos, ouvinte)
+    except Exception as exc:
+        st.warning(f"Erro ao ler coleção '{colecao}' no Firestore: {exc}")
+        return pd.DataFrame()
@@ -0,0 +1,280 @@
+"""
+Tipos das colunas de texto das bases processadas.
+
+Cada base tem um esquema explícito: colunas de baixa cardinalidade (GRE, polo,
+município, série, turno, rede, situação...) são categóricas, gravadas no
+Parquet como colunas dictionary do Arrow; os demais textos (códigos, nomes de
+escola e turma, telefones) usam string do pyarrow. Como o schema do Arrow vai
+no arquivo, a leitura pelas páginas já devolve os mesmos dtypes. Colunas
+numéricas e de data mantêm os tipos produzidos pelo loader.
+
+Uso (relatório de memória das bases publicadas):
+    python -m src.esquemas [pasta]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+
+from src.data_paths import (
+    ARQ_BASE_AGENDAMENTOS,
+    ARQ_BASE_APLICACOES_PRESENCA,
+    ARQ_BASE_CUBO_ESTRUTURAL,
+    ARQ_BASE_FINAL,
+    ARQ_BASE_FINAL_NORMALIZADO,
+    ARQ_BASE_PENDENTES,
+    ARQ_BASE_PRESENCA,
+    DATA_PROCESSADO,
+)
+
+CATEGORIA = "categoria"
+TEXTO = "texto"
+
+TIPO_TEXTO = pd.StringDtype("pyarrow")
+
+# nomes das colunas como publicados (após normalize_columns, exceto presença e
+# estrutural normalizado, que mantêm os nomes camelCase)
+ESQUEMAS: dict[str, dict[str, str]] = {
+    "estrutural": {
+        "uf": CATEGORIA,
+        "polo": CATEGORIA,
+        "coescolacenso": TEXTO,
+        "escola": TEXTO,
+        "municipio": CATEGORIA,
+        "localizacao": CATEGORIA,
+        "rede": CATEGORIA,
+        "telefone1": TEXTO,
+        "telefone2": TEXTO,
+        "coturmacenso": TEXTO,
+        "turma": TEXTO,
+        "serie": CATEGORIA,
+        "turno": CATEGORIA,
+        "observacoesdaescola": TEXTO,
+        "temciencias": CATEGORIA,
+        "gre": CATEGORIA,
+        "diaaplicacao": CATEGORIA,
+    },
+    "estrutural_normalizado": {
+        "uF": CATEGORIA,
+        "polo": CATEGORIA,
+        "coEscolaCenso": TEXTO,
+        "escola": TEXTO,
+        "municipio": CATEGORIA,
+        "localizacao": CATEGORIA,
+        "rede": CATEGORIA,
+        "telefone1": TEXTO,
+        "telefone2": TEXTO,
+        "coTurmaCenso": TEXTO,
+        "turma": TEXTO,
+        "serie": CATEGORIA,
+        "turno": CATEGORIA,
+        "observacoesDaEscola": TEXTO,
+        "temCiencias": CATEGORIA,
+        "gRE": CATEGORIA,
+        "diaAplicacao": CATEGORIA,
+        "municipio_norm": CATEGORIA,
+    },
+    "agendamentos": {
+        "uf": CATEGORIA,
+        "polo": CATEGORIA,
+        "coescolacenso": TEXTO,
+        "coturmacenso": TEXTO,
+        "escola": TEXTO,
+        "municipio": CATEGORIA,
+        "turma": TEXTO,
+        "serie": CATEGORIA,
+        "turno": CATEGORIA,
+        "tipoaplic": CATEGORIA,
+        "statusaplicacao": CATEGORIA,
+        "localizacao": CATEGORIA,
+        "tiporede": CATEGORIA,
+        "aplicador": TEXTO,
+        "cpf": TEXTO,
+        "diaaplicacao": CATEGORIA,
+        "gre": CATEGORIA,
+        "aplicacaoid": TEXTO,
+    },
+    "presenca": {
+        "uf": CATEGORIA,
+        "polo": CATEGORIA,
+        "coEscolaCenso": TEXTO,
+        "escola": TEXTO,
+        "municipio": CATEGORIA,
+        "tipoRede": CATEGORIA,
+        "localizacao": CATEGORIA,
+        "diaAplicacao": CATEGORIA,
+        "serie": CATEGORIA,
+        "tipoAplic": CATEGORIA,
+        "turno": CATEGORIA,
+        "coTurmaCenso": TEXTO,
+        "turma": TEXTO,
+        "gRE": CATEGORIA,
+    },
+    # colunas de agendamentos após prep (src.aplicacoes_presenca)
+    "aplicacoes_presenca": {
+        "uf": CATEGORIA,
+        "polo": CATEGORIA,
+        "coEscolaCenso": TEXTO,
+        "coTurmaCenso": TEXTO,
+        "escola": TEXTO,
+        "municipio": CATEGORIA,
+        "turma": TEXTO,
+        "serie": CATEGORIA,
+        "turno": CATEGORIA,
+        "tipoaplic": CATEGORIA,
+        "statusaplicacao": CATEGORIA,
+        "localizacao": CATEGORIA,
+        "tiporede": CATEGORIA,
+        "aplicador": TEXTO,
+        "cpf": TEXTO,
+        "diaAplicacao": CATEGORIA,
+        "gRE": CATEGORIA,
+        "aplicacaoid": TEXTO,
+    },
+    # níveis do cubo de contagens (src.cubo_estrutural)
+    "cubo_estrutural": {
+        "GRE": CATEGORIA,
+        "polo": CATEGORIA,
+        "municipio": CATEGORIA,
+        "escola": TEXTO,
+        "coEscolaCenso": TEXTO,
+        "serie": CATEGORIA,
+        "turno": CATEGORIA,
+        "nivel": CATEGORIA,
+    },
+    # planilha de pendências tem colunas variáveis; só as de agrupamento
+    "pendentes": {
+        "gre": CATEGORIA,
+        "polo": CATEGORIA,
+        "municipio": CATEGORIA,
+        "cidade": CATEGORIA,
+    },
+}
+
+# coluna usada para medir o groupby no relatório, a primeira presente na base
+COLUNAS_GROUPBY = ["gre", "gRE", "polo"]
+
+BASE_POR_ARQUIVO = {
+    ARQ_BASE_FINAL.name: "estrutural",
+    ARQ_BASE_FINAL_NORMALIZADO.name: "estrutural_normalizado",
+    ARQ_BASE_AGENDAMENTOS.name: "agendamentos",
+    ARQ_BASE_PRESENCA.name: "presenca",
+    ARQ_BASE_APLICACOES_PRESENCA.name: "aplicacoes_presenca",
+    ARQ_BASE_CUBO_ESTRUTURAL.name: "cubo_estrutural",
+    ARQ_BASE_PENDENTES.name: "pendentes",
+}
+
+
+def aplicar_esquema(df: pd.DataFrame, base: str) -> pd.DataFrame:
+    """
+    Converte as colunas de texto de `df` para os dtypes de ESQUEMAS[base].
+    Colunas fora do esquema (ou ausentes em `df`) não são alteradas.
+    """
+    conversoes = {}
+    for coluna, tipo in ESQUEMAS.get(base, {}).items():
+        if coluna not in df.columns:
+            continue
+        serie = df[coluna]
+        if tipo == CATEGORIA and not isinstance(serie.dtype, pd.CategoricalDtype):
+            # categorias sempre textuais, para gravar como dictionary<string>
+            conversoes[coluna] = serie.astype(TIPO_TEXTO).astype("category")
+        elif tipo == TEXTO and serie.dtype != TIPO_TEXTO:
+            conversoes[coluna] = serie.astype(TIPO_TEXTO)
+    if conversoes:
+        df = df.assign(**conversoes)
+    return ordenar_categorias(df)
+
+
+def ordenar_categorias(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Ordena as categorias das colunas categóricas. Dicionários unificados de
+    vários row groups ou partições vêm na ordem em que os valores aparecem, e
+    groupby/sort_values seguem a ordem das categorias, não a alfabética.
+    """
+    conversoes = {}
+    for coluna in df.columns:
+        dtype = df[coluna].dtype
+        if isinstance(dtype, pd.CategoricalDtype) and not dtype.categories.is_monotonic_increasing:
+            conversoes[coluna] = df[coluna].cat.reorder_categories(dtype.categories.sort_values())
+    if not conversoes:
+        return df
+    return df.assign(**conversoes)
+
+
+def tipos_arrow(base: str) -> dict[str, pa.DataType]:
+    """
+    Tipos do Arrow das colunas do esquema da base. Os índices das colunas
+    dictionary são fixados em int32, para que blocos gravados no mesmo arquivo
+    possam ter mais categorias que o primeiro.
+    """
+    return {
+        coluna: pa.dictionary(pa.int32(), pa.large_string()) if tipo == CATEGORIA else pa.large_string()
+        for coluna, tipo in ESQUEMAS.get(base, {}).items()
+    }
+
+
+def memoria_mb(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / 1024**2
+
+
+def _groupby_ms(df: pd.DataFrame, coluna: str, repeticoes: int = 5) -> float:
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        df.groupby(coluna, observed=True).size()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor * 1000
+
+
+def relatorio_memoria(bases: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Memória de cada base com as colunas do esquema como object (como as
+    páginas recebiam antes) e com os dtypes do esquema, e o tempo de um
+    groupby por GRE (ou polo) nos dois casos.
+    """
+    linhas = []
+    for nome, df in bases.items():
+        colunas = [c for c in ESQUEMAS.get(nome, {}) if c in df.columns]
+        como_object = df.astype({c: object for c in colunas})
+        tipada = aplicar_esquema(df, nome)
+        antes, depois = memoria_mb(como_object), memoria_mb(tipada)
+        linha = {
+            "base": nome,
+            "linhas": len(df),
+            "colunas_tipadas": len(colunas),
+            "mb_object": round(antes, 2),
+            "mb_esquema": round(depois, 2),
+            "reducao": f"{1 - depois / antes:.0%}" if antes else "-",
+        }
+        agrupar = next((c for c in COLUNAS_GROUPBY if c in colunas), None)
+        if agrupar:
+            linha["groupby"] = agrupar
+            linha["ms_object"] = round(_groupby_ms(como_object, agrupar), 2)
+            linha["ms_esquema"] = round(_groupby_ms(tipada, agrupar), 2)
+        linhas.append(linha)
+    return pd.DataFrame(linhas)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pasta", nargs="?", type=Path, default=DATA_PROCESSADO)
+    args = parser.parse_args()
+
+    # import local: src.snapshots depende deste módulo (via src.dataset_particionado)
+    from src.snapshots import resolver_arquivo
+
+    # as bases publicadas ficam no snapshot apontado pelo manifest da pasta
+    arquivos = {nome: resolver_arquivo(args.pasta / arquivo) for arquivo, nome in BASE_POR_ARQUIVO.items()}
+    bases = {nome: pd.read_parquet(arquivo) for nome, arquivo in arquivos.items() if arquivo.exists()}
+    if not bases:
+        raise SystemExit(f"Nenhuma base processada em {args.pasta}")
+    print(relatorio_memoria(bases).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
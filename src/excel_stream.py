@@ -0,0 +1,205 @@
+"""
+Leitura de planilhas Excel em blocos com memória constante.
+
+Usa o modo read-only do openpyxl para iterar as linhas sem carregar a pasta de
+trabalho inteira e entrega DataFrames de tamanho limitado. As células passam
+pela mesma conversão e pelo mesmo TextParser usados por pd.read_excel, de modo
+que cada bloco tem os tipos que a leitura completa produziria (a inferência de
+tipos, porém, é feita por bloco). Os blocos transformados são gravados como
+row groups de um único Parquet.
+"""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from openpyxl import load_workbook
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+from pandas.io.parsers import TextParser
+
+LINHAS_POR_BLOCO = 20_000
+
+
+def _converter_celula(cell) -> Any:
+    """Mesma conversão de pandas (OpenpyxlReader._convert_cell)."""
+    if cell.value is None:
+        return ""
+    if cell.data_type == TYPE_ERROR:
+        return np.nan
+    if cell.data_type == TYPE_NUMERIC:
+        val = int(cell.value)
+        if val == cell.value:
+            return val
+        return float(cell.value)
+    return cell.value
+
+
+def _converter_linha(row) -> list[Any]:
+    convertida = [_converter_celula(cell) for cell in row]
+    while convertida and convertida[-1] == "":
+        convertida.pop()
+    return convertida
+
+
+def _montar_bloco(cabecalho: list[Any], linhas: list[list[Any]]) -> pd.DataFrame:
+    largura = len(cabecalho)
+    dados = [cabecalho] + [(linha + [""] * largura)[:largura] for linha in linhas]
+    parser = TextParser(dados, header=0, skip_blank_lines=False)
+    return parser.read()
+
+
+def ler_cabecalho(path: Path | BinaryIO) -> list[str]:
+    """Nomes das colunas da primeira aba, lendo só a primeira linha."""
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        ws.reset_dimensions()
+        cabecalho = next((_converter_linha(row) for row in ws.iter_rows(max_row=1)), [])
+    finally:
+        wb.close()
+    return [str(c).strip() for c in cabecalho]
+
+
+def iter_excel_blocos(path: Path, linhas_por_bloco: int = LINHAS_POR_BLOCO) -> Iterator[pd.DataFrame]:
+    """
+    Itera a primeira aba da planilha em DataFrames de até `linhas_por_bloco` linhas.
+
+    Linhas vazias no meio da planilha viram linhas NaN (como em pd.read_excel);
+    linhas vazias no final são descartadas.
+    """
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        ws.reset_dimensions()
+        linhas = ws.iter_rows()
+        cabecalho = next((_converter_linha(row) for row in linhas), [])
+        if not cabecalho:
+            return
+
+        bloco: list[list[Any]] = []
+        vazias: list[list[Any]] = []
+        for row in linhas:
+            convertida = _converter_linha(row)
+            if not convertida:
+                # só entra no bloco se aparecer uma linha com dados depois
+                vazias.append(convertida)
+                continue
+            bloco.extend(vazias)
+            vazias = []
+            bloco.append(convertida)
+            if len(bloco) >= linhas_por_bloco:
+                yield _montar_bloco(cabecalho, bloco)
+                bloco = []
+        if bloco:
+            yield _montar_bloco(cabecalho, bloco)
+    finally:
+        wb.close()
+
+
+def schema_arrow(df: pd.DataFrame, tipos: dict[str, pa.DataType] | None = None) -> pa.Schema:
+    """Schema Arrow de `df`, com as colunas de `tipos` fixadas nos tipos informados."""
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    for coluna, tipo in (tipos or {}).items():
+        if coluna in schema.names:
+            i = schema.get_field_index(coluna)
+            schema = schema.set(i, schema.field(i).with_type(tipo))
+    return schema
+
+
+def ordenar_dicionarios(origem: Path, destino: Path) -> bool:
+    """
+    Regrava o Parquet `origem` em `destino` com um único dicionário ordenado
+    por coluna dictionary, comum a todos os row groups. Cada bloco gravado
+    traz só as categorias que contém, e a leitura unificaria os dicionários na
+    ordem em que os valores aparecem; com o dicionário comum, o arquivo lê como
+    o gravado de uma vez a partir do DataFrame inteiro. Lê um row group por
+    vez. Devolve False (sem gravar) se não houver colunas dictionary.
+    """
+    arquivo = pq.ParquetFile(origem)
+    colunas = [campo.name for campo in arquivo.schema_arrow if pa.types.is_dictionary(campo.type)]
+    if not colunas:
+        return False
+    valores: dict[str, set] = {coluna: set() for coluna in colunas}
+    for i in range(arquivo.num_row_groups):
+        grupo = arquivo.read_row_group(i, columns=colunas)
+        for coluna in colunas:
+            for parte in grupo.column(coluna).chunks:
+                valores[coluna].update(parte.dictionary.to_pylist())
+
+    schema = arquivo.schema_arrow
+    dicionarios = {
+        coluna: pa.array(sorted(valores[coluna]), schema.field(coluna).type.value_type) for coluna in colunas
+    }
+    with pq.ParquetWriter(destino, schema) as writer:
+        for i in range(arquivo.num_row_groups):
+            grupo = arquivo.read_row_group(i)
+            for coluna, dicionario in dicionarios.items():
+                tipo = schema.field(coluna).type
+                partes = [
+                    pa.DictionaryArray.from_arrays(
+                        pc.index_in(parte.dictionary, value_set=dicionario).take(parte.indices).cast(tipo.index_type),
+                        dicionario,
+                    )
+                    for parte in grupo.column(coluna).chunks
+                ]
+                j = grupo.schema.get_field_index(coluna)
+                grupo = grupo.set_column(j, schema.field(coluna), pa.chunked_array(partes, tipo))
+            writer.write_table(grupo)
+    return True
+
+
+def gravar_parquet_em_blocos(
+    blocos: Iterable[pd.DataFrame],
+    destino: Path,
+    gerar_vazio: Callable[[], pd.DataFrame],
+    tipos: dict[str, pa.DataType] | None = None,
+) -> int:
+    """
+    Grava cada bloco como um row group do Parquet `destino` e devolve o total de linhas.
+
+    O arquivo é escrito em um .tmp e só substitui o destino ao final, então uma
+    falha no meio não deixa Parquet parcial. `gerar_vazio` produz o DataFrame
+    vazio com o schema da base, usado quando a planilha não tem linhas.
+    O schema do arquivo é o do primeiro bloco, com as colunas de `tipos` fixadas
+    nos tipos informados (uma coluna toda vazia no primeiro bloco, por exemplo,
+    não define o tipo dos demais). Ao final, os dicionários das colunas
+    dictionary são unificados e ordenados (ordenar_dicionarios), para que o
+    arquivo tenha o schema e as categorias da gravação do DataFrame inteiro.
+    """
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    tmp = destino.with_name(destino.name + ".tmp")
+    ordenado = destino.with_name(destino.name + ".ordenado.tmp")
+    writer: pq.ParquetWriter | None = None
+    total = 0
+    try:
+        for df in blocos:
+            if writer is None:
+                tabela = pa.Table.from_pandas(df, schema=schema_arrow(df, tipos), preserve_index=False)
+                writer = pq.ParquetWriter(tmp, tabela.schema)
+            else:
+                tabela = pa.Table.from_pandas(df, schema=writer.schema, preserve_index=False)
+            writer.write_table(tabela)
+            total += len(df)
+        if writer is None:
+            vazio = gerar_vazio()
+            pq.write_table(pa.Table.from_pandas(vazio, schema=schema_arrow(vazio, tipos), preserve_index=False), tmp)
+        else:
+            writer.close()
+            writer = None
+            if ordenar_dicionarios(tmp, ordenado):
+                os.replace(ordenado, tmp)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        tmp.unlink(missing_ok=True)
+        ordenado.unlink(missing_ok=True)
+        raise
+    os.replace(tmp, destino)
+    return total
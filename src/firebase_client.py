@@ -1,14 +1,52 @@
 from __future__ import annotations
 
+import hashlib
 import json
+import os
+import time
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
 
 import firebase_admin
 from firebase_admin import credentials, firestore
+from google.auth.credentials import AnonymousCredentials
+from google.cloud import firestore as gcf
+from google.cloud.firestore_v1.base_query import FieldFilter
+from google.cloud.firestore_v1.field_path import FieldPath
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import streamlit as st
 
+from src.firestore_lotes import Operacao, RelatorioEscrita, escrever_documentos
+
+PROJETO_EMULADOR = "demo-siave"
+
+# documentos por página na leitura paginada (load_collection_df)
+TAMANHO_PAGINA = 2000
+
+# instante da gravação, incluído em cada documento por upsert_operations; o
+# espelho local (src.espelho_firestore) busca só os documentos mais novos
+CAMPO_ATUALIZACAO = "_atualizadoEm"
+# um documento por coleção sincronizada: {"atualizadoEm": ..., "documentos": ..., "modo": ...}
+COLECAO_CONTROLE = "siave_controle"
+
+# Modos de armazenamento de uma base: um documento por linha (MODO_DOCUMENTOS)
+# ou a base inteira em Parquet comprimido, dividido em blocos abaixo do limite
+# de 1 MiB por documento, na coleção <colecao>__blocos (MODO_BLOCOS). No modo
+# em blocos, ler a base custa 1 + quantidade de blocos leituras, em vez de uma
+# por linha. O documento "manifesto" aponta para os blocos da versão atual:
+#     {"versao": ..., "blocos": ["<versao>-00000", ...], "linhas": ..., "bytes": ..., "sha256": ...}
+MODO_DOCUMENTOS = "documentos"
+MODO_BLOCOS = "blocos"
+SUFIXO_BLOCOS = "__blocos"
+DOC_MANIFESTO = "manifesto"
+TAMANHO_BLOCO = 960 * 1024
+COMPRESSAO_BLOCOS = "zstd"
+
+_client_override: Any | None = None
+
 
 @st.cache_resource(show_spinner=False)
 def get_db() -> firestore.Client | None:
@@ -16,8 +54,9 @@ def get_db() -> firestore.Client | None:
     Inicializa e retorna o cliente do Firestore.
 
     Ordem de busca das credenciais:
-    1) st.secrets["firestore"]["credentials"] (Streamlit Cloud)
-    2) arquivo local secrets/firestore_key.json
+    1) emulador, se FIRESTORE_EMULATOR_HOST estiver definida (sem credenciais)
+    2) st.secrets["firestore"]["credentials"] (Streamlit Cloud)
+    3) arquivo local secrets/firestore_key.json
 
     Se não encontrar credenciais ou ocorrer erro, retorna None e
     a aplicação deve fazer fallback para leitura via parquet.
@@ -27,16 +66,23 @@ def get_db() -> firestore.Client | None:
         if firebase_admin._apps:
             return firestore.client()
 
+        # 1) Emulador local
+        if os.environ.get("FIRESTORE_EMULATOR_HOST"):
+            return gcf.Client(
+                project=os.environ.get("GCLOUD_PROJECT", PROJETO_EMULADOR),
+                credentials=AnonymousCredentials(),
+            )
+
         cred: credentials.Certificate | None = None
 
-        # 1) Credenciais via st.secrets (ambiente Streamlit Cloud)
+        # 2) Credenciais via st.secrets (ambiente Streamlit Cloud)
         if "firestore" in st.secrets:
             secrets_section = st.secrets["firestore"]
             if "credentials" in secrets_section:
                 key_dict = json.loads(secrets_section["credentials"])
                 cred = credentials.Certificate(key_dict)
 
-        # 2) Credenciais via arquivo local secrets/firestore_key.json
+        # 3) Credenciais via arquivo local secrets/firestore_key.json
         if cred is None:
             cred_path = Path("secrets") / "firestore_key.json"
             if cred_path.exists():
@@ -54,8 +100,19 @@ def get_db() -> firestore.Client | None:
         return None
 
 
+def set_client(db: Any | None) -> None:
+    """
+    Substitui o cliente usado pelo módulo (ex.: ClienteFirestoreFalso, de
+    src.firestore_falso); None volta a usar get_db.
+    """
+    global _client_override
+    _client_override = db
+
+
 def _safe_get_db() -> firestore.Client | None:
     """Wrapper que tenta obter o db e devolve None em caso de erro."""
+    if _client_override is not None:
+        return _client_override
     try:
         return get_db()
     except Exception as exc:
@@ -63,47 +120,336 @@ def _safe_get_db() -> firestore.Client | None:
         return None
 
 
-def save_dataframe(collection: str, df: pd.DataFrame, chunk_size: int = 400) -> None:
+def get_client() -> Any | None:
+    """Cliente em uso (o de set_client ou o de get_db); None sem Firestore."""
+    return _safe_get_db()
+
+
+def is_configured() -> bool:
+    """Indica se há um cliente do Firestore disponível."""
+    return _safe_get_db() is not None
+
+
+def _records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Linhas do DataFrame em valores aceitos pelo Firestore (ausentes viram None)."""
+    return df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+
+class FirestoreWriteError(RuntimeError):
+    """Lotes que continuaram falhando após as repetições (ver RelatorioEscrita.falhas)."""
+
+    def __init__(self, relatorio: RelatorioEscrita):
+        super().__init__(relatorio.resumo())
+        self.relatorio = relatorio
+
+
+def write_documents(collection: str, operations: Iterable[Operacao]) -> RelatorioEscrita | None:
+    """
+    Aplica as operações (id, dados) na coleção com src.firestore_lotes e
+    devolve o relatório; None sem Firestore. Lança FirestoreWriteError se
+    algum lote falhar.
+    """
+    db = _safe_get_db()
+    if db is None:
+        return None
+    relatorio = escrever_documentos(db, collection, operations)
+    if relatorio.falhas:
+        raise FirestoreWriteError(relatorio)
+    return relatorio
+
+
+def upsert_operations(
+    df: pd.DataFrame, ids: Sequence[str], updated_at: datetime | None = None
+) -> Iterator[Operacao]:
+    """
+    Operações que gravam cada linha de `df` no documento de ID correspondente
+    em `ids`, com CAMPO_ATUALIZACAO = `updated_at` (por padrão, agora em UTC).
+    """
+    if len(ids) != len(df):
+        raise ValueError(f"upsert_operations: {len(ids)} IDs para {len(df)} linhas")
+    updated_at = updated_at or datetime.now(timezone.utc)
+    return ((doc_id, {**row, CAMPO_ATUALIZACAO: updated_at}) for doc_id, row in zip(list(ids), _records(df)))
+
+
+def save_dataframe(collection: str, df: pd.DataFrame) -> RelatorioEscrita | None:
     """
     Envia um DataFrame para o Firestore, criando documentos com IDs automáticos.
+    Cada chamada acrescenta os documentos à coleção; para manter a coleção
+    igual à base, use upsert_dataframe.
 
     - collection: nome da coleção (ex.: 'siave_estrutural')
     - df: DataFrame a ser persistido
-    - chunk_size: quantidade de documentos por batch
+    """
+    if df is None or df.empty:
+        return None
+    return write_documents(collection, ((None, row) for row in _records(df)))
+
+
+def upsert_dataframe(
+    collection: str, df: pd.DataFrame, ids: Sequence[str], updated_at: datetime | None = None
+) -> RelatorioEscrita | None:
+    """
+    Grava cada linha de `df` no documento de ID correspondente em `ids`,
+    substituindo o conteúdo anterior. Reenviar a mesma base não duplica
+    documentos.
+    """
+    if df is None or df.empty:
+        return None
+    return write_documents(collection, upsert_operations(df, ids, updated_at))
+
+
+def list_document_ids(collection: str) -> set[str] | None:
+    """IDs dos documentos da coleção, sem ler o conteúdo; None sem Firestore."""
+    db = _safe_get_db()
+    if db is None:
+        return None
+    return {doc.id for doc in db.collection(collection).list_documents()}
+
+
+def delete_documents(collection: str, ids: Iterable[str]) -> RelatorioEscrita | None:
+    """Remove os documentos de `ids` da coleção."""
+    ids = list(ids)
+    if not ids:
+        return None
+    return write_documents(collection, ((doc_id, None) for doc_id in ids))
+
+
+def write_control(collection: str, data: Dict[str, Any]) -> None:
+    """Grava o documento de controle da coleção em COLECAO_CONTROLE."""
+    write_documents(COLECAO_CONTROLE, [(collection, data)])
+
+
+def read_control(collection: str) -> Dict[str, Any] | None:
+    """Documento de controle da coleção; None se não existir ou sem Firestore."""
+    db = _safe_get_db()
+    if db is None:
+        return None
+    doc = db.collection(COLECAO_CONTROLE).document(collection).get()
+    return doc.to_dict() if doc.exists else None
+
+
+def iter_collection_pages(
+    collection: str,
+    fields: Sequence[str] | None = None,
+    page_size: int = TAMANHO_PAGINA,
+    updated_since: datetime | None = None,
+    id_field: str | None = None,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Percorre a coleção em páginas de até `page_size` documentos, ordenadas
+    pelo ID e encadeadas por cursor (start_after), e devolve o conteúdo de
+    cada página. Sem Firestore, não devolve nada.
+
+    - fields: só esses campos são pedidos ao Firestore
+    - updated_since: só documentos com CAMPO_ATUALIZACAO >= esse instante
+    - id_field: inclui o ID do documento no campo com esse nome
     """
     db = _safe_get_db()
     if db is None:
         return
-    if df is None or df.empty:
-        return
+    query = db.collection(collection)
+    if fields:
+        query = query.select(list(fields))
+    if updated_since is not None:
+        query = query.where(filter=FieldFilter(CAMPO_ATUALIZACAO, ">=", updated_since))
+        query = query.order_by(CAMPO_ATUALIZACAO)
+    query = query.order_by(FieldPath.document_id())
+
+    ultimo = None
+    while True:
+        pagina = query.limit(page_size)
+        if ultimo is not None:
+            pagina = pagina.start_after(ultimo)
+        docs = list(pagina.stream())
+        if not docs:
+            return
+        ultimo = docs[-1]
+        if id_field is None:
+            yield [doc.to_dict() or {} for doc in docs]
+        else:
+            yield [{id_field: doc.id, **(doc.to_dict() or {})} for doc in docs]
+        if len(docs) < page_size:
+            return
+
+
+_AUSENTE = float("nan")
 
-    records: List[Dict[str, Any]] = df.to_dict(orient="records")
-    for i in range(0, len(records), chunk_size):
-        batch = db.batch()
-        for row in records[i : i + chunk_size]:
-            doc_ref = db.collection(collection).document()
-            batch.set(doc_ref, row)
-        batch.commit()
+
+def dataframe_from_pages(paginas: Iterable[List[Dict[str, Any]]]) -> pd.DataFrame:
+    """
+    DataFrame das páginas de iter_collection_pages, montado com uma lista por
+    campo; documentos sem o campo recebem NaN, como em pd.DataFrame(lista de dicts).
+    """
+    colunas: Dict[str, List[Any]] = {}
+    total = 0
+    for pagina in paginas:
+        for dados in pagina:
+            for campo, valor in dados.items():
+                coluna = colunas.get(campo)
+                if coluna is None:
+                    coluna = colunas[campo] = [_AUSENTE] * total
+                coluna.append(valor)
+            total += 1
+            if len(dados) < len(colunas):
+                for coluna in colunas.values():
+                    if len(coluna) < total:
+                        coluna.append(_AUSENTE)
+    return pd.DataFrame(colunas)
 
 
 @st.cache_data(show_spinner=False)
-def load_collection_df(collection: str) -> pd.DataFrame:
+def load_collection_df(collection: str, campos: tuple[str, ...] | None = None) -> pd.DataFrame:
     """
     Lê todos os documentos de uma coleção do Firestore e devolve um DataFrame.
 
+    - campos: se informado, apenas esses campos são lidos (máscara de campos)
+    - A coleção é lida em páginas (iter_collection_pages) e o DataFrame é
+      montado coluna a coluna, sem manter todos os documentos em memória.
     - Se Firestore não estiver configurado ou a coleção estiver vazia,
       devolve DataFrame vazio (sem quebrar a aplicação).
     """
-    db = _safe_get_db()
-    if db is None:
-        return pd.DataFrame()
-
     try:
-        docs = list(db.collection(collection).stream())
-        if not docs:
-            return pd.DataFrame()
-        data = [doc.to_dict() for doc in docs]
-        return pd.DataFrame(data)
+        return dataframe_from_pages(iter_collection_pages(collection, campos))
     except Exception as exc:
         st.warning(f"Erro ao ler coleção '{collection}' no Firestore: {exc}")
         return pd.DataFrame()
+
+
+def chunks_collection(collection: str) -> str:
+    """Coleção com os blocos da base de `collection` (MODO_BLOCOS)."""
+    return collection + SUFIXO_BLOCOS
+
+
+def save_table_chunks(
+    collection: str, table: pa.Table, chunk_size: int = TAMANHO_BLOCO
+) -> Dict[str, Any] | None:
+    """
+    Grava `table` em Parquet comprimido, dividido em blocos de até
+    `chunk_size` bytes, e devolve o manifesto; None sem Firestore. Os blocos
+    novos são gravados antes do manifesto e os da versão anterior só são
+    removidos depois dele, então um leitor nunca vê uma versão incompleta.
+    """
+    db = _safe_get_db()
+    if db is None:
+        return None
+    buffer = pa.BufferOutputStream()
+    pq.write_table(table, buffer, compression=COMPRESSAO_BLOCOS)
+    dados = buffer.getvalue().to_pybytes()
+
+    destino = chunks_collection(collection)
+    anteriores = list_document_ids(destino) or set()
+    agora = datetime.now(timezone.utc)
+    versao = agora.strftime("%Y%m%dT%H%M%S%f")
+    blocos = [dados[i : i + chunk_size] for i in range(0, len(dados), chunk_size)]
+    ids = [f"{versao}-{n:05d}" for n in range(len(blocos))]
+    write_documents(destino, ((doc_id, {"versao": versao, "dados": bloco}) for doc_id, bloco in zip(ids, blocos)))
+
+    manifesto = {
+        "versao": versao,
+        "blocos": ids,
+        "linhas": table.num_rows,
+        "colunas": table.column_names,
+        "bytes": len(dados),
+        "sha256": hashlib.sha256(dados).hexdigest(),
+        "compressao": COMPRESSAO_BLOCOS,
+        CAMPO_ATUALIZACAO: agora,
+    }
+    write_documents(destino, [(DOC_MANIFESTO, manifesto)])
+    delete_documents(destino, anteriores - set(ids) - {DOC_MANIFESTO})
+    return manifesto
+
+
+def save_dataframe_chunks(collection: str, df: pd.DataFrame) -> Dict[str, Any] | None:
+    """Como save_table_chunks, a partir de um DataFrame."""
+    return save_table_chunks(collection, pa.Table.from_pandas(df, preserve_index=False))
+
+
+def load_dataframe_chunks(collection: str, fields: Sequence[str] | None = None) -> pd.DataFrame | None:
+    """
+    Remonta a base gravada em blocos (só as colunas de `fields`, se
+    informado); None sem Firestore ou sem manifesto. Se os blocos lidos
+    pertencerem a uma versão já substituída, o manifesto é lido novamente.
+    """
+    db = _safe_get_db()
+    if db is None:
+        return None
+    colecao = db.collection(chunks_collection(collection))
+    for _ in range(3):
+        doc = colecao.document(DOC_MANIFESTO).get()
+        if not doc.exists:
+            return None
+        manifesto = doc.to_dict()
+        ids = list(manifesto["blocos"])
+        blocos = {
+            bloco.id: bloco.to_dict()["dados"]
+            for bloco in db.get_all([colecao.document(doc_id) for doc_id in ids])
+            if bloco.exists
+        }
+        if len(blocos) == len(ids):
+            break
+    else:
+        raise RuntimeError(f"Blocos de '{collection}' alterados durante a leitura.")
+
+    dados = b"".join(blocos[doc_id] for doc_id in ids)
+    if hashlib.sha256(dados).hexdigest() != manifesto["sha256"]:
+        raise ValueError(f"Blocos de '{collection}' corrompidos (sha256 diferente do manifesto).")
+    colunas = [c for c in manifesto["colunas"] if c in fields] if fields else None
+    return pq.read_table(pa.BufferReader(dados), columns=colunas).to_pandas()
+
+
+def delete_collection(collection: str) -> None:
+    """Remove todos os documentos da coleção."""
+    ids = list_document_ids(collection)
+    if ids:
+        delete_documents(collection, ids)
+
+
+def compare_storage_modes(df: pd.DataFrame, collection: str) -> pd.DataFrame:
+    """
+    Grava e lê `df` nos dois modos de armazenamento, em coleções temporárias
+    (<collection>__comparacao), e devolve tempos, documentos gravados e
+    leituras de cada modo lado a lado. As coleções temporárias são removidas
+    ao final.
+    """
+    if not is_configured():
+        return pd.DataFrame()
+    alvo = collection + "__comparacao"
+    linhas = []
+    try:
+        inicio = time.perf_counter()
+        upsert_dataframe(alvo, df, [str(i) for i in range(len(df))])
+        escrita = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        lido = dataframe_from_pages(iter_collection_pages(alvo))
+        linhas.append(
+            {
+                "modo": MODO_DOCUMENTOS,
+                "linhas": len(lido),
+                "escrita_s": escrita,
+                "leitura_s": time.perf_counter() - inicio,
+                "documentos_gravados": len(df),
+                "leituras": max(len(lido), 1),
+                "bytes": None,
+            }
+        )
+
+        inicio = time.perf_counter()
+        manifesto = save_dataframe_chunks(alvo, df)
+        escrita = time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        lido = load_dataframe_chunks(alvo)
+        linhas.append(
+            {
+                "modo": MODO_BLOCOS,
+                "linhas": len(lido),
+                "escrita_s": escrita,
+                "leitura_s": time.perf_counter() - inicio,
+                "documentos_gravados": len(manifesto["blocos"]) + 1,
+                "leituras": len(manifesto["blocos"]) + 1,
+                "bytes": manifesto["bytes"],
+            }
+        )
+    finally:
+        delete_collection(alvo)
+        delete_collection(chunks_collection(alvo))
+    return pd.DataFrame(linhas)
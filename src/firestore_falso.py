@@ -0,0 +1,269 @@
+"""
+Cliente do Firestore em memória, para exercitar a sincronização sem rede.
+
+Implementa a parte da interface de google.cloud.firestore.Client usada pelo
+projeto (collection, document, get, get_all, batch, list_documents, on_snapshot e
+consultas com select, where, order_by, limit, start_after e stream) e impõe o
+limite de 500 operações por lote. `latencia` simula o tempo de cada commit e
+`falhas_transitorias` faz os primeiros commits falharem com ServiceUnavailable,
+para medir a escrita concorrente e as repetições de src.firestore_lotes:
+
+    from src.firebase_client import set_client
+    set_client(ClienteFirestoreFalso(latencia=0.05, falhas_transitorias=3))
+"""
+
+from __future__ import annotations
+
+import enum
+import itertools
+import operator
+import queue
+import threading
+import time
+import uuid
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+from google.api_core import exceptions as gexc
+
+MAX_OPERACOES_LOTE = 500
+
+_OPERADORES = {
+    "==": operator.eq,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+class _Referencia:
+    def __init__(self, colecao: _Colecao, id: str):
+        self.colecao = colecao
+        self.id = id
+
+    def get(self) -> _Documento:
+        with self.colecao.cliente.lock:
+            dados = self.colecao.documentos.get(self.id)
+        return _Documento(self, dados)
+
+
+class _Documento:
+    def __init__(self, referencia: _Referencia, dados: dict[str, Any] | None):
+        self.reference = referencia
+        self.id = referencia.id
+        self.exists = dados is not None
+        self._dados = dados
+
+    def to_dict(self) -> dict[str, Any] | None:
+        return dict(self._dados) if self._dados is not None else None
+
+    def get(self, campo: str) -> Any:
+        return self.id if campo == "__name__" else (self._dados or {}).get(campo)
+
+
+@dataclass(frozen=True)
+class _Consulta:
+    colecao: _Colecao
+    campos: tuple[str, ...] | None = None
+    filtros: tuple[tuple[str, str, Any], ...] = ()
+    ordem: tuple[str, ...] = ()
+    limite: int | None = None
+    apos: tuple[Any, ...] | None = None
+
+    def select(self, campos: list[str]) -> _Consulta:
+        return replace(self, campos=tuple(campos))
+
+    def where(self, filter: Any) -> _Consulta:
+        return replace(self, filtros=(*self.filtros, (filter.field_path, filter.op_string, filter.value)))
+
+    def order_by(self, campo: Any) -> _Consulta:
+        return replace(self, ordem=(*self.ordem, str(campo)))
+
+    def limit(self, quantidade: int) -> _Consulta:
+        return replace(self, limite=quantidade)
+
+    def start_after(self, documento: _Documento) -> _Consulta:
+        if not self.ordem:
+            raise gexc.InvalidArgument("start_after exige order_by")
+        return replace(self, apos=tuple(documento.get(c) for c in self.ordem))
+
+    def _chave(self, id: str, dados: dict[str, Any]) -> tuple[Any, ...]:
+        return tuple(id if c == "__name__" else dados.get(c) for c in self.ordem)
+
+    def stream(self):
+        with self.colecao.cliente.lock:
+            itens = list(self.colecao.documentos.items())
+        for campo, op, valor in self.filtros:
+            # como no Firestore, documentos sem o campo não entram no resultado
+            itens = [(id, d) for id, d in itens if campo in d and _OPERADORES[op](d[campo], valor)]
+        if self.ordem:
+            itens.sort(key=lambda item: self._chave(*item))
+        if self.apos is not None:
+            itens = [(id, d) for id, d in itens if self._chave(id, d) > self.apos]
+        if self.limite is not None:
+            itens = itens[: self.limite]
+        for id, dados in itens:
+            if self.campos is not None:
+                dados = {c: dados[c] for c in self.campos if c in dados}
+            yield _Documento(_Referencia(self.colecao, id), dados)
+
+
+class _TipoMudanca(enum.Enum):
+    ADDED = 1
+    MODIFIED = 2
+    REMOVED = 3
+
+
+@dataclass
+class _Mudanca:
+    type: _TipoMudanca
+    document: _Documento
+
+
+class _Inscricao:
+    # entrega as mudanças ao callback em outra thread, como o listener do Firestore
+    def __init__(self, callback: Callable[[list, list, datetime], None]):
+        self.callback = callback
+        self.fila: queue.Queue = queue.Queue()
+        threading.Thread(target=self._entregar, name="firestore-falso-listener", daemon=True).start()
+
+    def _entregar(self) -> None:
+        while True:
+            item = self.fila.get()
+            try:
+                if item is None:
+                    return
+                self.callback(*item, datetime.now(timezone.utc))
+            finally:
+                self.fila.task_done()
+
+    def notificar(self, documentos: list[_Documento], mudancas: list[_Mudanca]) -> None:
+        self.fila.put((documentos, mudancas))
+
+    def unsubscribe(self) -> None:
+        self.fila.put(None)
+
+
+class _Colecao:
+    def __init__(self, cliente: ClienteFirestoreFalso, nome: str):
+        self.cliente = cliente
+        self.nome = nome
+        self.documentos: dict[str, dict[str, Any]] = {}
+        self.inscricoes: list[_Inscricao] = []
+
+    def _snapshot(self) -> list[_Documento]:
+        return [_Documento(_Referencia(self, id), dados) for id, dados in self.documentos.items()]
+
+    def on_snapshot(self, callback: Callable[[list, list, datetime], None]) -> _Inscricao:
+        inscricao = _Inscricao(callback)
+        with self.cliente.lock:
+            documentos = self._snapshot()
+            self.inscricoes.append(inscricao)
+        inscricao.notificar(documentos, [_Mudanca(_TipoMudanca.ADDED, d) for d in documentos])
+        return inscricao
+
+    def document(self, id: str | None = None) -> _Referencia:
+        return _Referencia(self, id if id is not None else uuid.uuid4().hex[:20])
+
+    def list_documents(self) -> list[_Referencia]:
+        with self.cliente.lock:
+            return [_Referencia(self, id) for id in self.documentos]
+
+    def select(self, campos: list[str]) -> _Consulta:
+        return _Consulta(self).select(campos)
+
+    def where(self, filter: Any) -> _Consulta:
+        return _Consulta(self).where(filter)
+
+    def order_by(self, campo: Any) -> _Consulta:
+        return _Consulta(self).order_by(campo)
+
+    def limit(self, quantidade: int) -> _Consulta:
+        return _Consulta(self).limit(quantidade)
+
+    def stream(self):
+        return _Consulta(self).stream()
+
+
+class _Lote:
+    def __init__(self, cliente: ClienteFirestoreFalso):
+        self.cliente = cliente
+        self.operacoes: list[tuple[_Referencia, dict[str, Any] | None]] = []
+
+    def set(self, referencia: _Referencia, dados: dict[str, Any]) -> None:
+        self.operacoes.append((referencia, dict(dados)))
+
+    def delete(self, referencia: _Referencia) -> None:
+        self.operacoes.append((referencia, None))
+
+    def commit(self) -> None:
+        self.cliente._commit(self.operacoes)
+
+
+class ClienteFirestoreFalso:
+    def __init__(self, latencia: float = 0.0, falhas_transitorias: int = 0):
+        self.latencia = latencia
+        self.falhas_transitorias = falhas_transitorias
+        self.lock = threading.Lock()
+        self.colecoes: dict[str, _Colecao] = {}
+        self.commits = 0
+        self.commits_com_falha = 0
+        self._sequencia = itertools.count()
+
+    def collection(self, nome: str) -> _Colecao:
+        with self.lock:
+            return self.colecoes.setdefault(nome, _Colecao(self, nome))
+
+    def batch(self) -> _Lote:
+        return _Lote(self)
+
+    def get_all(self, referencias: list[_Referencia]):
+        for referencia in referencias:
+            yield referencia.get()
+
+    def _commit(self, operacoes: list[tuple[_Referencia, dict[str, Any] | None]]) -> None:
+        if len(operacoes) > MAX_OPERACOES_LOTE:
+            raise gexc.InvalidArgument(f"maximum {MAX_OPERACOES_LOTE} writes allowed per request")
+        time.sleep(self.latencia)
+        notificacoes = []
+        with self.lock:
+            if next(self._sequencia) < self.falhas_transitorias:
+                self.commits_com_falha += 1
+                raise gexc.ServiceUnavailable("falha simulada")
+            mudancas: dict[_Colecao, list[_Mudanca]] = {}
+            for referencia, dados in operacoes:
+                if "/" in referencia.id:
+                    raise gexc.InvalidArgument(f"ID de documento inválido: {referencia.id}")
+                colecao = referencia.colecao
+                anterior = colecao.documentos.get(referencia.id)
+                if dados is None:
+                    colecao.documentos.pop(referencia.id, None)
+                    if anterior is not None:
+                        mudancas.setdefault(colecao, []).append(
+                            _Mudanca(_TipoMudanca.REMOVED, _Documento(referencia, anterior))
+                        )
+                else:
+                    colecao.documentos[referencia.id] = dados
+                    tipo = _TipoMudanca.ADDED if anterior is None else _TipoMudanca.MODIFIED
+                    mudancas.setdefault(colecao, []).append(_Mudanca(tipo, _Documento(referencia, dados)))
+            self.commits += 1
+            for colecao, lista in mudancas.items():
+                if colecao.inscricoes:
+                    notificacoes.append((list(colecao.inscricoes), colecao._snapshot(), lista))
+        for inscricoes, documentos, lista in notificacoes:
+            for inscricao in inscricoes:
+                inscricao.notificar(documentos, lista)
+
+    def aguardar_notificacoes(self) -> None:
+        """Espera os callbacks de on_snapshot processarem as mudanças já feitas."""
+        with self.lock:
+            inscricoes = [i for colecao in self.colecoes.values() for i in colecao.inscricoes]
+        for inscricao in inscricoes:
+            inscricao.fila.join()
+
+    def contagem(self) -> dict[str, int]:
+        """Documentos por coleção."""
+        with self.lock:
+            return {nome: len(colecao.documentos) for nome, colecao in self.colecoes.items()}
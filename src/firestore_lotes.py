@@ -0,0 +1,200 @@
+"""
+Escrita em lote no Firestore com vários commits simultâneos.
+
+As operações (gravar ou remover um documento) são agrupadas em lotes limitados
+pela quantidade de documentos (MAX_DOCUMENTOS_LOTE) e pelo tamanho estimado
+dos documentos (MAX_BYTES_LOTE), e os lotes são enviados por um pool de
+`workers` threads. No máximo 2 * `workers` lotes ficam em memória, então a
+entrada pode ser um gerador de qualquer tamanho. Falhas transitórias
+(indisponibilidade, timeout, limite de taxa, conflito) são repetidas com
+backoff exponencial; os lotes que continuam falhando entram no relatório.
+
+Funciona com qualquer cliente com a interface de google.cloud.firestore.Client
+(collection().document(), batch()): o Firestore, o emulador
+(FIRESTORE_EMULATOR_HOST, ver src.firebase_client.get_db) ou o cliente em
+memória de src.firestore_falso.
+"""
+
+from __future__ import annotations
+
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Iterable, Iterator
+
+from google.api_core import exceptions as gexc
+
+from src.utils import log
+
+# limites do Firestore: 500 operações e 10 MiB por requisição
+MAX_DOCUMENTOS_LOTE = 500
+MAX_BYTES_LOTE = 9 * 1024 * 1024
+WORKERS = 8
+TENTATIVAS = 5
+ESPERA_INICIAL = 0.5
+ESPERA_MAXIMA = 16.0
+
+ERROS_TRANSITORIOS = (
+    gexc.ServiceUnavailable,
+    gexc.DeadlineExceeded,
+    gexc.InternalServerError,
+    gexc.TooManyRequests,
+    gexc.ResourceExhausted,
+    gexc.Aborted,
+    ConnectionError,
+    TimeoutError,
+)
+
+# (id do documento, dados); id None cria um ID automático, dados None remove o documento
+Operacao = tuple[str | None, dict[str, Any] | None]
+
+
+@dataclass
+class FalhaLote:
+    primeiro_id: str | None
+    documentos: int
+    erro: str
+
+
+@dataclass
+class RelatorioEscrita:
+    colecao: str
+    documentos: int = 0
+    lotes: int = 0
+    repeticoes: int = 0
+    segundos: float = 0.0
+    falhas: list[FalhaLote] = field(default_factory=list)
+
+    @property
+    def documentos_com_falha(self) -> int:
+        return sum(f.documentos for f in self.falhas)
+
+    @property
+    def docs_por_segundo(self) -> float:
+        return self.documentos / self.segundos if self.segundos else 0.0
+
+    def resumo(self) -> str:
+        texto = (
+            f"Firestore '{self.colecao}': {self.documentos} documentos em {self.lotes} lotes, "
+            f"{self.segundos:.2f} s ({self.docs_por_segundo:.0f} docs/s), {self.repeticoes} repetições"
+        )
+        if self.falhas:
+            texto += f", {len(self.falhas)} lotes com falha ({self.documentos_com_falha} documentos)"
+        return texto
+
+
+@dataclass
+class _ResultadoLote:
+    documentos: int
+    repeticoes: int
+    falha: FalhaLote | None = None
+
+
+def _tamanho_valor(valor: Any) -> int:
+    # tamanhos de armazenamento do Firestore (aproximados)
+    if valor is None or isinstance(valor, bool):
+        return 1
+    if isinstance(valor, (int, float, datetime, date)):
+        return 8
+    if isinstance(valor, str):
+        return len(valor.encode("utf-8")) + 1
+    if isinstance(valor, bytes):
+        return len(valor)
+    if isinstance(valor, dict):
+        return sum(len(str(k).encode("utf-8")) + 1 + _tamanho_valor(v) for k, v in valor.items())
+    if isinstance(valor, (list, tuple)):
+        return sum(_tamanho_valor(v) for v in valor)
+    return len(str(valor).encode("utf-8")) + 1
+
+
+def tamanho_documento(colecao: str, doc_id: str | None, dados: dict[str, Any] | None) -> int:
+    """Tamanho estimado do documento, em bytes (nome + campos + 32)."""
+    nome = len(colecao.encode("utf-8")) + len((doc_id or "x" * 20).encode("utf-8")) + 18
+    return nome + (_tamanho_valor(dados) if dados else 0) + 32
+
+
+def _lotes(
+    colecao: str,
+    operacoes: Iterable[Operacao],
+    max_documentos: int,
+    max_bytes: int,
+) -> Iterator[list[Operacao]]:
+    lote: list[Operacao] = []
+    bytes_lote = 0
+    for operacao in operacoes:
+        tamanho = tamanho_documento(colecao, *operacao)
+        if lote and (len(lote) >= max_documentos or bytes_lote + tamanho > max_bytes):
+            yield lote
+            lote, bytes_lote = [], 0
+        lote.append(operacao)
+        bytes_lote += tamanho
+    if lote:
+        yield lote
+
+
+def _commit(db: Any, colecao: str, lote: list[Operacao], tentativas: int, espera_inicial: float) -> _ResultadoLote:
+    referencia = db.collection(colecao)
+    espera = espera_inicial
+    for tentativa in range(1, tentativas + 1):
+        try:
+            batch = db.batch()
+            for doc_id, dados in lote:
+                documento = referencia.document(doc_id) if doc_id is not None else referencia.document()
+                if dados is None:
+                    batch.delete(documento)
+                else:
+                    batch.set(documento, dados)
+            batch.commit()
+            return _ResultadoLote(len(lote), tentativa - 1)
+        except ERROS_TRANSITORIOS as exc:
+            if tentativa == tentativas:
+                return _ResultadoLote(0, tentativa - 1, FalhaLote(lote[0][0], len(lote), repr(exc)))
+            # jitter evita que os workers repitam todos ao mesmo tempo
+            time.sleep(min(espera, ESPERA_MAXIMA) * random.uniform(0.5, 1.0))
+            espera *= 2
+        except Exception as exc:
+            return _ResultadoLote(0, tentativa - 1, FalhaLote(lote[0][0], len(lote), repr(exc)))
+    raise AssertionError("inalcançável")
+
+
+def escrever_documentos(
+    db: Any,
+    colecao: str,
+    operacoes: Iterable[Operacao],
+    workers: int = WORKERS,
+    max_documentos: int = MAX_DOCUMENTOS_LOTE,
+    max_bytes: int = MAX_BYTES_LOTE,
+    tentativas: int = TENTATIVAS,
+    espera_inicial: float = ESPERA_INICIAL,
+) -> RelatorioEscrita:
+    """
+    Aplica as `operacoes` na coleção em lotes simultâneos e devolve o
+    relatório (documentos, docs/s, repetições e lotes com falha). Não lança
+    exceção por lote com falha; cabe a quem chama conferir relatorio.falhas.
+    """
+    relatorio = RelatorioEscrita(colecao)
+    inicio = time.perf_counter()
+
+    def registrar(futuros: Iterable[Future]) -> None:
+        for futuro in futuros:
+            resultado: _ResultadoLote = futuro.result()
+            relatorio.lotes += 1
+            relatorio.documentos += resultado.documentos
+            relatorio.repeticoes += resultado.repeticoes
+            if resultado.falha is not None:
+                relatorio.falhas.append(resultado.falha)
+
+    with ThreadPoolExecutor(max_workers=max(workers, 1), thread_name_prefix="firestore") as pool:
+        em_andamento: set[Future] = set()
+        for lote in _lotes(colecao, operacoes, max_documentos, max_bytes):
+            if len(em_andamento) >= 2 * max(workers, 1):
+                concluidos, em_andamento = wait(em_andamento, return_when=FIRST_COMPLETED)
+                registrar(concluidos)
+            em_andamento.add(pool.submit(_commit, db, colecao, lote, tentativas, espera_inicial))
+        registrar(wait(em_andamento).done)
+
+    relatorio.segundos = time.perf_counter() - inicio
+    log(relatorio.resumo())
+    return relatorio
@@ -0,0 +1,174 @@
+"""
+Cache de ingestão das planilhas de origem.
+
+Cada etapa do loader (process_base_*) é identificada por um nome e uma versão.
+A chave do cache combina o hash SHA-256 do conteúdo dos arquivos de entrada,
+a versão da etapa e as chaves das etapas das quais ela depende. O resultado
+normalizado é gravado em Parquet em data/cache/ingestao/<etapa>/ e reaproveitado
+enquanto a chave não mudar, evitando um novo pd.read_excel.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Sequence
+
+import pandas as pd
+
+from src.data_paths import DIR_CACHE_INGESTAO
+from src.utils import log
+
+# (caminho, tamanho, mtime_ns) -> hash, evita reler arquivos que não mudaram
+_HASHES: dict[tuple[str, int, int], str] = {}
+
+
+@dataclass
+class ResultadoEtapa:
+    etapa: str
+    chave: str
+    cache_hit: bool
+    frames: tuple[pd.DataFrame, ...]
+
+
+@dataclass
+class ResultadoArquivo:
+    etapa: str
+    chave: str
+    cache_hit: bool
+    caminho: Path
+
+
+def hash_arquivo(path: Path, bloco: int = 1 << 20) -> str:
+    """Hash SHA-256 do conteúdo do arquivo, lido em blocos."""
+    stat = path.stat()
+    memo_key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+    if memo_key in _HASHES:
+        return _HASHES[memo_key]
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(bloco), b""):
+            h.update(chunk)
+    _HASHES[memo_key] = h.hexdigest()
+    return _HASHES[memo_key]
+
+
+def chave_etapa(
+    etapa: str,
+    versao: int,
+    fontes: Sequence[Path],
+    dependencias: Sequence[str] = (),
+) -> str:
+    """Chave determinística da etapa: nome + versão + hash das fontes + dependências."""
+    h = hashlib.sha256(f"{etapa}:{versao}".encode())
+    for fonte in fontes:
+        h.update(hash_arquivo(Path(fonte)).encode())
+    for dep in dependencias:
+        h.update(dep.encode())
+    return h.hexdigest()[:24]
+
+
+def _arquivos_entrada(pasta: Path, chave: str, n: int) -> list[Path]:
+    return [pasta / f"{chave}-{i}.parquet" for i in range(n)]
+
+
+def _ler_entrada(pasta: Path, chave: str) -> tuple[pd.DataFrame, ...] | None:
+    meta_path = pasta / f"{chave}.json"
+    if not meta_path.exists():
+        return None
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        arquivos = _arquivos_entrada(pasta, chave, int(meta["frames"]))
+        return tuple(pd.read_parquet(arq) for arq in arquivos)
+    except Exception as exc:
+        log(f"Cache de ingestao invalido em {meta_path}: {exc}")
+        return None
+
+
+def _publicar_entrada(pasta: Path, chave: str, n_frames: int) -> None:
+    # o .json é gravado por último: só marca a entrada como válida quando
+    # todos os parquets estão completos
+    meta_tmp = pasta / f"{chave}.json.tmp"
+    meta_tmp.write_text(json.dumps({"frames": n_frames}), encoding="utf-8")
+    os.replace(meta_tmp, pasta / f"{chave}.json")
+
+    # mantém apenas a entrada mais recente de cada etapa
+    for arq in pasta.iterdir():
+        if not arq.name.startswith(chave):
+            arq.unlink(missing_ok=True)
+
+
+def _gravar_entrada(pasta: Path, chave: str, frames: tuple[pd.DataFrame, ...]) -> None:
+    pasta.mkdir(parents=True, exist_ok=True)
+    for df, destino in zip(frames, _arquivos_entrada(pasta, chave, len(frames))):
+        tmp = destino.with_suffix(".tmp")
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, destino)
+    _publicar_entrada(pasta, chave, len(frames))
+
+
+def executar_com_cache(
+    etapa: str,
+    versao: int,
+    fontes: Sequence[Path],
+    processar: Callable[[], pd.DataFrame | tuple[pd.DataFrame, ...]],
+    dependencias: Sequence[str] = (),
+    cache_dir: Path = DIR_CACHE_INGESTAO,
+) -> ResultadoEtapa:
+    """
+    Executa `processar` apenas se não houver resultado em cache para a chave
+    calculada a partir das fontes, da versão e das dependências.
+
+    - etapa: nome da etapa (ex.: 'agendamentos')
+    - versao: versão da função process_base_* correspondente; incrementar ao
+      alterar a transformação invalida o cache
+    - fontes: arquivos de origem lidos pela etapa
+    - processar: função sem argumentos que devolve um DataFrame ou uma tupla
+    - dependencias: chaves de etapas anteriores usadas como entrada
+    """
+    chave = chave_etapa(etapa, versao, fontes, dependencias)
+    pasta = cache_dir / etapa
+
+    frames = _ler_entrada(pasta, chave)
+    if frames is not None:
+        log(f"Etapa '{etapa}' reaproveitada do cache ({chave}).")
+        return ResultadoEtapa(etapa, chave, True, frames)
+
+    resultado = processar()
+    frames = resultado if isinstance(resultado, tuple) else (resultado,)
+    try:
+        _gravar_entrada(pasta, chave, frames)
+    except Exception as exc:
+        # falha no cache não deve interromper o loader
+        log(f"Nao foi possivel gravar o cache da etapa '{etapa}': {exc}")
+    return ResultadoEtapa(etapa, chave, False, frames)
+
+
+def executar_com_cache_em_arquivo(
+    etapa: str,
+    versao: int,
+    fontes: Sequence[Path],
+    gerar: Callable[[Path], None],
+    dependencias: Sequence[str] = (),
+    cache_dir: Path = DIR_CACHE_INGESTAO,
+) -> ResultadoArquivo:
+    """
+    Variante de executar_com_cache para etapas que gravam o Parquet direto em
+    disco (modo streaming). `gerar` recebe o caminho da entrada do cache e deve
+    escrevê-lo; o resultado não é carregado em memória.
+    """
+    chave = chave_etapa(etapa, versao, fontes, dependencias)
+    pasta = cache_dir / etapa
+    (caminho,) = _arquivos_entrada(pasta, chave, 1)
+
+    if (pasta / f"{chave}.json").exists() and caminho.exists():
+        log(f"Etapa '{etapa}' reaproveitada do cache ({chave}).")
+        return ResultadoArquivo(etapa, chave, True, caminho)
+
+    pasta.mkdir(parents=True, exist_ok=True)
+    gerar(caminho)
+    _publicar_entrada(pasta, chave, 1)
+    return ResultadoArquivo(etapa, chave, False, caminho)
@@ -0,0 +1,271 @@
+"""
+Execução do loader em segundo plano.
+
+A página de atualizações submete o loader como um job: o pipeline e a
+sincronização com o Firestore rodam em uma thread do servidor do Streamlit,
+fora da execução do script, e o andamento é gravado em data/jobs/<id>.json a
+cada etapa:
+
+    {
+      "id": "20251124T131636123456",
+      "estado": "executando",
+      "parametros": {"streaming": false, "paralelo": true, ...},
+      "etapas": [
+        {"etapa": "estrutural", "fase": "loader", "estado": "concluida", "segundos": 4.2, ...},
+        {"etapa": "presenca", "fase": "loader", "estado": "executando", "segundos": null, ...}
+      ],
+      ...
+    }
+
+Como o registro fica em disco, qualquer sessão (inclusive após recarregar o
+navegador) acompanha o job em andamento. Só um job roda por vez; um job que
+ficou "executando" em um processo que não existe mais (servidor reiniciado)
+é marcado como interrompido. O processo é identificado por um token gerado
+na importação (PROCESSO), e não pelo pid: em um container o servidor
+reiniciado costuma receber o mesmo pid (em geral 1).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from src.data_paths import DATA_PROCESSADO, DIR_JOBS
+from src.pipeline import (
+    COLECOES_FIRESTORE,
+    ETAPA_CONCLUIDA,
+    ETAPA_IGNORADA,
+    ETAPA_INICIADA,
+    ORIGENS,
+    ErroEtapa,
+    executar_pipeline,
+    sincronizar_firestore,
+)
+from src.utils import log
+
+PENDENTE = "pendente"
+EXECUTANDO = "executando"
+CONCLUIDO = "concluido"
+ERRO = "erro"
+INTERROMPIDO = "interrompido"
+
+FASE_LOADER = "loader"
+FASE_FIRESTORE = "firestore"
+
+JOBS_MANTIDOS = 20
+
+# bases do loader, publicação e coleções do Firestore
+ETAPAS_PREVISTAS = len(ORIGENS) + 1 + len(COLECOES_FIRESTORE)
+
+# identifica este processo do servidor nos registros dos jobs
+PROCESSO = uuid.uuid4().hex
+
+_lock = threading.RLock()
+
+
+@dataclass
+class JobLoader:
+    id: str
+    estado: str
+    parametros: dict[str, Any]
+    criado_em: str
+    atualizado_em: str
+    pid: int = 0
+    processo: str = ""
+    concluido_em: str | None = None
+    etapas: list[dict[str, Any]] = field(default_factory=list)
+    segundos: float | None = None
+    versao: str | None = None
+    deltas: list[dict[str, Any]] = field(default_factory=list)
+    mensagem: str | None = None
+    # falha do Firestore não invalida as bases já publicadas
+    aviso_firestore: str | None = None
+
+    @property
+    def ativo(self) -> bool:
+        return self.estado in (PENDENTE, EXECUTANDO)
+
+    @property
+    def progresso(self) -> float:
+        """Fração das ETAPAS_PREVISTAS já encerradas."""
+        if self.estado == CONCLUIDO:
+            return 1.0
+        encerradas = sum(e["estado"] in (ETAPA_CONCLUIDA, ETAPA_IGNORADA) for e in self.etapas)
+        return min(encerradas / ETAPAS_PREVISTAS, 1.0)
+
+
+def _agora() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def _caminho(job_id: str, pasta: Path) -> Path:
+    return pasta / f"{job_id}.json"
+
+
+def _gravar(job: JobLoader, pasta: Path) -> None:
+    job.atualizado_em = _agora()
+    pasta.mkdir(parents=True, exist_ok=True)
+    destino = _caminho(job.id, pasta)
+    tmp = destino.with_suffix(".json.tmp")
+    tmp.write_text(json.dumps(asdict(job), indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, destino)
+
+
+def ler_job(job_id: str, pasta: Path = DIR_JOBS) -> JobLoader | None:
+    caminho = _caminho(job_id, pasta)
+    if not caminho.exists():
+        return None
+    job = JobLoader(**json.loads(caminho.read_text(encoding="utf-8")))
+    if job.ativo and job.processo != PROCESSO:
+        # o processo que executava o job não é mais este servidor
+        with _lock:
+            job.estado = INTERROMPIDO
+            job.mensagem = "Execucao interrompida (servidor reiniciado)."
+            job.concluido_em = job.concluido_em or _agora()
+            _gravar(job, pasta)
+    return job
+
+
+def listar_jobs(pasta: Path = DIR_JOBS) -> list[JobLoader]:
+    """Jobs registrados, do mais recente para o mais antigo."""
+    if not pasta.exists():
+        return []
+    ids = sorted((p.stem for p in pasta.glob("*.json")), reverse=True)
+    return [job for job in (ler_job(job_id, pasta) for job_id in ids) if job is not None]
+
+
+def job_atual(pasta: Path = DIR_JOBS) -> JobLoader | None:
+    """Job mais recente (em andamento ou não)."""
+    if not pasta.exists():
+        return None
+    ids = sorted((p.stem for p in pasta.glob("*.json")), reverse=True)
+    return ler_job(ids[0], pasta) if ids else None
+
+
+def _limpar_jobs(pasta: Path, mantidos: int) -> None:
+    for antigo in sorted(pasta.glob("*.json"), reverse=True)[mantidos:]:
+        antigo.unlink(missing_ok=True)
+
+
+def _registrar_etapa(
+    job: JobLoader, fase: str, etapa: str, estado: str, segundos: float | None
+) -> dict[str, Any]:
+    registro = next((e for e in job.etapas if e["fase"] == fase and e["etapa"] == etapa), None)
+    if registro is None:
+        registro = {"etapa": etapa, "fase": fase, "arquivo": None, "cache": None}
+        job.etapas.append(registro)
+    registro["estado"] = estado
+    registro["segundos"] = segundos
+    return registro
+
+
+def _executar(job: JobLoader, pasta: Path, destino: Path) -> None:
+    def progresso(fase: str):
+        def registrar(etapa: str, estado: str, segundos: float | None) -> None:
+            with _lock:
+                _registrar_etapa(job, fase, etapa, estado, segundos)
+                _gravar(job, pasta)
+
+        return registrar
+
+    with _lock:
+        job.estado = EXECUTANDO
+        _gravar(job, pasta)
+
+    try:
+        resultado = executar_pipeline(destino=destino, progresso=progresso(FASE_LOADER), **job.parametros)
+    except FileNotFoundError as exc:
+        _finalizar(job, pasta, ERRO, str(exc))
+        return
+    except ErroEtapa as exc:
+        with _lock:
+            _registrar_etapa(job, FASE_LOADER, exc.etapa, ERRO, None)
+        _finalizar(job, pasta, ERRO, f"{exc}. Nenhuma base foi atualizada.")
+        return
+    except Exception as exc:
+        log(f"Job {job.id} falhou: {exc}")
+        _finalizar(job, pasta, ERRO, f"Falha no loader: {exc}")
+        return
+
+    with _lock:
+        for relatorio in resultado.etapas:
+            registro = _registrar_etapa(job, FASE_LOADER, relatorio.etapa, ETAPA_CONCLUIDA, relatorio.segundos)
+            registro["arquivo"] = relatorio.arquivo
+            registro["cache"] = relatorio.cache_hit
+        job.segundos = resultado.segundos
+        job.versao = resultado.versao
+        job.deltas = [
+            {
+                "base": nome,
+                "inseridos": delta.inseridos,
+                "atualizados": delta.atualizados,
+                "removidos": delta.removidos,
+                "inalterados": delta.inalterados,
+            }
+            for nome, delta in resultado.deltas.items()
+        ]
+        _gravar(job, pasta)
+
+    try:
+        sincronizar_firestore(resultado.bases, resultado.deltas, progresso(FASE_FIRESTORE))
+    except Exception as exc:
+        with _lock:
+            job.aviso_firestore = f"Não foi possível sincronizar com o Firestore: {exc}"
+            _interromper_etapas(job, ERRO)
+    _finalizar(job, pasta, CONCLUIDO)
+
+
+def _interromper_etapas(job: JobLoader, estado: str) -> None:
+    for registro in job.etapas:
+        if registro["estado"] == ETAPA_INICIADA:
+            registro["estado"] = estado
+
+
+def _finalizar(job: JobLoader, pasta: Path, estado: str, mensagem: str | None = None) -> None:
+    with _lock:
+        # etapas paralelas ainda em andamento quando outra falhou
+        _interromper_etapas(job, INTERROMPIDO)
+        job.estado = estado
+        job.mensagem = mensagem
+        job.concluido_em = _agora()
+        _gravar(job, pasta)
+    log(f"Job {job.id}: {estado}" + (f" ({mensagem})" if mensagem else ""))
+
+
+def submeter_loader(
+    parametros: dict[str, Any],
+    pasta: Path = DIR_JOBS,
+    destino: Path = DATA_PROCESSADO,
+    mantidos: int = JOBS_MANTIDOS,
+) -> JobLoader:
+    """
+    Inicia o loader em uma thread com os `parametros` de executar_pipeline e
+    devolve o job. Se já houver um job em andamento, devolve esse job em vez
+    de iniciar outro.
+    """
+    with _lock:
+        atual = job_atual(pasta)
+        if atual is not None and atual.ativo:
+            return atual
+        agora = datetime.now()
+        job = JobLoader(
+            id=agora.strftime("%Y%m%dT%H%M%S%f"),
+            estado=PENDENTE,
+            parametros=dict(parametros),
+            criado_em=agora.isoformat(timespec="seconds"),
+            atualizado_em=agora.isoformat(timespec="seconds"),
+            pid=os.getpid(),
+            processo=PROCESSO,
+        )
+        _gravar(job, pasta)
+        _limpar_jobs(pasta, max(mantidos, 1))
+
+    threading.Thread(target=_executar, args=(job, pasta, destino), name=f"loader-{job.id}", daemon=True).start()
+    log(f"Job {job.id} submetido: {job.parametros}")
+    return job
@@ -0,0 +1,271 @@
+"""
+Leitura das bases processadas pelas páginas, com projeção de colunas.
+
+Cada página informa as colunas que exibe; só elas são lidas do Parquet e
+pedidas ao Firestore como máscara de campos. Colunas inexistentes são
+simplesmente omitidas do resultado, para que cada página mantenha seus avisos
+de colunas ausentes. Venha de onde vier, a base sai com os dtypes de
+src.esquemas.
+
+As fontes são consultadas em ordem (FONTES_PADRAO): Firestore, Parquet
+processado e espelho local do Firestore (src.espelho_firestore). A leitura do
+Firestore roda em outra thread com prazo de PRAZO_FIRESTORE segundos; estouro
+do prazo ou erro contam como falha no disjuntor (src.disjuntor), e com o
+disjuntor aberto o Firestore nem é consultado até o fim da espera. A fonte que
+atendeu volta em Leitura.fonte, exibida nas legendas "Fonte dos dados".
+
+Páginas que usam várias bases as pedem juntas a carregar_leituras, que lê
+cada uma em uma thread: a espera fica perto da base mais lenta, não da soma.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as PrazoEsgotado
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Mapping, Sequence
+
+import pandas as pd
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from src.aplicacoes_presenca import AVISO_SEM_CORRESPONDENCIA, montar_aplicacoes_presenca
+from src.data_paths import ARQ_BASE_AGENDAMENTOS, ARQ_BASE_APLICACOES_PRESENCA, ARQ_BASE_PRESENCA
+from src.dataset_particionado import ler_base
+from src.disjuntor import Disjuntor
+from src.esquemas import BASE_POR_ARQUIVO, aplicar_esquema
+from src.espelho_firestore import ler_colecao, ler_espelho_local, ouvinte_colecoes
+from src.normalizacao import normalizar_coluna
+from src.snapshots import Manifesto, ler_manifesto, resolver_arquivo
+from src.utils import log
+
+PRAZO_FIRESTORE = 5.0  # segundos por leitura
+DISJUNTOR_FIRESTORE = Disjuntor("firestore", limite=3, espera=60.0)
+# leituras que estouram o prazo continuam na thread até terminar (e deixam o
+# espelho atualizado para a próxima); o pool limita quantas ficam pendentes
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="leitura-firestore")
+
+
+def _campos_firestore(colunas: Sequence[str]) -> tuple[str, ...]:
+    # o loader sincroniza as bases com os nomes de normalize_columns
+    # (minúsculos); pede os dois nomes de cada coluna
+    campos: list[str] = []
+    for coluna in colunas:
+        for campo in (coluna, normalizar_coluna(coluna, "snake")):
+            if campo not in campos:
+                campos.append(campo)
+    return tuple(campos)
+
+
+def _restaurar_nomes(df: pd.DataFrame, colunas: Sequence[str]) -> pd.DataFrame:
+    renomear = {}
+    for coluna in colunas:
+        campo = normalizar_coluna(coluna, "snake")
+        if coluna not in df.columns and campo in df.columns and campo not in colunas:
+            renomear[campo] = coluna
+    return df.rename(columns=renomear)
+
+
+@dataclass(frozen=True)
+class Conjunto:
+    """Base pedida por uma página."""
+
+    arquivo: Path
+    colunas: tuple[str, ...] | None = None
+    colecao: str | None = None
+    # snapshot em que o Parquet é lido; None usa o publicado no momento da leitura
+    manifesto: Manifesto | None = field(default=None, compare=False)
+
+    @property
+    def base(self) -> str:
+        return BASE_POR_ARQUIVO.get(self.arquivo.name, "")
+
+
+@dataclass(frozen=True)
+class Leitura:
+    df: pd.DataFrame
+    fonte: str
+
+
+def _ajustar_colecao(df: pd.DataFrame, conjunto: Conjunto) -> pd.DataFrame:
+    # documentos do Firestore (ou do espelho): nomes, projeção e dtypes
+    if conjunto.colunas is not None:
+        df = _restaurar_nomes(df, conjunto.colunas)
+        df = df[[c for c in conjunto.colunas if c in df.columns]]
+    return aplicar_esquema(df.reset_index(drop=True), conjunto.base)
+
+
+class FonteDados:
+    """
+    Fonte de uma base. ler devolve None quando a fonte não tem a base, para
+    que a próxima seja consultada; erros de leitura são propagados.
+    """
+
+    nome = ""
+
+    def ler(self, conjunto: Conjunto) -> pd.DataFrame | None:
+        raise NotImplementedError
+
+    def descrever(self, conjunto: Conjunto) -> str:
+        return self.nome
+
+
+class FonteFirestore(FonteDados):
+    nome = "Firestore"
+
+    def __init__(self, prazo: float = PRAZO_FIRESTORE, disjuntor: Disjuntor = DISJUNTOR_FIRESTORE):
+        self.prazo = prazo
+        self.disjuntor = disjuntor
+
+    def ler(self, conjunto: Conjunto) -> pd.DataFrame | None:
+        if not conjunto.colecao or not self.disjuntor.permitir():
+            return None
+        campos = _campos_firestore(conjunto.colunas) if conjunto.colunas is not None else None
+        # o listener é criado aqui, na thread da página (st.cache_resource)
+        futuro = _executor.submit(ler_colecao, conjunto.colecao, campos, ouvinte_colecoes())
+        try:
+            df = futuro.result(timeout=self.prazo)
+        except PrazoEsgotado:
+            self.disjuntor.registrar_falha()
+            log(f"Firestore sem resposta em {self.prazo:g}s para '{conjunto.colecao}'.")
+            return None
+        except Exception as exc:
+            self.disjuntor.registrar_falha()
+            log(f"Erro ao ler coleção '{conjunto.colecao}' no Firestore: {exc}")
+            return None
+        self.disjuntor.registrar_sucesso()
+        if df.empty:
+            return None
+        return _ajustar_colecao(df, conjunto)
+
+
+class FonteParquet(FonteDados):
+    nome = "Parquet"
+
+    def ler(self, conjunto: Conjunto) -> pd.DataFrame | None:
+        arquivo = resolver_arquivo(conjunto.arquivo, conjunto.manifesto)
+        if not arquivo.exists() and not arquivo.with_suffix("").exists():
+            return None
+        return aplicar_esquema(ler_base(arquivo, colunas=conjunto.colunas), conjunto.base)
+
+    def descrever(self, conjunto: Conjunto) -> str:
+        return f"{self.nome} ({conjunto.arquivo.name})"
+
+
+class FonteEspelho(FonteDados):
+    nome = "espelho local do Firestore"
+
+    def ler(self, conjunto: Conjunto) -> pd.DataFrame | None:
+        if not conjunto.colecao:
+            return None
+        campos = _campos_firestore(conjunto.colunas) if conjunto.colunas is not None else None
+        df = ler_espelho_local(conjunto.colecao, campos)
+        return None if df.empty else _ajustar_colecao(df, conjunto)
+
+
+FONTES_PADRAO: tuple[FonteDados, ...] = (FonteFirestore(), FonteParquet(), FonteEspelho())
+
+
+def carregar_leitura(
+    arquivo: Path,
+    colunas: Sequence[str] | None = None,
+    colecao: str | None = None,
+    fontes: Sequence[FonteDados] = FONTES_PADRAO,
+    manifesto: Manifesto | None = None,
+) -> Leitura:
+    """
+    Como carregar_base, devolvendo também a fonte que atendeu a leitura. O
+    Parquet é lido no snapshot de `manifesto` (se None, no publicado).
+
+    Se uma fonte falhar, as seguintes são consultadas; o erro só é lançado se
+    nenhuma tiver a base.
+    """
+    conjunto = Conjunto(arquivo, tuple(colunas) if colunas is not None else None, colecao, manifesto)
+    return _ler_conjunto(conjunto, fontes)
+
+
+def _ler_conjunto(conjunto: Conjunto, fontes: Sequence[FonteDados]) -> Leitura:
+    arquivo = conjunto.arquivo
+    erro: Exception | None = None
+    for fonte in fontes:
+        try:
+            df = fonte.ler(conjunto)
+        except Exception as exc:
+            log(f"Fonte {fonte.nome} falhou para {arquivo.name}: {exc}")
+            erro = exc
+            continue
+        if df is not None:
+            return Leitura(df, fonte.descrever(conjunto))
+    if erro is not None:
+        raise erro
+    raise FileNotFoundError(f"Base nao encontrada: {resolver_arquivo(arquivo, conjunto.manifesto)}")
+
+
+def carregar_leituras(
+    conjuntos: Mapping[str, Conjunto], fontes: Sequence[FonteDados] = FONTES_PADRAO
+) -> dict[str, Leitura | None]:
+    """
+    Lê as bases de `conjuntos` ao mesmo tempo, uma thread por base.
+
+    Devolve {nome: Leitura}, com None para as bases que nenhuma fonte tem.
+    Outros erros são lançados depois que todas as leituras terminam.
+    """
+    # as threads herdam o contexto da página, para os caches do Streamlit
+    ctx = get_script_run_ctx(suppress_warning=True)
+
+    def ler(conjunto: Conjunto) -> Leitura | None:
+        if ctx is not None:
+            add_script_run_ctx(ctx=ctx)
+        try:
+            return _ler_conjunto(conjunto, fontes)
+        except FileNotFoundError:
+            return None
+
+    with ThreadPoolExecutor(max_workers=max(len(conjuntos), 1), thread_name_prefix="leitura") as pool:
+        futuros = {nome: pool.submit(ler, conjunto) for nome, conjunto in conjuntos.items()}
+    return {nome: futuro.result() for nome, futuro in futuros.items()}
+
+
+def carregar_base(
+    arquivo: Path,
+    colunas: Sequence[str] | None = None,
+    colecao: str | None = None,
+) -> pd.DataFrame:
+    """
+    Lê uma base processada com apenas as `colunas` pedidas (todas, se None).
+
+    - arquivo: Parquet da base em data/processado (resolvido no snapshot publicado)
+    - colecao: coleção do Firestore consultada antes do Parquet (opcional)
+
+    Lança FileNotFoundError se a base não estiver no Firestore nem em disco.
+    """
+    return carregar_leitura(arquivo, colunas, colecao).df
+
+
+def carregar_aplicacoes(manifesto: Manifesto | None = None) -> Leitura | None:
+    """
+    Tabela de aplicações (agendamentos × presença) publicada pelo loader. Sem
+    ela, monta a tabela a partir das duas bases, lidas ao mesmo tempo. Todos
+    os Parquets vêm do snapshot de `manifesto` (se None, do publicado, lido
+    uma única vez). None sem a base de agendamentos.
+    """
+    manifesto = manifesto or ler_manifesto(ARQ_BASE_APLICACOES_PRESENCA.parent)
+    try:
+        return carregar_leitura(ARQ_BASE_APLICACOES_PRESENCA, manifesto=manifesto)
+    except FileNotFoundError:
+        pass
+    leituras = carregar_leituras(
+        {
+            "agendamentos": Conjunto(ARQ_BASE_AGENDAMENTOS, colecao="siave_agendamentos", manifesto=manifesto),
+            "presenca": Conjunto(ARQ_BASE_PRESENCA, colecao="siave_presenca", manifesto=manifesto),
+        }
+    )
+    agend, pres = leituras["agendamentos"], leituras["presenca"]
+    if agend is None:
+        return None
+    df, diagnostico = montar_aplicacoes_presenca(agend.df, pres.df if pres is not None else None)
+    log(f"Tabela de aplicações montada na leitura: {diagnostico.resumo()}.")
+    if diagnostico.sem_correspondencia:
+        log(f"Aviso: {AVISO_SEM_CORRESPONDENCIA}")
+    fonte = f"agendamentos - {agend.fonte}; presença - {pres.fonte if pres is not None else 'não encontrada'}"
+    return Leitura(df, fonte)
@@ -0,0 +1,195 @@
+"""
+Normalização de textos usada pelos loaders e pelas páginas.
+
+- remove_accents: remoção de acentos (NFKD sem marcas combinantes) com tabela
+  de tradução pré-calculada para os caracteres latinos e cache LRU;
+- normalizar_coluna: nomes de colunas em cada um dos formatos usados no
+  projeto (ver MODOS_COLUNA);
+- aplicar_por_valores_unicos: aplica uma função de normalização uma vez por
+  valor distinto de uma Series. Colunas como gRE, municipio, polo e escola têm
+  poucas centenas de valores distintos em centenas de milhares de linhas; os
+  valores são fatorados, a função roda uma vez por valor e o resultado volta
+  para as linhas pelos códigos;
+- texto_canonico: colunas lidas das planilhas como texto, com os códigos
+  numéricos sempre na mesma forma ("1003", nunca "1003.0").
+"""
+
+from __future__ import annotations
+
+import unicodedata
+from functools import lru_cache
+from typing import Any, Callable, Iterable
+
+import numpy as np
+import pandas as pd
+
+TAMANHO_CACHE = 16_384
+
+
+def _sem_acentos_nfkd(texto: str) -> str:
+    nfkd = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in nfkd if not unicodedata.combining(c))
+
+
+def _montar_tabela() -> dict[int, str | None]:
+    # Latin-1, Latin Extended-A/B e marcas combinantes: cobre os textos das
+    # planilhas sem passar pelo NFKD caractere a caractere
+    tabela: dict[int, str | None] = {}
+    for cp in list(range(0x80, 0x250)) + list(range(0x300, 0x370)):
+        convertido = _sem_acentos_nfkd(chr(cp))
+        if convertido != chr(cp):
+            tabela[cp] = convertido or None
+    return tabela
+
+
+_TABELA_ACENTOS = _montar_tabela()
+
+
+@lru_cache(maxsize=TAMANHO_CACHE)
+def _remover_acentos(texto: str) -> str:
+    if texto.isascii():
+        return texto
+    traduzido = texto.translate(_TABELA_ACENTOS)
+    if traduzido.isascii():
+        return traduzido
+    # caracteres fora da tabela (outros alfabetos, símbolos de compatibilidade)
+    return _sem_acentos_nfkd(traduzido)
+
+
+def remove_accents(text: Any) -> str:
+    """Remove acentos (NFKD sem marcas combinantes) de str(text)."""
+    return _remover_acentos(str(text))
+
+
+def ascii_fold(text: Any) -> str:
+    """Como remove_accents, descartando também o que não for ASCII (NFKD + encode ascii/ignore)."""
+    sem_acentos = remove_accents(text)
+    if sem_acentos.isascii():
+        return sem_acentos
+    return sem_acentos.encode("ascii", "ignore").decode()
+
+
+def normalize_upper(txt: Any) -> str:
+    """Remove acentos, coloca em maiusculas e tira espacos extras."""
+    return remove_accents(txt).upper().strip()
+
+
+def normalizar_nome(nome: Any) -> str:
+    """Sem acentos, minúsculo e apenas caracteres alfanuméricos."""
+    texto = remove_accents(nome).lower()
+    return "".join(ch for ch in texto if ch.isalnum())
+
+
+def _camel(texto: str, remover: str) -> str:
+    for ch in remover:
+        texto = texto.replace(ch, "")
+    return texto[:1].lower() + texto[1:]
+
+
+def _snake(texto: str) -> str:
+    texto = texto.lower().replace(" ", "_")
+    return "".join(ch for ch in texto if ch.isalnum() or ch == "_")
+
+
+def _compacto(texto: str) -> str:
+    return texto.strip().lower().replace(" ", "").replace("_", "").replace("-", "")
+
+
+# modo -> (remoção de acentos, transformação)
+MODOS_COLUNA: dict[str, tuple[Callable[[Any], str], Callable[[str], str]]] = {
+    # 'Código Turma-Censo' -> 'códigoTurmaCenso' sem acentos (agendamentos_loader, normalizador)
+    "camel": (remove_accents, lambda t: _camel(t, " _-")),
+    # idem, preservando hífens (base_estrutural_loader)
+    "camel_estrutural": (remove_accents, lambda t: _camel(t, " _")),
+    # 'Código Turma' -> 'codigo_turma' (bases processadas pelo loader)
+    "snake": (remove_accents, _snake),
+    # 'Município' -> 'municipio', só alfanuméricos (busca de colunas)
+    "alnum": (normalizar_nome, lambda t: t),
+    # ' Data do Registro ' -> 'datadoregistro' (Registros Pendentes)
+    "compacto": (ascii_fold, _compacto),
+    # apenas ASCII, sem espaços nas bordas (planilhas de logística)
+    "ascii": (ascii_fold, str.strip),
+}
+
+
+@lru_cache(maxsize=TAMANHO_CACHE)
+def _normalizar_coluna(nome: str, modo: str) -> str:
+    sem_acentos, transformar = MODOS_COLUNA[modo]
+    return transformar(sem_acentos(nome))
+
+
+def normalizar_coluna(nome: Any, modo: str) -> str:
+    """Normaliza um nome de coluna no formato `modo` (chave de MODOS_COLUNA)."""
+    if modo not in MODOS_COLUNA:
+        raise ValueError(f"Modo de normalizacao desconhecido: {modo!r}")
+    return _normalizar_coluna(str(nome), modo)
+
+
+def normalizar_colunas(colunas: Iterable[Any], modo: str) -> list[str]:
+    return [normalizar_coluna(c, modo) for c in colunas]
+
+
+# inteiro lido como float e convertido em texto: "1003.0" -> "1003"
+_INTEIRO_COMO_FLOAT = r"^(-?\d+)\.0+$"
+# maior inteiro que um float64 representa sem perda
+_MAIOR_INTEIRO_EXATO = 2**53
+
+
+def texto_canonico(serie: pd.Series) -> pd.Series:
+    """
+    `serie` como texto sem espaços nas pontas, com vazios como NA.
+
+    Uma coluna de códigos com alguma célula vazia é lida como float (1003.0),
+    e a inferência de tipos do modo streaming é feita por bloco: o mesmo
+    código viraria "1003" ou "1003.0" conforme o bloco ou a leitura. Valores
+    inteiros perdem o ".0", para que chaves (coTurmaCenso, coEscolaCenso,
+    aplicacaoId, dia de aplicação) tenham uma única forma.
+    """
+    if pd.api.types.is_float_dtype(serie.dtype):
+        inteiros = serie.notna() & (serie == np.floor(serie)) & (serie.abs() < _MAIOR_INTEIRO_EXATO)
+        texto = serie.astype("string").mask(inteiros, serie.where(inteiros, 0).astype("int64").astype("string"))
+    else:
+        texto = serie.astype("string")
+    texto = texto.str.strip().str.replace(_INTEIRO_COMO_FLOAT, r"\1", regex=True)
+    return texto.replace({"": pd.NA})
+
+
+# Tipos inferidos em que valores iguais sempre têm o mesmo str(); em colunas
+# "mixed" (ex.: 1 e "1") o fatoramento juntaria valores que a função distingue.
+_TIPOS_SEGUROS = {"string", "empty", "integer", "floating", "boolean"}
+
+
+def aplicar_por_valores_unicos(serie: pd.Series, funcao: Callable[[Any], Any]) -> pd.Series:
+    """
+    Equivalente a `serie.apply(funcao)`, executando `funcao` uma única vez por
+    valor distinto. Valores ausentes também passam pela função (uma vez por
+    tipo de NA), preservando o resultado de funções que os convertem em texto.
+    Colunas categóricas devolvem uma Series comum, como a de uma coluna texto.
+    """
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        # já fatorada: usa as categorias e os códigos
+        codigos, unicos = serie.cat.codes.to_numpy(), serie.cat.categories
+        if pd.api.types.infer_dtype(unicos, skipna=True) not in _TIPOS_SEGUROS:
+            return serie.astype(object).apply(funcao)
+    elif serie.empty or pd.api.types.infer_dtype(serie, skipna=True) not in _TIPOS_SEGUROS:
+        return serie.apply(funcao)
+    else:
+        codigos, unicos = pd.factorize(serie, use_na_sentinel=True)
+
+    resultados_unicos = pd.Series(unicos).apply(funcao).to_numpy(dtype=object)
+
+    valores = np.empty(len(serie), dtype=object)
+    ausentes = codigos == -1
+    valores[~ausentes] = resultados_unicos[codigos[~ausentes]]
+    if ausentes.any():
+        por_tipo: dict[type, Any] = {}
+
+        def funcao_na(valor: Any) -> Any:
+            if type(valor) not in por_tipo:
+                por_tipo[type(valor)] = funcao(valor)
+            return por_tipo[type(valor)]
+
+        valores[ausentes] = [funcao_na(v) for v in serie[ausentes]]
+
+    # mesma inferência de tipo feita por Series.apply sobre o resultado
+    return pd.Series(list(valores), index=serie.index, name=serie.name)
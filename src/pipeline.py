@@ -0,0 +1,1497 @@
+"""
+Pipeline de processamento das bases do SIAVE 2025.
+
+Localiza as planilhas mais recentes em data/origem, normaliza cada base
+(process_base_*) e publica os Parquets de data/processado usados pelos
+dashboards. As etapas independentes podem rodar em paralelo, cada uma em um
+processo; apenas presença depende da saída da base estrutural. A tabela de
+aplicações (agendamentos × presença, src.aplicacoes_presenca) é montada na
+publicação, a partir das duas bases, assim como o cubo de contagens do
+Dashboard Estrutural (src.cubo_estrutural), a partir da base estrutural.
+
+Uso (sem o Streamlit, ex.: via cron):
+    python -m src.pipeline [--bases estrutural presenca ...] [--sem-firestore]
+                           [--paralelo] [--streaming] [--incremental] [--particionar]
+                           [--armazenamento documentos|blocos] [--comparar-armazenamento]
+                           [--comparar-streaming]
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Iterator, Sequence, Union
+from urllib.parse import quote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.aplicacoes_presenca import AVISO_SEM_CORRESPONDENCIA, montar_aplicacoes_presenca
+from src.cubo_estrutural import montar_cubo
+from src.data_paths import DATA_ORIGEM, DATA_PROCESSADO, DIR_CACHE_INGESTAO
+from src.dataset_particionado import diretorio_dataset, gravar_dataset
+from src.delta_ingestao import (
+    COLUNA_CHAVE,
+    COLUNA_OPERACAO,
+    REMOVIDO,
+    DeltaBase,
+    ResumoDelta,
+    aplicar_delta,
+    calcular_delta,
+    chaves_registro,
+    gravar_delta,
+)
+from src.esquemas import aplicar_esquema, tipos_arrow
+from src.excel_stream import LINHAS_POR_BLOCO, gravar_parquet_em_blocos, schema_arrow
+from src.firebase_client import (
+    MODO_BLOCOS,
+    MODO_DOCUMENTOS,
+    chunks_collection,
+    compare_storage_modes,
+    delete_collection,
+    delete_documents,
+    list_document_ids,
+    read_control,
+    save_table_chunks,
+    upsert_dataframe,
+    upsert_operations,
+    write_control,
+    write_documents,
+)
+from src.firestore_lotes import Operacao
+from src.ingestao_cache import (
+    ResultadoArquivo,
+    ResultadoEtapa,
+    executar_com_cache,
+    executar_com_cache_em_arquivo,
+)
+from src.normalizacao import (
+    aplicar_por_valores_unicos,
+    normalizar_colunas,
+    normalizar_nome,
+    normalize_upper,
+    remove_accents,
+    texto_canonico,
+)
+from src.planilhas_preparadas import iter_planilha_blocos, ler_planilha
+from src.snapshots import (
+    SNAPSHOTS_MANTIDOS,
+    iniciar_snapshot,
+    publicar_snapshot,
+    reaproveitar,
+    resolver_arquivo,
+    versao_publicada,
+)
+from src.utils import log
+
+ESTRUTURAL_SCHEMA = [
+    "UF",
+    "Polo",
+    "coEscolaCenso",
+    "Escola",
+    "Municipio",
+    "Localizacao",
+    "Rede",
+    "Telefone1",
+    "Telefone2",
+    "CoTurmaCenso",
+    "Turma",
+    "Serie",
+    "Turno",
+    "ObservacoesDaEscola",
+    "TemCiencias",
+    "QtdDiasAplicacao",
+    "gRE",
+    "diaAplicacao",
+]
+
+AGENDAMENTOS_SCHEMA = [
+    "uf",
+    "polo",
+    "coEscolaCenso",
+    "coTurmaCenso",
+    "escola",
+    "municipio",
+    "turma",
+    "serie",
+    "turno",
+    "tipoAplic",
+    "statusAplicacao",
+    "localizacao",
+    "tipoRede",
+    "aplicador",
+    "cpf",
+    "qtdAlunosPrevistos",
+    "diaAplicacao",
+    "dataAgendamento",
+    "gRE",
+    "aplicacaoId",
+]
+
+PRESENCA_SCHEMA = [
+    "uf",
+    "polo",
+    "coEscolaCenso",
+    "escola",
+    "municipio",
+    "tipoRede",
+    "localizacao",
+    "diaAplicacao",
+    "serie",
+    "tipoAplic",
+    "turno",
+    "coTurmaCenso",
+    "turma",
+    "dataReal",
+    "qtdAlunosPrevistos",
+    "qtdAlunosPresentes",
+    "percentual",
+    "gRE",
+]
+
+PRESENCA_COLUNAS_ENTRADA = [
+    "UF",
+    "Polo",
+    "CoEscolaCenso",
+    "Escola",
+    "MunicipioPolo",
+    "MunicipioEscola",
+    "TipoRede",
+    "Localizacao",
+    "Dia",
+    "Serie",
+    "TipoAplic",
+    "Turno",
+    "CoTurmaCenso",
+    "Turma",
+    "Agendamento",
+    "QtdAlunosPrevistos",
+    "QtdAlunosPresentes",
+    "Percentual",
+]
+
+ORDINAL_SUFFIX = "\u00AA"
+
+# Versão de cada process_base_*; incrementar ao alterar a transformação
+# invalida o cache de ingestão da etapa.
+VERSOES_ETAPAS = {
+    "estrutural": 2,
+    "agendamentos": 4,
+    "presenca": 5,
+    "pendentes": 1,
+}
+
+POLO_TO_GRE = {
+    "JOAO PESSOA 01": "1",
+    "JOAO PESSOA 02": "1",
+    "JOAO PESSOA 03": "1",
+    "JOAO PESSOA 04": "1",
+    "JOAO PESSOA 05": "1",
+    "JOAO PESSOA 06": "1",
+    "JOAO PESSOA 07": "1",
+    "GUARABIRA 01": "2",
+    "GUARABIRA 02": "2",
+    "GUARABIRA 03": "2",
+    "GUARABIRA 04": "2",
+    "CAMPINA GRANDE 01": "3",
+    "CAMPINA GRANDE 02": "3",
+    "CAMPINA GRANDE 03": "3",
+    "CAMPINA GRANDE 04": "3",
+    "CAMPINA GRANDE 05": "3",
+    "CAMPINA GRANDE 06": "3",
+    "CAMPINA GRANDE 07": "3",
+    "CAMPINA GRANDE 08": "3",
+    "CAMPINA GRANDE 09": "3",
+    "CUITE 01": "4",
+    "CUITE 02": "4",
+    "MONTEIRO 01": "5",
+    "MONTEIRO 02": "5",
+    "PATOS 01": "6",
+    "PATOS 02": "6",
+    "PATOS 03": "6",
+    "ITAPORANGA 01": "7",
+    "ITAPORANGA 02": "7",
+    "CATOLE 01": "8",
+    "CATOLE 02": "8",
+    "CAJAZEIRAS 01": "9",
+    "CAJAZEIRAS 02": "9",
+    "SOUSA 01": "10",
+    "SOUSA 02": "10",
+    "PRINCESA ISABEL": "11",
+    "ITABAIANA 01": "12",
+    "ITABAIANA 02": "12",
+    "POMBAL": "13",
+    "MAMANGUAPE 01": "14",
+    "MAMANGUAPE 02": "14",
+    "QUEIMADAS 01": "15",
+    "QUEIMADAS 02": "15",
+    "QUEMADAS 03": "15",
+    "SANTA RITA 01": "16",
+    "SANTA RITA 02": "16",
+    "SANTA RITA 03": "16",
+    "SANTA RITA 04": "16",
+    "SANTA RITA 05": "16",
+    "SANTA RITA 06": "16",
+    "SANTA RITA 07": "16",
+}
+
+
+# Colunas exigidas no cabeçalho das planilhas de origem, validadas no upload.
+# Cada item lista nomes alternativos (após normalizar_nome; presença usa os
+# nomes exatos exigidos por process_base_presenca).
+CABECALHOS_OBRIGATORIOS = {
+    "estrutural": [
+        ("coescolacenso", "codigoescola"),
+        ("polo", "regional"),
+        ("municipio", "cidade"),
+        ("turma",),
+    ],
+    "agendamentos": [
+        ("coescolacenso", "codigoescola"),
+        ("coturmacenso", "turmacenso", "codturma", "turma"),
+        ("polo", "regional"),
+        ("diaaplicacao", "diaplicacao", "dia", "dataaplicacao"),
+    ],
+    "presenca": [
+        (coluna,)
+        for coluna in PRESENCA_COLUNAS_ENTRADA
+        if coluna not in ("QtdAlunosPrevistos", "QtdAlunosPresentes")
+    ]
+    + [("QtdAlunosPrevistos", "Alocados"), ("QtdAlunosPresentes", "Presentes")],
+    "pendentes": [
+        ("gre", "regional", "gerenciaregional", "polo", "municipio", "cidade"),
+    ],
+}
+
+ORIGENS = {
+    "estrutural": (DATA_ORIGEM / "Base_Estrutural", "Base_Estrutural"),
+    "agendamentos": (DATA_ORIGEM / "Alocacoes", "Alocacoes"),
+    "presenca": (DATA_ORIGEM / "Percentual_Presenca", "Percentual_Presenca"),
+    "pendentes": (DATA_ORIGEM / "Registros_Pendentes", "Registros_Pendentes"),
+}
+
+ARQUIVOS_SAIDA = {
+    "estrutural": "base_estrutural.parquet",
+    "estrutural_normalizado": "base_estrutural_normalizado.parquet",
+    "agendamentos": "base_agendamentos.parquet",
+    "presenca": "base_percentual_presenca.parquet",
+    "aplicacoes_presenca": "base_aplicacoes_presenca.parquet",
+    "cubo_estrutural": "base_cubo_estrutural.parquet",
+    "pendentes": "base_registros_pendentes.parquet",
+}
+
+# Colunas de partição (GRE e dia de aplicação) das bases gravadas também em
+# layout particionado; nomes após normalize_columns. Pendentes não tem dia de
+# aplicação e é particionada só por GRE.
+PARTICOES = {
+    "agendamentos": ["gre", "diaaplicacao"],
+    "presenca": ["gRE", "diaAplicacao"],
+    "pendentes": ["gre"],
+}
+
+# Bases com modo incremental: coluna de id do registro e colunas usadas como
+# chave quando o id está vazio (nomes após normalize_columns)
+CHAVES_DELTA = {
+    "agendamentos": ("aplicacaoid", ("coturmacenso", "diaaplicacao")),
+}
+
+# Chave natural dos documentos de cada base no Firestore, no formato de
+# CHAVES_DELTA (coluna de id, colunas usadas quando o id está vazio; nomes após
+# normalize_columns). O ID do documento é derivado dela (id_documento), então
+# reenviar a base atualiza os documentos em vez de duplicá-los. Agendamentos
+# usa a mesma chave do delta, para que o modo incremental regrave só as linhas
+# alteradas. Pendentes não tem chave natural: None usa a linha inteira.
+CHAVES_FIRESTORE = {
+    "estrutural": ("coturmacenso", ("coescolacenso", "turma")),
+    "agendamentos": CHAVES_DELTA["agendamentos"],
+    "presenca": ("", ("coturmacenso", "diaaplicacao")),
+    "pendentes": None,
+}
+TAMANHO_MAXIMO_ID = 500
+
+# Progresso das etapas: progresso(etapa, estado, segundos), chamado com
+# ETAPA_INICIADA ao começar e ETAPA_CONCLUIDA (com a duração) ao terminar
+Progresso = Callable[[str, str, Union[float, None]], None]
+ETAPA_INICIADA = "executando"
+ETAPA_CONCLUIDA = "concluida"
+ETAPA_IGNORADA = "ignorada"
+# validação, modo incremental e gravação do snapshot
+ETAPA_PUBLICACAO = "publicacao"
+
+COLECOES_FIRESTORE = [
+    ("estrutural", "siave_estrutural", "base_estrutural"),
+    ("agendamentos", "siave_agendamentos", "base_agendamentos"),
+    ("presenca", "siave_presenca", "base_percentual_presenca"),
+    ("pendentes", "siave_pendencias", "base_pendencias"),
+]
+
+
+def ensure_folder(path: Path) -> None:
+    path.mkdir(parents=True, exist_ok=True)
+
+
+def normalize_columns(df):
+    """
+    Converte colunas para:
+    - lowercase
+    - sem acentos
+    - substitui espaços por _
+    - remove caracteres especiais
+    """
+    df.columns = normalizar_colunas(df.columns, "snake")
+    return df
+
+
+def normalizar_municipio(x) -> Union[str, None]:
+    if pd.isna(x):
+        return pd.NA
+    txt = remove_accents(str(x)).lower()
+    txt = re.sub(r"[^a-z0-9 ]", " ", txt)
+    txt = " ".join(txt.split())
+    return txt if txt else pd.NA
+
+
+def normalizar_gre(valor) -> Union[str, None]:
+    """
+    Converte entradas como '11a GRE', '11 a gre', '11\\u00AA Gre', '11 a gre', '11\\u00AA GRE'
+    para o formato oficial '11\\u00AA GRE'.
+    """
+    if pd.isna(valor):
+        return pd.NA
+    texto = remove_accents(str(valor)).upper()
+    digitos = re.findall(r"\d+", texto)
+    if not digitos:
+        return pd.NA
+    numero = digitos[0].lstrip("0") or "0"
+    try:
+        numero_int = int(numero)
+    except ValueError:
+        return pd.NA
+    return f"{numero_int}{ORDINAL_SUFFIX} GRE"
+
+
+def normalizar_string(x) -> Union[str, None]:
+    if pd.isna(x):
+        return None
+    txt = remove_accents(str(x)).strip()
+    return txt if txt else None
+
+
+def require_columns(df, required, name):
+    missing = [c for c in required if c not in df.columns]
+    if missing:
+        raise ValueError(
+            f"[ERRO LOADER] Base '{name}' está faltando colunas obrigatórias: {missing}"
+        )
+
+
+def validate_all_bases(df_estrutural, df_agendamentos, df_presenca):
+    """Bases não reprocessadas nesta execução (None) não são validadas."""
+    if df_estrutural is not None:
+        require_columns(
+            df_estrutural,
+            ["municipio", "polo", "gre", "coescolacenso", "turma", "serie", "turno", "localizacao"],
+            "Estrutural",
+        )
+
+    if df_agendamentos is not None:
+        require_columns(
+            df_agendamentos,
+            ["municipio", "polo", "gre", "coescolacenso", "coturmacenso", "turma", "diaaplicacao", "dataagendamento"],
+            "Agendamentos",
+        )
+
+    if df_presenca is not None:
+        require_columns(
+            df_presenca,
+            PRESENCA_SCHEMA,
+            "Presenca",
+        )
+
+
+def validar_cabecalho(colunas: list[str], base: str) -> None:
+    """
+    Confere se o cabeçalho de uma planilha de origem tem as colunas de que o
+    loader precisa (CABECALHOS_OBRIGATORIOS). Lança ValueError listando as
+    colunas ausentes.
+    """
+    if not [c for c in colunas if str(c).strip()]:
+        raise ValueError(f"[ERRO LOADER] Planilha de '{base}' sem cabeçalho na primeira linha.")
+    if base == "presenca":
+        presentes = {str(c).strip() for c in colunas}
+    else:
+        presentes = {normalizar_nome(c) for c in colunas}
+    faltantes = [
+        " ou ".join(alternativas)
+        for alternativas in CABECALHOS_OBRIGATORIOS.get(base, [])
+        if not presentes.intersection(alternativas)
+    ]
+    if faltantes:
+        raise ValueError(
+            f"[ERRO LOADER] Planilha de '{base}' está faltando colunas obrigatórias: {faltantes}"
+        )
+
+
+def latest_file_with_prefix(folder: Path, prefix: str) -> Path | None:
+    ensure_folder(folder)
+    arquivos = sorted(folder.glob(f"{prefix}-*.xlsx"), key=lambda f: f.stat().st_mtime)
+    return arquivos[-1] if arquivos else None
+
+
+def pick_column(df: pd.DataFrame, norm_map: dict[str, str], candidates: list[str]) -> pd.Series | None:
+    for cand in candidates:
+        if cand in norm_map:
+            return df[norm_map[cand]]
+    return None
+
+
+def serie_texto(df: pd.DataFrame, norm_map: dict[str, str], candidates: list[str]) -> pd.Series:
+    col = pick_column(df, norm_map, candidates)
+    if col is None:
+        return pd.Series(pd.NA, index=df.index, dtype="string")
+    return texto_canonico(col)
+
+
+def serie_numero(df: pd.DataFrame, norm_map: dict[str, str], candidates: list[str]) -> pd.Series:
+    col = pick_column(df, norm_map, candidates)
+    if col is None:
+        return pd.Series(pd.NA, index=df.index, dtype="Int64")
+    return pd.to_numeric(col, errors="coerce").astype("Int64")
+
+
+def serie_data(df: pd.DataFrame, norm_map: dict[str, str], candidates: list[str]) -> pd.Series:
+    col = pick_column(df, norm_map, candidates)
+    if col is None:
+        return pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+    return pd.to_datetime(col, dayfirst=True, errors="coerce")
+
+
+def gre_from_polo(polo_series: pd.Series) -> pd.Series:
+    polo_norm = aplicar_por_valores_unicos(polo_series.astype("string").fillna(""), normalize_upper)
+    return polo_norm.map(POLO_TO_GRE)
+
+
+def process_base_estrutural(path: Path) -> tuple[pd.DataFrame, pd.DataFrame]:
+    df_raw = ler_planilha(path)
+    norm_map = {normalizar_nome(c): c for c in df_raw.columns}
+
+    df = pd.DataFrame(index=df_raw.index)
+    df["UF"] = serie_texto(df_raw, norm_map, ["uf"])
+    df["Polo"] = serie_texto(df_raw, norm_map, ["polo", "regional"])
+    df["coEscolaCenso"] = serie_texto(df_raw, norm_map, ["coescolacenso", "codigoescola"])
+    df["Escola"] = serie_texto(df_raw, norm_map, ["escola", "nomeescola"])
+    df["Municipio"] = aplicar_por_valores_unicos(
+        serie_texto(df_raw, norm_map, ["municipio", "cidade"]), normalizar_municipio
+    )
+    df["Localizacao"] = serie_texto(df_raw, norm_map, ["localizacao", "localizacaoescola", "localidade"])
+    df["Rede"] = serie_texto(df_raw, norm_map, ["rede", "tiporede"])
+    df["Telefone1"] = serie_texto(df_raw, norm_map, ["telefone1", "telefone", "tel1"])
+    df["Telefone2"] = serie_texto(df_raw, norm_map, ["telefone2", "tel2"])
+    df["CoTurmaCenso"] = serie_texto(df_raw, norm_map, ["coturmacenso", "turmacenso", "codturma", "turma"])
+    df["Turma"] = serie_texto(df_raw, norm_map, ["turma"])
+    df["Serie"] = serie_texto(df_raw, norm_map, ["serie", "serieano"])
+    df["Turno"] = serie_texto(df_raw, norm_map, ["turno"])
+    df["ObservacoesDaEscola"] = serie_texto(df_raw, norm_map, ["observacoesdaescola", "observacoes", "observacao", "obsescola"])
+    df["TemCiencias"] = serie_texto(df_raw, norm_map, ["temciencias", "ciencias"])
+    df["QtdDiasAplicacao"] = serie_numero(df_raw, norm_map, ["qtddiasaplicacao", "diasaplicacao", "qtdiasaplicacao", "quantidadedias"])
+    df["gRE"] = serie_texto(df_raw, norm_map, ["gre"])
+    df["diaAplicacao"] = serie_texto(df_raw, norm_map, ["diaaplicacao", "diaplicacao", "dia", "dataaplicacao"])
+
+    gre_fallback = gre_from_polo(df["Polo"])
+    df["gRE"] = df["gRE"].where(~df["gRE"].isna(), gre_fallback)
+    df["gRE"] = aplicar_por_valores_unicos(df["gRE"], normalizar_gre)
+    df["coEscolaCenso"] = df["coEscolaCenso"].astype("string").str.strip().replace({"": pd.NA})
+
+    df = df.reindex(columns=ESTRUTURAL_SCHEMA)
+
+    df_normalizado = df.copy()
+    df_normalizado.columns = normalizar_colunas(df_normalizado.columns, "camel_estrutural")
+    df_normalizado["municipio_norm"] = aplicar_por_valores_unicos(df_normalizado["municipio"], normalizar_municipio)
+
+    return df, df_normalizado
+
+
+def process_base_agendamentos(path: Path) -> pd.DataFrame:
+    return transformar_agendamentos(ler_planilha(path))
+
+
+def transformar_agendamentos(df_raw: pd.DataFrame) -> pd.DataFrame:
+    norm_map = {normalizar_nome(c): c for c in df_raw.columns}
+
+    df = pd.DataFrame(index=df_raw.index)
+    df["uf"] = serie_texto(df_raw, norm_map, ["uf"])
+    df["polo"] = serie_texto(df_raw, norm_map, ["polo", "regional"])
+    df["coEscolaCenso"] = serie_texto(df_raw, norm_map, ["coescolacenso", "codigoescola"])
+    df["coTurmaCenso"] = serie_texto(df_raw, norm_map, ["coturmacenso", "turmacenso", "codturma", "turma"])
+    df["escola"] = serie_texto(df_raw, norm_map, ["escola", "nomeescola"])
+    df["municipio"] = aplicar_por_valores_unicos(
+        serie_texto(df_raw, norm_map, ["municipio", "cidade"]), normalizar_municipio
+    )
+    df["turma"] = serie_texto(df_raw, norm_map, ["turma"])
+    df["serie"] = serie_texto(df_raw, norm_map, ["serie", "serieano"])
+    df["turno"] = serie_texto(df_raw, norm_map, ["turno"])
+    df["tipoAplic"] = serie_texto(df_raw, norm_map, ["tipoaplic", "tipoaplicacao", "aplicacao"])
+    df["statusAplicacao"] = serie_texto(df_raw, norm_map, ["statusaplicacao", "status", "statusaplic"])
+    df["localizacao"] = serie_texto(df_raw, norm_map, ["localizacao", "localizacaoescola", "localidade"])
+    df["tipoRede"] = serie_texto(df_raw, norm_map, ["tiporede", "rede"])
+    df["aplicador"] = serie_texto(df_raw, norm_map, ["aplicador", "aplicadora", "aplicadornome"])
+    df["cpf"] = serie_texto(df_raw, norm_map, ["cpf", "aplicadorcpf"])
+    df["qtdAlunosPrevistos"] = serie_numero(df_raw, norm_map, ["qtdalunosprevistos", "alocados", "qtdalunos"])
+    df["diaAplicacao"] = serie_texto(df_raw, norm_map, ["diaaplicacao", "diaplicacao", "dia", "dataaplicacao"])
+    df["dataAgendamento"] = serie_data(df_raw, norm_map, ["dataagendamento", "dataagendmento", "agendamento", "dataaplicacao"])
+    df["gRE"] = serie_texto(df_raw, norm_map, ["gre"])
+    df["aplicacaoId"] = serie_texto(df_raw, norm_map, ["aplicacaoid", "idaplicacao", "id"])
+
+    gre_fallback = gre_from_polo(df["polo"])
+    df["gRE"] = df["gRE"].where(~df["gRE"].isna(), gre_fallback)
+    df["gRE"] = aplicar_por_valores_unicos(df["gRE"], normalizar_gre)
+    df["coEscolaCenso"] = df["coEscolaCenso"].astype("string").str.strip().replace({"": pd.NA})
+
+    return df.reindex(columns=AGENDAMENTOS_SCHEMA)
+
+
+def process_base_presenca(df_presence_raw: pd.DataFrame, df_estrutural_norm: pd.DataFrame) -> pd.DataFrame:
+    df_raw = df_presence_raw.copy()
+    df_raw.columns = [str(c).strip() for c in df_raw.columns]
+    if "QtdAlunosPrevistos" not in df_raw.columns and "Alocados" in df_raw.columns:
+        df_raw["QtdAlunosPrevistos"] = df_raw["Alocados"]
+    if "QtdAlunosPresentes" not in df_raw.columns and "Presentes" in df_raw.columns:
+        df_raw["QtdAlunosPresentes"] = df_raw["Presentes"]
+
+    require_columns(df_raw, PRESENCA_COLUNAS_ENTRADA, "Presenca (entrada)")
+
+    mapeamento = {
+        "UF": "uf",
+        "Polo": "polo",
+        "CoEscolaCenso": "coEscolaCenso",
+        "Escola": "escola",
+        "TipoRede": "tipoRede",
+        "Localizacao": "localizacao",
+        "Dia": "diaAplicacao",
+        "Serie": "serie",
+        "TipoAplic": "tipoAplic",
+        "Turno": "turno",
+        "CoTurmaCenso": "coTurmaCenso",
+        "Turma": "turma",
+        "Agendamento": "dataReal",
+        "QtdAlunosPrevistos": "qtdAlunosPrevistos",
+        "QtdAlunosPresentes": "qtdAlunosPresentes",
+        "Percentual": "percentual",
+    }
+
+    df_presence = df_raw.rename(columns=mapeamento)
+    for col in mapeamento.values():
+        if col not in df_presence.columns:
+            df_presence[col] = pd.NA
+
+    municipio_escola = df_raw.get("MunicipioEscola")
+    municipio_polo = df_raw.get("MunicipioPolo")
+    municipio_base = municipio_escola if municipio_escola is not None else pd.Series(pd.NA, index=df_raw.index)
+    municipio_fallback = municipio_polo if municipio_polo is not None else pd.Series(pd.NA, index=df_raw.index)
+    df_presence["municipio"] = (
+        municipio_base.fillna(municipio_fallback)
+        .astype("string")
+        .str.strip()
+        .str.upper()
+    )
+
+    # códigos e dia na forma única de texto_canonico (chaves da junção)
+    df_presence["coEscolaCenso"] = texto_canonico(df_presence["coEscolaCenso"])
+    df_presence["coTurmaCenso"] = texto_canonico(df_presence["coTurmaCenso"])
+    df_presence["diaAplicacao"] = texto_canonico(df_presence["diaAplicacao"])
+    df_presence["turma"] = df_presence["turma"].astype("string").str.strip()
+    df_presence["serie"] = df_presence["serie"].astype("string").str.strip()
+    df_presence["tipoAplic"] = df_presence["tipoAplic"].astype("string").str.strip()
+    df_presence["turno"] = df_presence["turno"].astype("string").str.strip()
+    df_presence["polo"] = df_presence["polo"].astype("string").str.strip()
+    df_presence["uf"] = df_presence["uf"].astype("string").str.strip()
+    df_presence["tipoRede"] = df_presence["tipoRede"].astype("string").str.strip()
+    df_presence["localizacao"] = df_presence["localizacao"].astype("string").str.strip()
+    df_presence["escola"] = df_presence["escola"].astype("string").str.strip()
+
+    df_presence["dataReal"] = pd.to_datetime(df_presence["dataReal"], dayfirst=True, errors="coerce")
+    df_presence["qtdAlunosPrevistos"] = pd.to_numeric(df_presence["qtdAlunosPrevistos"], errors="coerce").fillna(0).astype(int)
+    df_presence["qtdAlunosPresentes"] = pd.to_numeric(df_presence["qtdAlunosPresentes"], errors="coerce").fillna(0).astype(int)
+    df_presence["percentual"] = pd.to_numeric(df_presence["percentual"], errors="coerce")
+
+    # a base estrutural tem uma linha por turma: uma linha por escola na
+    # consulta, para não repetir cada linha de presença por turma da escola
+    escolas = df_estrutural_norm[["coEscolaCenso", "municipio", "gRE"]].drop_duplicates("coEscolaCenso")
+    df_merge = df_presence.merge(
+        escolas,
+        on="coEscolaCenso",
+        how="left",
+        suffixes=("", "_estrut"),
+    )
+    if "municipio_estrut" in df_merge.columns:
+        df_merge["municipio"] = df_merge["municipio"].fillna(df_merge["municipio_estrut"])
+        df_merge.drop(columns=["municipio_estrut"], inplace=True)
+    df_merge["municipio"] = df_merge["municipio"].astype("string").str.strip().str.upper()
+
+    if "gRE" in df_merge.columns:
+        df_merge["gRE"] = df_merge["gRE"].astype("string").str.strip()
+
+    df_final = df_merge[PRESENCA_SCHEMA].copy()
+    return df_final
+
+
+def process_base_pendentes(path: Path) -> pd.DataFrame:
+    df = ler_planilha(path)
+    new_cols = {col: remove_accents(str(col)).strip() for col in df.columns}
+    df = df.rename(columns=new_cols)
+    gre_cols = [c for c in df.columns if c.lower() == "gre"]
+    if gre_cols:
+        df = df.rename(columns={gre_cols[0]: "gRE"})
+    if "gRE" in df.columns:
+        df["gRE"] = aplicar_por_valores_unicos(df["gRE"], normalizar_gre)
+    mun_cols = [c for c in df.columns if normalizar_nome(c) == "municipio"]
+    if mun_cols:
+        df["municipio"] = aplicar_por_valores_unicos(df[mun_cols[0]], normalizar_municipio)
+    return df
+
+
+def gerar_agendamentos_streaming(origem: Path, destino: Path, linhas_por_bloco: int = LINHAS_POR_BLOCO) -> None:
+    gravar_parquet_em_blocos(
+        (
+            aplicar_esquema(normalize_columns(transformar_agendamentos(bloco)), "agendamentos")
+            for bloco in iter_planilha_blocos(origem, linhas_por_bloco)
+        ),
+        destino,
+        lambda: aplicar_esquema(normalize_columns(transformar_agendamentos(pd.DataFrame())), "agendamentos"),
+        tipos_arrow("agendamentos"),
+    )
+
+
+def gerar_presenca_streaming(
+    origem: Path, df_estrutural_norm: pd.DataFrame, destino: Path, linhas_por_bloco: int = LINHAS_POR_BLOCO
+) -> None:
+    gravar_parquet_em_blocos(
+        (
+            aplicar_esquema(process_base_presenca(bloco, df_estrutural_norm), "presenca")
+            for bloco in iter_planilha_blocos(origem, linhas_por_bloco)
+        ),
+        destino,
+        lambda: aplicar_esquema(
+            process_base_presenca(pd.DataFrame(columns=PRESENCA_COLUNAS_ENTRADA), df_estrutural_norm), "presenca"
+        ),
+        tipos_arrow("presenca"),
+    )
+
+
+def comparar_streaming(base_paths: dict[str, Path | None], linhas_por_bloco: int = 1_000) -> pd.DataFrame:
+    """
+    Gera agendamentos e presença nos dois modos, sem o cache (leitura completa
+    gravada por gravar_base e streaming em blocos de `linhas_por_bloco`
+    linhas), e compara os Parquets: schema (pq.read_schema) e conteúdo lido.
+    Lança ValueError, com a comparação, se algum schema ou conteúdo diferir.
+    """
+    _, df_estrutural_norm = process_base_estrutural(base_paths["estrutural"])
+    modos: dict[str, tuple[Callable[[], pd.DataFrame], Callable[[Path], None]]] = {
+        "agendamentos": (
+            lambda: normalize_columns(process_base_agendamentos(base_paths["agendamentos"])),
+            lambda destino: gerar_agendamentos_streaming(base_paths["agendamentos"], destino, linhas_por_bloco),
+        ),
+        "presenca": (
+            lambda: process_base_presenca(ler_planilha(base_paths["presenca"]), df_estrutural_norm),
+            lambda destino: gerar_presenca_streaming(
+                base_paths["presenca"], df_estrutural_norm, destino, linhas_por_bloco
+            ),
+        ),
+    }
+    linhas = []
+    with tempfile.TemporaryDirectory() as pasta:
+        for nome, (completo, streaming) in modos.items():
+            arq_completo = Path(pasta) / f"{nome}_completo.parquet"
+            arq_streaming = Path(pasta) / f"{nome}_streaming.parquet"
+            gravar_base(completo(), nome, arq_completo)
+            streaming(arq_streaming)
+            schema_completo, schema_streaming = pq.read_schema(arq_completo), pq.read_schema(arq_streaming)
+            try:
+                pd.testing.assert_frame_equal(pd.read_parquet(arq_completo), pd.read_parquet(arq_streaming))
+                diferenca = ""
+            except AssertionError as exc:
+                diferenca = str(exc).splitlines()[0]
+            linhas.append(
+                {
+                    "base": nome,
+                    "linhas": pq.ParquetFile(arq_completo).metadata.num_rows,
+                    "row_groups": pq.ParquetFile(arq_streaming).metadata.num_row_groups,
+                    "mesmo_schema": schema_completo.equals(schema_streaming),
+                    "mesmo_conteudo": not diferenca,
+                    "diferenca": diferenca,
+                }
+            )
+    comparacao = pd.DataFrame(linhas)
+    if not (comparacao["mesmo_schema"] & comparacao["mesmo_conteudo"]).all():
+        raise ValueError(
+            "Os modos com e sem streaming gravaram Parquets diferentes:\n" + comparacao.to_string(index=False)
+        )
+    return comparacao
+
+
+def colunas_da_base(base: pd.DataFrame | Path) -> pd.DataFrame:
+    """Bases gravadas em streaming são validadas pelo schema, sem carregar as linhas."""
+    if isinstance(base, Path):
+        return pq.read_schema(base).empty_table().to_pandas()
+    return base
+
+
+def id_documento(chave: str) -> str:
+    """
+    ID do documento no Firestore para a chave de um registro (ver
+    chaves_registro). A chave é codificada para não conter "/"; chaves muito
+    longas (ex.: conteúdo da linha inteira) viram um hash.
+    """
+    codificada = quote(chave, safe=":|#")
+    if len(codificada) <= TAMANHO_MAXIMO_ID:
+        return codificada
+    return _hash_chave(chave)
+
+
+def _hash_chave(chave: str) -> str:
+    return "sha256:" + hashlib.sha256(chave.encode("utf-8")).hexdigest()
+
+
+def ids_documentos(df: pd.DataFrame, nome: str) -> pd.Index:
+    """IDs dos documentos das linhas de `df` (colunas já normalizadas) na coleção da base `nome`."""
+    chave = CHAVES_FIRESTORE.get(nome)
+    if chave is None:
+        # sem chave natural: hash do conteúdo da linha
+        return chaves_registro(df, "", tuple(df.columns)).map(_hash_chave)
+    return chaves_registro(df, *chave).map(id_documento)
+
+
+def _ids_arquivo(base: Path, nome: str) -> pd.Index:
+    # lê só as colunas da chave do Parquet gravado em streaming
+    nomes = pq.read_schema(base).names
+    por_coluna = dict(zip(normalizar_colunas(nomes, "snake"), nomes))
+    coluna_id, alternativas = CHAVES_FIRESTORE.get(nome) or ("", tuple(por_coluna))
+    colunas = [por_coluna[c] for c in (coluna_id, *alternativas) if c in por_coluna]
+    return ids_documentos(normalize_columns(pd.read_parquet(base, columns=colunas)), nome)
+
+
+def delta_aplicavel(collection: str, modo: str, delta: ResumoDelta, documentos: int) -> bool:
+    """
+    Indica se a coleção está na base anterior ao `delta`, para que baste
+    enviar o delta: a última sincronização terminou (quantidade registrada no
+    controle), no mesmo `modo`, com a quantidade de documentos da base antes
+    do delta (`documentos` menos os inseridos, mais os removidos). Uma
+    sincronização que falhou depois da publicação deixa a coleção atrás do
+    snapshot publicado, e o delta seguinte não a alcançaria.
+    """
+    controle = read_control(collection)
+    if not controle or controle.get("documentos") is None:
+        return False
+    if controle.get("modo", MODO_DOCUMENTOS) != modo:
+        return False
+    return controle["documentos"] == documentos - delta.inseridos + delta.removidos
+
+
+def sincronizar_base(
+    nome: str,
+    base: pd.DataFrame | Path,
+    collection: str,
+    delta: ResumoDelta | None = None,
+    modo: str = MODO_DOCUMENTOS,
+) -> bool:
+    """
+    Grava a base na coleção com IDs determinísticos (ver CHAVES_FIRESTORE) e
+    remove os documentos que não correspondem a nenhuma linha atual, de modo
+    que a coleção fique igual à base. Com o delta do modo incremental, só as
+    linhas inseridas ou atualizadas são regravadas (e, com o delta vazio, nada
+    é enviado), desde que a coleção esteja na base anterior ao delta (ver
+    delta_aplicavel); senão a base inteira é sincronizada. Devolve False se
+    nada foi enviado.
+
+    Os documentos gravados recebem o mesmo CAMPO_ATUALIZACAO, registrado no
+    documento de controle da coleção junto com a quantidade de documentos
+    (ver src.espelho_firestore). O controle é gravado também no início, sem a
+    quantidade, para que uma sincronização interrompida não pareça concluída.
+
+    Com modo=MODO_BLOCOS, a base é gravada em blocos (ver save_table_chunks)
+    e os documentos por linha da coleção são removidos; o controle registra o
+    modo, que os leitores usam para escolher como ler a coleção.
+    """
+    if modo == MODO_BLOCOS:
+        # nos blocos o delta só dispensa o envio; cada linha conta como documento
+        documentos = pq.ParquetFile(base).metadata.num_rows if isinstance(base, Path) else len(base)
+    else:
+        if isinstance(base, Path):
+            ids = _ids_arquivo(base, nome)
+        else:
+            dados = normalize_columns(base.copy())
+            ids = ids_documentos(dados, nome)
+        documentos = int(ids.nunique())
+    # o controle é lido antes de ser marcado como em andamento
+    if delta is not None and not delta_aplicavel(collection, modo, delta, documentos):
+        log(f"Coleção '{collection}' fora da base anterior ao delta; sincronizando a base inteira.")
+        delta = None
+    if delta is not None and delta.vazio:
+        return False
+
+    atualizado_em = datetime.now(timezone.utc)
+    write_control(collection, {"atualizadoEm": atualizado_em, "documentos": None, "modo": modo})
+    if modo == MODO_BLOCOS:
+        if isinstance(base, Path):
+            tabela = pq.read_table(base)
+            tabela = tabela.rename_columns(normalizar_colunas(tabela.column_names, "snake"))
+        else:
+            tabela = pa.Table.from_pandas(normalize_columns(base.copy()), preserve_index=False)
+        save_table_chunks(collection, tabela)
+        delete_collection(collection)
+        write_control(collection, {"atualizadoEm": atualizado_em, "documentos": tabela.num_rows, "modo": modo})
+        return True
+
+    delete_collection(chunks_collection(collection))
+    existentes = list_document_ids(collection)
+
+    if delta is not None and delta.arquivo is not None:
+        alteradas = pd.read_parquet(delta.arquivo)
+        alteradas = alteradas[alteradas[COLUNA_OPERACAO] != REMOVIDO]
+        upsert_dataframe(
+            collection,
+            normalize_columns(alteradas.drop(columns=[COLUNA_CHAVE, COLUNA_OPERACAO])),
+            alteradas[COLUNA_CHAVE].map(id_documento).tolist(),
+            atualizado_em,
+        )
+    elif isinstance(base, Path):
+        # lê um row group por vez para manter a memória constante; os lotes
+        # de todos os row groups seguem para o mesmo escritor concorrente
+        def operacoes() -> Iterator[Operacao]:
+            inicio = 0
+            for lote in pq.ParquetFile(base).iter_batches():
+                yield from upsert_operations(
+                    normalize_columns(lote.to_pandas()), ids[inicio : inicio + lote.num_rows], atualizado_em
+                )
+                inicio += lote.num_rows
+
+        write_documents(collection, operacoes())
+    else:
+        upsert_dataframe(collection, dados, ids, atualizado_em)
+
+    if existentes is not None:
+        # linhas removidas da base e documentos de versões anteriores (IDs automáticos)
+        delete_documents(collection, existentes.difference(ids))
+    write_control(collection, {"atualizadoEm": atualizado_em, "documentos": documentos, "modo": modo})
+    return True
+
+
+def sincronizar_firestore(
+    bases: dict[str, pd.DataFrame | Path],
+    deltas: dict[str, ResumoDelta] | None = None,
+    progresso: Progresso | None = None,
+    modo: str = MODO_DOCUMENTOS,
+) -> None:
+    """
+    Envia as bases ao Firestore no `modo` de armazenamento (MODO_DOCUMENTOS ou
+    MODO_BLOCOS); bases ausentes de `bases` não são reenviadas, e as de delta
+    vazio só se a coleção não estiver sincronizada (ver sincronizar_base).
+    O progresso é informado por coleção.
+    """
+    deltas = deltas or {}
+    progresso = progresso or _sem_progresso
+    for nome, collection, _ in COLECOES_FIRESTORE:
+        # bases não reprocessadas (fora da seleção)
+        if nome not in bases:
+            progresso(collection, ETAPA_IGNORADA, None)
+            continue
+        progresso(collection, ETAPA_INICIADA, None)
+        inicio = time.perf_counter()
+        if sincronizar_base(nome, bases[nome], collection, deltas.get(nome), modo):
+            progresso(collection, ETAPA_CONCLUIDA, time.perf_counter() - inicio)
+        else:
+            progresso(collection, ETAPA_IGNORADA, None)
+
+
+@dataclass
+class RelatorioEtapa:
+    etapa: str
+    arquivo: str
+    cache_hit: bool
+    segundos: float
+
+
+@dataclass
+class ResultadoPipeline:
+    bases: dict[str, pd.DataFrame | Path]
+    etapas: list[RelatorioEtapa]
+    segundos: float
+    deltas: dict[str, ResumoDelta] = field(default_factory=dict)
+    versao: str | None = None
+
+
+class ErroEtapa(RuntimeError):
+    """Falha em uma etapa do pipeline; nenhuma saída foi publicada."""
+
+    def __init__(self, etapa: str, causa: BaseException):
+        super().__init__(f"Falha na etapa '{etapa}': {causa}")
+        self.etapa = etapa
+        self.causa = causa
+
+
+def localizar_origens(nomes: Sequence[str] | None = None) -> dict[str, Path | None]:
+    return {
+        nome: latest_file_with_prefix(pasta, prefixo)
+        for nome, (pasta, prefixo) in ORIGENS.items()
+        if nomes is None or nome in nomes
+    }
+
+
+def etapas_necessarias(selecao: Sequence[str]) -> list[str]:
+    """Etapas a executar para reprocessar `selecao`, na ordem de ORIGENS (presença exige a estrutural)."""
+    desconhecidas = [nome for nome in selecao if nome not in ORIGENS]
+    if desconhecidas:
+        raise ValueError(f"Bases desconhecidas: {desconhecidas}. Opções: {list(ORIGENS)}")
+    necessarias = set(selecao) | ({"estrutural"} if "presenca" in selecao else set())
+    return [nome for nome in ORIGENS if nome in necessarias]
+
+
+# Etapas em funções de módulo para poderem ser enviadas a outro processo.
+
+def etapa_estrutural(path: Path) -> ResultadoEtapa:
+    return executar_com_cache(
+        "estrutural",
+        VERSOES_ETAPAS["estrutural"],
+        [path],
+        lambda: process_base_estrutural(path),
+    )
+
+
+def etapa_agendamentos(path: Path, streaming: bool) -> ResultadoEtapa | ResultadoArquivo:
+    if streaming:
+        return executar_com_cache_em_arquivo(
+            "agendamentos",
+            VERSOES_ETAPAS["agendamentos"],
+            [path],
+            lambda destino: gerar_agendamentos_streaming(path, destino),
+            cache_dir=DIR_CACHE_INGESTAO / "streaming",
+        )
+    return executar_com_cache(
+        "agendamentos",
+        VERSOES_ETAPAS["agendamentos"],
+        [path],
+        lambda: process_base_agendamentos(path),
+    )
+
+
+def etapa_presenca(
+    path: Path,
+    df_estrutural_norm: pd.DataFrame,
+    chave_estrutural: str,
+    streaming: bool,
+) -> ResultadoEtapa | ResultadoArquivo:
+    if streaming:
+        return executar_com_cache_em_arquivo(
+            "presenca",
+            VERSOES_ETAPAS["presenca"],
+            [path],
+            lambda destino: gerar_presenca_streaming(path, df_estrutural_norm, destino),
+            dependencias=[chave_estrutural],
+            cache_dir=DIR_CACHE_INGESTAO / "streaming",
+        )
+    return executar_com_cache(
+        "presenca",
+        VERSOES_ETAPAS["presenca"],
+        [path],
+        lambda: process_base_presenca(ler_planilha(path), df_estrutural_norm),
+        dependencias=[chave_estrutural],
+    )
+
+
+def etapa_pendentes(path: Path) -> ResultadoEtapa:
+    return executar_com_cache(
+        "pendentes",
+        VERSOES_ETAPAS["pendentes"],
+        [path],
+        lambda: process_base_pendentes(path),
+    )
+
+
+def _sem_progresso(etapa: str, estado: str, segundos: float | None) -> None:
+    pass
+
+
+def _cronometrar(func: Callable[..., Any], *args: Any) -> tuple[Any, float]:
+    inicio = time.perf_counter()
+    resultado = func(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+def _executar_sequencial(
+    base_paths: dict[str, Path],
+    streaming: bool,
+    progresso: Progresso = _sem_progresso,
+    etapas: Sequence[str] = tuple(ORIGENS),
+) -> dict[str, tuple[Any, float]]:
+    resultados: dict[str, tuple[Any, float]] = {}
+    etapa_atual = "estrutural"
+
+    def executar(nome: str, func: Callable[..., Any], *args: Any) -> None:
+        nonlocal etapa_atual
+        if nome not in etapas:
+            return
+        etapa_atual = nome
+        progresso(nome, ETAPA_INICIADA, None)
+        resultados[nome] = _cronometrar(func, *args)
+        progresso(nome, ETAPA_CONCLUIDA, resultados[nome][1])
+
+    try:
+        executar("estrutural", etapa_estrutural, base_paths.get("estrutural"))
+        executar("agendamentos", etapa_agendamentos, base_paths.get("agendamentos"), streaming)
+        if "presenca" in etapas:
+            res_estrutural = resultados["estrutural"][0]
+            executar(
+                "presenca",
+                etapa_presenca,
+                base_paths["presenca"],
+                res_estrutural.frames[1],
+                res_estrutural.chave,
+                streaming,
+            )
+        executar("pendentes", etapa_pendentes, base_paths.get("pendentes"))
+    except Exception as exc:
+        raise ErroEtapa(etapa_atual, exc) from exc
+    return resultados
+
+
+def _executar_paralelo(
+    base_paths: dict[str, Path],
+    streaming: bool,
+    max_workers: int | None,
+    progresso: Progresso = _sem_progresso,
+    etapas: Sequence[str] = tuple(ORIGENS),
+) -> dict[str, tuple[Any, float]]:
+    # spawn: o processo do Streamlit tem várias threads e não deve ser copiado via fork
+    pool = ProcessPoolExecutor(
+        max_workers=max_workers or min(3, os.cpu_count() or 1),
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+    resultados: dict[str, tuple[Any, float]] = {}
+    independentes = {
+        "estrutural": (etapa_estrutural, base_paths.get("estrutural")),
+        "agendamentos": (etapa_agendamentos, base_paths.get("agendamentos"), streaming),
+        "pendentes": (etapa_pendentes, base_paths.get("pendentes")),
+    }
+    futuros: dict[Future, str] = {
+        pool.submit(_cronometrar, *args): nome for nome, args in independentes.items() if nome in etapas
+    }
+    for nome in futuros.values():
+        progresso(nome, ETAPA_INICIADA, None)
+    em_andamento = set(futuros)
+    try:
+        while em_andamento:
+            concluidos, em_andamento = wait(em_andamento, return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                nome = futuros[futuro]
+                try:
+                    resultados[nome] = futuro.result()
+                except Exception as exc:
+                    raise ErroEtapa(nome, exc) from exc
+                progresso(nome, ETAPA_CONCLUIDA, resultados[nome][1])
+                if nome == "estrutural" and "presenca" in etapas:
+                    # presença só depende da base estrutural normalizada
+                    res_estrutural = resultados[nome][0]
+                    futuro_presenca = pool.submit(
+                        _cronometrar,
+                        etapa_presenca,
+                        base_paths["presenca"],
+                        res_estrutural.frames[1],
+                        res_estrutural.chave,
+                        streaming,
+                    )
+                    futuros[futuro_presenca] = "presenca"
+                    em_andamento.add(futuro_presenca)
+                    progresso("presenca", ETAPA_INICIADA, None)
+    except BaseException:
+        # devolve a primeira falha sem esperar as etapas que ainda estão rodando
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown(wait=True)
+    return resultados
+
+
+def gravar_base(df: pd.DataFrame, nome: str, destino: Path) -> pd.DataFrame:
+    """
+    Grava a base `nome` com os dtypes de src.esquemas e os mesmos tipos do
+    Arrow (tipos_arrow) da gravação em blocos do modo streaming, para que o
+    Parquet publicado tenha o mesmo schema nos dois modos. Devolve a base tipada.
+    """
+    df = aplicar_esquema(df, nome)
+    tabela = pa.Table.from_pandas(df, schema=schema_arrow(df, tipos_arrow(nome)), preserve_index=False)
+    pq.write_table(tabela, destino)
+    return df
+
+
+def publicar_bases(
+    bases: dict[str, pd.DataFrame | Path],
+    destino: Path,
+    particionar: bool = False,
+    snapshots_mantidos: int = SNAPSHOTS_MANTIDOS,
+) -> dict[str, pd.DataFrame | Path]:
+    """
+    Grava as bases em um novo snapshot de `destino` e só então publica o
+    manifest.json que aponta para ele (ver src.snapshots), para que uma falha
+    ou um leitor concorrente nunca vejam saídas parciais ou misturadas.
+    Bases em memória são gravadas com os dtypes de src.esquemas; bases em
+    arquivo (modo streaming, já gravadas com eles) passam a apontar para o
+    Parquet publicado. Bases de ARQUIVOS_SAIDA ausentes de `bases` (modo
+    incremental sem alterações) são reaproveitadas do snapshot anterior.
+
+    Com `particionar`, as bases de PARTICOES também são gravadas em layout
+    particionado (ver src.dataset_particionado).
+    """
+    ensure_folder(destino)
+    versao, pasta = iniciar_snapshot(destino)
+    tipadas: dict[str, pd.DataFrame] = {}
+    try:
+        for nome, arquivo in ARQUIVOS_SAIDA.items():
+            if nome not in bases:
+                publicado = resolver_arquivo(destino / arquivo)
+                if publicado.exists():
+                    reaproveitar(publicado, pasta)
+                continue
+            base = bases[nome]
+            if isinstance(base, Path):
+                shutil.copyfile(base, pasta / arquivo)
+            else:
+                base = tipadas[nome] = gravar_base(base, nome, pasta / arquivo)
+            if particionar and nome in PARTICOES:
+                gravar_dataset(base, diretorio_dataset(pasta / arquivo), PARTICOES[nome])
+        manifesto = publicar_snapshot(destino, versao, pasta, snapshots_mantidos)
+    except BaseException:
+        shutil.rmtree(pasta, ignore_errors=True)
+        raise
+
+    # Parquets publicados diretamente em `destino` por versões anteriores do
+    # loader ficariam desatualizados
+    for arquivo in ARQUIVOS_SAIDA.values():
+        (destino / arquivo).unlink(missing_ok=True)
+        shutil.rmtree(diretorio_dataset(destino / arquivo), ignore_errors=True)
+
+    return {
+        nome: tipadas.get(nome, manifesto.caminho(destino, ARQUIVOS_SAIDA[nome]))
+        for nome in bases
+    }
+
+
+def calcular_incremental(
+    nome: str, novo: pd.DataFrame | Path, destino: Path
+) -> tuple[DeltaBase, pd.DataFrame | None]:
+    """
+    Compara o snapshot recém-processado da base `nome` com o Parquet publicado
+    em `destino` e devolve (delta, base atualizada). A base atualizada é a
+    anterior com o delta aplicado, ou None quando não há alterações.
+    """
+    if isinstance(novo, Path):
+        novo = pd.read_parquet(novo)
+    publicado = resolver_arquivo(destino / ARQUIVOS_SAIDA[nome])
+    anterior = pd.read_parquet(publicado) if publicado.exists() else novo.iloc[0:0]
+    coluna_id, alternativas = CHAVES_DELTA[nome]
+
+    delta = calcular_delta(anterior, novo, coluna_id, alternativas)
+    if delta.vazio:
+        return delta, None
+    return delta, aplicar_delta(anterior, delta, coluna_id, alternativas)
+
+
+def ler_saida(nome: str, a_publicar: dict[str, pd.DataFrame | Path], destino: Path) -> pd.DataFrame | None:
+    """Base `nome` a publicar ou, fora de `a_publicar`, a publicada em `destino` (None se não houver)."""
+    base = a_publicar.get(nome, resolver_arquivo(destino / ARQUIVOS_SAIDA[nome]))
+    if isinstance(base, Path):
+        return pd.read_parquet(base) if base.exists() else None
+    return base
+
+
+def montar_aplicacoes(
+    a_publicar: dict[str, pd.DataFrame | Path], destino: Path
+) -> pd.DataFrame | None:
+    """
+    Tabela de aplicações a partir das bases de agendamentos e presença a
+    publicar (ou, fora delas, das publicadas em `destino`); None sem
+    agendamentos. É refeita a cada execução, mesmo sem alterações nas bases,
+    para acompanhar mudanças na junção; o diagnóstico da junção vai para o log.
+    """
+    agendamentos = ler_saida("agendamentos", a_publicar, destino)
+    if agendamentos is None:
+        return None
+    df, diagnostico = montar_aplicacoes_presenca(agendamentos, ler_saida("presenca", a_publicar, destino))
+    log(f"Tabela de aplicações: {diagnostico.resumo()}.")
+    if diagnostico.sem_correspondencia:
+        log(f"Aviso: {AVISO_SEM_CORRESPONDENCIA}")
+    return df
+
+
+def montar_cubo_estrutural(
+    a_publicar: dict[str, pd.DataFrame | Path], destino: Path
+) -> pd.DataFrame | None:
+    """
+    Cubo de contagens do Dashboard Estrutural a partir da base estrutural
+    normalizada a publicar (ou da publicada em `destino`); None sem a base.
+    Como a tabela de aplicações, é refeito a cada execução.
+    """
+    estrutural = ler_saida("estrutural_normalizado", a_publicar, destino)
+    if estrutural is None:
+        return None
+    inicio = time.perf_counter()
+    cubo = montar_cubo(estrutural)
+    log(f"Cubo estrutural: {len(cubo)} linhas em {cubo['nivel'].nunique()} níveis ({time.perf_counter() - inicio:.1f}s).")
+    return cubo
+
+
+def executar_pipeline(
+    base_paths: dict[str, Path | None] | None = None,
+    streaming: bool = False,
+    paralelo: bool = False,
+    destino: Path = DATA_PROCESSADO,
+    max_workers: int | None = None,
+    incremental: bool = False,
+    particionar: bool = False,
+    snapshots_mantidos: int = SNAPSHOTS_MANTIDOS,
+    progresso: Progresso | None = None,
+    selecao: Sequence[str] | None = None,
+) -> ResultadoPipeline:
+    """
+    Processa as quatro bases e publica os Parquets, com a tabela de aplicações
+    (montar_aplicacoes) e o cubo estrutural (montar_cubo_estrutural), em um
+    novo snapshot de `destino` (ver publicar_bases).
+
+    - selecao: bases (chaves de ORIGENS) reprocessadas; as demais são
+      reaproveitadas do snapshot publicado. Presença exige a etapa estrutural,
+      que é executada (em geral a partir do cache), mas só é publicada se
+      selecionada. Por padrão, todas.
+    - base_paths: arquivos de origem por base; por padrão os mais recentes de data/origem
+    - streaming: lê Alocacoes e Presenca em blocos (ver src.excel_stream)
+    - paralelo: executa as etapas independentes em processos separados
+    - incremental: bases de CHAVES_DELTA aplicam só a diferença em relação à
+      base publicada; o delta é gravado em `destino`/deltas/<base>/
+    - particionar: grava também o layout particionado por GRE e dia (PARTICOES)
+    - snapshots_mantidos: quantidade de snapshots preservados em `destino`/snapshots
+    - progresso: recebe o início e o fim de cada etapa e da publicação (ver Progresso)
+    """
+    inicio = time.perf_counter()
+    selecao = list(selecao) if selecao is not None else list(ORIGENS)
+    etapas_executadas = etapas_necessarias(selecao)
+    base_paths = base_paths or localizar_origens(etapas_executadas)
+    faltantes = [nome for nome in etapas_executadas if base_paths.get(nome) is None]
+    if faltantes:
+        raise FileNotFoundError("Nenhum arquivo encontrado para: " + ", ".join(faltantes) + ".")
+
+    progresso = progresso or _sem_progresso
+    if paralelo:
+        resultados = _executar_paralelo(base_paths, streaming, max_workers, progresso, etapas_executadas)
+    else:
+        resultados = _executar_sequencial(base_paths, streaming, progresso, etapas_executadas)
+    progresso(ETAPA_PUBLICACAO, ETAPA_INICIADA, None)
+    inicio_publicacao = time.perf_counter()
+
+    etapas = [
+        RelatorioEtapa(nome, base_paths[nome].name, resultados[nome][0].cache_hit, resultados[nome][1])
+        for nome in etapas_executadas
+    ]
+
+    def saida(nome: str) -> pd.DataFrame | Path | None:
+        if nome not in selecao:
+            return None
+        res = resultados[nome][0]
+        return res.caminho if isinstance(res, ResultadoArquivo) else res.frames[0]
+
+    df_estrutural, df_estrutural_normalizado = (
+        resultados["estrutural"][0].frames if "estrutural" in selecao else (None, None)
+    )
+    df_agendamentos = saida("agendamentos")
+    df_presenca = saida("presenca")
+    df_pendentes = saida("pendentes")
+
+    # 1. Normalizar colunas (preserva presença para o schema final esperado;
+    #    no modo streaming agendamentos já é gravado normalizado)
+    if df_estrutural is not None:
+        df_estrutural = normalize_columns(df_estrutural)
+    if df_agendamentos is not None and not streaming:
+        df_agendamentos = normalize_columns(df_agendamentos)
+    if df_pendentes is not None:
+        df_pendentes = normalize_columns(df_pendentes)
+
+    # 2. Validar estrutura obrigatória
+    validate_all_bases(
+        df_estrutural,
+        colunas_da_base(df_agendamentos) if df_agendamentos is not None else None,
+        colunas_da_base(df_presenca) if df_presenca is not None else None,
+    )
+
+    # bases fora da seleção ficam de fora e são reaproveitadas por publicar_bases
+    a_publicar: dict[str, pd.DataFrame | Path] = {
+        nome: base
+        for nome, base in {
+            "estrutural": df_estrutural,
+            "estrutural_normalizado": df_estrutural_normalizado,
+            "agendamentos": df_agendamentos,
+            "presenca": df_presenca,
+            "pendentes": df_pendentes,
+        }.items()
+        if base is not None
+    }
+
+    # 3. Modo incremental: publica a base anterior com o delta aplicado;
+    #    sem alterações, o Parquet publicado é reaproveitado no novo snapshot
+    deltas_calculados = {}
+    if incremental:
+        for nome in CHAVES_DELTA:
+            if nome not in a_publicar:
+                continue
+            delta, atualizada = calcular_incremental(nome, a_publicar[nome], destino)
+            deltas_calculados[nome] = delta
+            if atualizada is not None:
+                a_publicar[nome] = atualizada
+            elif not (particionar and not diretorio_dataset(resolver_arquivo(destino / ARQUIVOS_SAIDA[nome])).exists()):
+                del a_publicar[nome]
+
+    # 4. Tabela de aplicações (agendamentos × presença por turma e dia)
+    aplicacoes = montar_aplicacoes(a_publicar, destino)
+    if aplicacoes is not None:
+        a_publicar["aplicacoes_presenca"] = aplicacoes
+
+    # 5. Cubo de contagens do Dashboard Estrutural
+    cubo = montar_cubo_estrutural(a_publicar, destino)
+    if cubo is not None:
+        a_publicar["cubo_estrutural"] = cubo
+
+    bases = publicar_bases(a_publicar, destino, particionar, snapshots_mantidos)
+    deltas: dict[str, ResumoDelta] = {}
+    for nome, delta in deltas_calculados.items():
+        deltas[nome] = delta.resumo(gravar_delta(delta, destino / "deltas" / nome))
+        bases.setdefault(nome, resolver_arquivo(destino / ARQUIVOS_SAIDA[nome]))
+    progresso(ETAPA_PUBLICACAO, ETAPA_CONCLUIDA, time.perf_counter() - inicio_publicacao)
+    return ResultadoPipeline(bases, etapas, time.perf_counter() - inicio, deltas, versao_publicada(destino))
+
+
+def contar_linhas(base: pd.DataFrame | Path) -> int:
+    if isinstance(base, Path):
+        return pq.ParquetFile(base).metadata.num_rows
+    return len(base)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bases", nargs="+", choices=list(ORIGENS), help="bases reprocessadas (padrão: todas)")
+    parser.add_argument("--sem-firestore", action="store_true", help="não sincroniza com o Firestore")
+    parser.add_argument("--paralelo", action="store_true")
+    parser.add_argument("--streaming", action="store_true")
+    parser.add_argument("--incremental", action="store_true")
+    parser.add_argument("--particionar", action="store_true")
+    parser.add_argument("--snapshots", type=int, default=SNAPSHOTS_MANTIDOS, help="snapshots mantidos")
+    parser.add_argument("--destino", type=Path, default=DATA_PROCESSADO)
+    parser.add_argument(
+        "--armazenamento",
+        choices=[MODO_DOCUMENTOS, MODO_BLOCOS],
+        default=MODO_DOCUMENTOS,
+        help="um documento por linha ou a base em blocos de Parquet",
+    )
+    parser.add_argument(
+        "--comparar-streaming",
+        action="store_true",
+        help="só gera agendamentos e presença com e sem streaming, fora do cache, e compara os Parquets",
+    )
+    parser.add_argument(
+        "--comparar-armazenamento",
+        action="store_true",
+        help="grava e lê cada base nos dois modos, em coleções temporárias, e compara",
+    )
+    args = parser.parse_args()
+
+    if args.comparar_streaming:
+        base_paths = localizar_origens(["estrutural", "agendamentos", "presenca"])
+        faltantes = [nome for nome, path in base_paths.items() if path is None]
+        if faltantes:
+            raise SystemExit("[ERRO LOADER] Nenhum arquivo encontrado para: " + ", ".join(faltantes) + ".")
+        try:
+            comparacao = comparar_streaming(base_paths)
+        except ValueError as exc:
+            raise SystemExit(str(exc))
+        print(comparacao.to_string(index=False))
+        return
+
+    tempos: dict[str, float] = {}
+
+    def progresso(etapa: str, estado: str, segundos: float | None) -> None:
+        if segundos is not None:
+            tempos[etapa] = segundos
+        log(f"{etapa}: {estado}" + (f" ({segundos:.2f} s)" if segundos is not None else ""))
+
+    try:
+        resultado = executar_pipeline(
+            streaming=args.streaming,
+            paralelo=args.paralelo,
+            destino=args.destino,
+            incremental=args.incremental,
+            particionar=args.particionar,
+            snapshots_mantidos=args.snapshots,
+            progresso=progresso,
+            selecao=args.bases,
+        )
+    except (FileNotFoundError, ErroEtapa, ValueError) as exc:
+        raise SystemExit(f"[ERRO LOADER] {exc}")
+
+    erro_firestore = None
+    if not args.sem_firestore:
+        try:
+            sincronizar_firestore(resultado.bases, resultado.deltas, progresso, args.armazenamento)
+        except Exception as exc:
+            erro_firestore = exc
+
+    linhas = [
+        {
+            "etapa": etapa.etapa,
+            "arquivo": etapa.arquivo,
+            "cache": "sim" if etapa.cache_hit else "nao",
+            "linhas": contar_linhas(resultado.bases[etapa.etapa]) if etapa.etapa in resultado.bases else "-",
+            "segundos": round(etapa.segundos, 2),
+        }
+        for etapa in resultado.etapas
+    ]
+    linhas.append({"etapa": ETAPA_PUBLICACAO, "arquivo": resultado.versao, "segundos": round(tempos[ETAPA_PUBLICACAO], 2)})
+    for nome, collection, _ in COLECOES_FIRESTORE:
+        if collection in tempos:
+            linhas.append(
+                {
+                    "etapa": collection,
+                    "linhas": contar_linhas(resultado.bases[nome]),
+                    "segundos": round(tempos[collection], 2),
+                }
+            )
+    total = resultado.segundos + sum(tempos.get(collection, 0.0) for _, collection, _ in COLECOES_FIRESTORE)
+    linhas.append({"etapa": "total", "segundos": round(total, 2)})
+    colunas = ["etapa", "arquivo", "cache", "linhas", "segundos"]
+    print(pd.DataFrame([[linha.get(c, "") for c in colunas] for linha in linhas], columns=colunas).to_string(index=False))
+
+    if args.comparar_armazenamento:
+        comparacoes = []
+        for nome, collection, _ in COLECOES_FIRESTORE:
+            if nome not in resultado.bases:
+                continue
+            base = resultado.bases[nome]
+            df = pd.read_parquet(base) if isinstance(base, Path) else base.copy()
+            comparacoes.append(compare_storage_modes(normalize_columns(df), collection).assign(colecao=collection))
+        if comparacoes and not all(c.empty for c in comparacoes):
+            comparacao = pd.concat(comparacoes, ignore_index=True)
+            print()
+            print(comparacao.set_index(["colecao", "modo"]).round(3).to_string())
+        else:
+            log("Comparação de armazenamento ignorada: Firestore não configurado.")
+
+    if erro_firestore is not None:
+        raise SystemExit(f"Bases publicadas, mas não foi possível sincronizar com o Firestore: {erro_firestore}")
+
+
+if __name__ == "__main__":
+    main()
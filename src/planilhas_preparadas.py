@@ -0,0 +1,187 @@
+"""
+Planilhas de origem pré-convertidas para Parquet.
+
+Ao receber um upload, a planilha é convertida em segundo plano para um Parquet
+ao lado dela (Alocacoes-<data>Z.xlsx -> Alocacoes-<data>Z.parquet; ver
+src.uploads). O loader lê as planilhas por ler_planilha/iter_planilha_blocos,
+que usam o Parquet quando ele corresponde ao .xlsx atual (hash gravado nos
+metadados do arquivo) e caem para a leitura do Excel caso contrário.
+
+O Parquet guarda a planilha como pd.read_excel a devolve. Colunas com valores
+de tipos misturados (ex.: códigos numéricos e textuais) são gravadas como
+texto, que é como as transformações do loader as tratam.
+
+A conversão roda no processo do servidor do Streamlit, então a planilha é
+lida em blocos (iter_excel_blocos) e gravada bloco a bloco, com memória
+limitada mesmo para Alocacoes e Presença. O schema do arquivo é o do
+primeiro bloco; se um bloco posterior não couber nele (ex.: coluna numérica
+no início e textual depois), a conversão recomeça com essa coluna como texto
+(ou como float64, se os dois tipos forem numéricos).
+"""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Collection, Iterator
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.excel_stream import LINHAS_POR_BLOCO, iter_excel_blocos, ler_cabecalho
+from src.ingestao_cache import hash_arquivo
+from src.utils import log
+
+# incrementar ao alterar a conversão invalida os Parquets já preparados
+VERSAO_PREPARO = 2
+CHAVE_ORIGEM = b"siave.origem_sha256"
+CHAVE_VERSAO = b"siave.versao_preparo"
+
+
+def arquivo_preparado(planilha: Path) -> Path:
+    return planilha.with_suffix(".parquet")
+
+
+def tabela_arrow(df: pd.DataFrame, texto: Collection[str] = ()) -> pa.Table:
+    """
+    Tabela Arrow de `df`; colunas object com tipos misturados, e as colunas
+    de `texto`, viram texto.
+    """
+    df = df.rename(columns=str)
+    conversoes = {coluna: df[coluna].astype("string") for coluna in texto if coluna in df.columns}
+    for coluna in df.columns[df.dtypes == object]:
+        if coluna in conversoes:
+            continue
+        try:
+            pa.array(df[coluna], from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            conversoes[coluna] = df[coluna].astype("string")
+    if conversoes:
+        df = df.assign(**conversoes)
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+class _ColunasIncompativeis(Exception):
+    """Colunas de um bloco que não cabem no schema do arquivo, com o tipo que comporta os dois."""
+
+    def __init__(self, tipos: dict[str, pa.DataType]):
+        super().__init__(", ".join(sorted(tipos)))
+        self.tipos = tipos
+
+
+def _tipo_comum(a: pa.DataType, b: pa.DataType) -> pa.DataType:
+    # inteiros e decimais viram float64 (como em pd.read_excel); o resto, texto
+    numericos = all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in (a, b))
+    return pa.float64() if numericos else pa.string()
+
+
+def _ajustar_ao_schema(tabela: pa.Table, schema: pa.Schema) -> pa.Table:
+    """`tabela` com os tipos de `schema`; lança _ColunasIncompativeis com as colunas que não convertem."""
+    colunas = []
+    incompativeis = {}
+    for campo in schema:
+        coluna = tabela.column(campo.name)
+        try:
+            colunas.append(coluna.cast(campo.type))
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            incompativeis[campo.name] = _tipo_comum(campo.type, coluna.type)
+    if incompativeis:
+        raise _ColunasIncompativeis(incompativeis)
+    return pa.Table.from_arrays(colunas, schema=schema)
+
+
+def _gravar_em_blocos(
+    planilha: Path, destino: Path, metadados: dict[bytes, bytes], tipos: dict[str, pa.DataType]
+) -> None:
+    texto = {coluna for coluna, tipo in tipos.items() if tipo == pa.string()}
+    writer: pq.ParquetWriter | None = None
+    # depois do primeiro bloco incompatível, os demais só são verificados,
+    # para que a nova conversão já conheça todas as colunas a ajustar
+    incompativeis: dict[str, pa.DataType] = {}
+    try:
+        for bloco in iter_excel_blocos(planilha):
+            tabela = tabela_arrow(bloco, texto)
+            if writer is None:
+                schema = tabela.schema
+                for coluna, tipo in tipos.items():
+                    i = schema.get_field_index(coluna)
+                    schema = schema.set(i, schema.field(i).with_type(tipo))
+                writer = pq.ParquetWriter(destino, schema.with_metadata({**(schema.metadata or {}), **metadados}))
+            try:
+                tabela = _ajustar_ao_schema(tabela, writer.schema)
+            except _ColunasIncompativeis as exc:
+                for coluna, tipo in exc.tipos.items():
+                    incompativeis[coluna] = _tipo_comum(incompativeis.get(coluna, tipo), tipo)
+            if not incompativeis:
+                writer.write_table(tabela)
+        if incompativeis:
+            raise _ColunasIncompativeis(incompativeis)
+        if writer is None:
+            vazia = tabela_arrow(pd.DataFrame(columns=ler_cabecalho(planilha)))
+            pq.write_table(vazia.replace_schema_metadata({**(vazia.schema.metadata or {}), **metadados}), destino)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def preparar_planilha(planilha: Path) -> Path:
+    """Converte `planilha` para o Parquet preparado e devolve o caminho dele."""
+    metadados = {
+        CHAVE_ORIGEM: hash_arquivo(planilha).encode(),
+        CHAVE_VERSAO: str(VERSAO_PREPARO).encode(),
+    }
+    destino = arquivo_preparado(planilha)
+    tmp = destino.with_name(destino.name + ".tmp")
+    # tipos fixados depois de um bloco incompatível com o schema do primeiro
+    tipos: dict[str, pa.DataType] = {}
+    try:
+        while True:
+            try:
+                _gravar_em_blocos(planilha, tmp, metadados, tipos)
+                break
+            except _ColunasIncompativeis as exc:
+                log(f"Planilha {planilha.name}: tipos diferentes entre blocos em {exc}; convertendo novamente.")
+                tipos.update(exc.tipos)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    os.replace(tmp, destino)
+    return destino
+
+
+def planilha_preparada(planilha: Path) -> Path | None:
+    """Parquet preparado de `planilha`, se existir e corresponder ao .xlsx atual."""
+    preparado = arquivo_preparado(planilha)
+    if not preparado.exists():
+        return None
+    try:
+        metadados = pq.read_schema(preparado).metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return None
+    if metadados.get(CHAVE_VERSAO) != str(VERSAO_PREPARO).encode():
+        return None
+    if metadados.get(CHAVE_ORIGEM) != hash_arquivo(planilha).encode():
+        return None
+    return preparado
+
+
+def ler_planilha(planilha: Path) -> pd.DataFrame:
+    """Equivalente a pd.read_excel(planilha), a partir do Parquet preparado quando houver."""
+    preparado = planilha_preparada(planilha)
+    if preparado is None:
+        return pd.read_excel(planilha)
+    log(f"Planilha {planilha.name} lida do Parquet preparado.")
+    return pd.read_parquet(preparado)
+
+
+def iter_planilha_blocos(planilha: Path, linhas_por_bloco: int = LINHAS_POR_BLOCO) -> Iterator[pd.DataFrame]:
+    """Como iter_excel_blocos, a partir do Parquet preparado quando houver."""
+    preparado = planilha_preparada(planilha)
+    if preparado is None:
+        yield from iter_excel_blocos(planilha, linhas_por_bloco)
+        return
+    log(f"Planilha {planilha.name} lida do Parquet preparado.")
+    arquivo = pq.ParquetFile(preparado)
+    for lote in arquivo.iter_batches(batch_size=linhas_por_bloco):
+        yield pa.Table.from_batches([lote], schema=arquivo.schema_arrow).to_pandas()
@@ -0,0 +1,164 @@
+"""
+Snapshots versionados das bases processadas.
+
+Cada execução do loader grava todas as bases em um diretório novo,
+data/processado/snapshots/<versao>/, e só então publica o manifest.json de
+data/processado, que aponta para ele:
+
+    {
+      "versao": "20251124T131636123456",
+      "criado_em": "2025-11-24T13:16:36.123456",
+      "pasta": "snapshots/20251124T131636123456",
+      "arquivos": {
+        "base_agendamentos.parquet": {"linhas": 1200, "bytes": 48213, "sha256": "...", "particionado": true},
+        ...
+      }
+    }
+
+O manifest é substituído com os.replace, então um leitor vê o snapshot
+anterior inteiro ou o novo inteiro, nunca bases de execuções diferentes. Os
+leitores passam o caminho "lógico" da base (ex.: ARQ_BASE_AGENDAMENTOS) por
+resolver_arquivo; sem manifest, o caminho é usado como está. Quem lê mais de
+uma base lê o manifest uma vez (ler_manifesto) e o repassa a resolver_arquivo,
+usando manifesto.versao como chave de cache, para que todas as bases venham do
+mesmo snapshot mesmo que outro seja publicado durante a leitura. Os
+SNAPSHOTS_MANTIDOS mais recentes são preservados para leitores que ainda
+estejam usando uma versão anterior.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import pyarrow.parquet as pq
+
+from src.data_paths import DATA_PROCESSADO
+from src.dataset_particionado import diretorio_dataset
+from src.ingestao_cache import hash_arquivo
+
+ARQUIVO_MANIFESTO = "manifest.json"
+DIR_SNAPSHOTS = "snapshots"
+SNAPSHOTS_MANTIDOS = 5
+
+
+@dataclass
+class Manifesto:
+    versao: str
+    criado_em: str
+    pasta: str
+    arquivos: dict[str, dict[str, Any]] = field(default_factory=dict)
+
+    def caminho(self, raiz: Path, arquivo: str) -> Path:
+        return raiz / self.pasta / arquivo
+
+
+def ler_manifesto(raiz: Path = DATA_PROCESSADO) -> Manifesto | None:
+    caminho = raiz / ARQUIVO_MANIFESTO
+    if not caminho.exists():
+        return None
+    return Manifesto(**json.loads(caminho.read_text(encoding="utf-8")))
+
+
+def versao_publicada(raiz: Path = DATA_PROCESSADO) -> str | None:
+    """Versão do snapshot publicado; usada pelas páginas como chave de cache."""
+    manifesto = ler_manifesto(raiz)
+    return manifesto.versao if manifesto else None
+
+
+def resolver_arquivo(arquivo: Path, manifesto: Manifesto | None = None) -> Path:
+    """
+    Caminho de `arquivo` no snapshot de `manifesto` (se None, no publicado na
+    mesma pasta). Sem manifest (ou se a base não estiver nele), devolve `arquivo`.
+    """
+    manifesto = manifesto or ler_manifesto(arquivo.parent)
+    if manifesto is None or arquivo.name not in manifesto.arquivos:
+        return arquivo
+    return manifesto.caminho(arquivo.parent, arquivo.name)
+
+
+def iniciar_snapshot(raiz: Path) -> tuple[str, Path]:
+    """Cria o diretório temporário de um novo snapshot e devolve (versao, pasta)."""
+    versao = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    pasta = raiz / DIR_SNAPSHOTS / f"{versao}.tmp"
+    pasta.mkdir(parents=True)
+    return versao, pasta
+
+
+def _vincular(origem: str, destino: str) -> None:
+    # snapshots são imutáveis: o mesmo arquivo pode ser compartilhado
+    try:
+        os.link(origem, destino)
+    except OSError:
+        shutil.copy2(origem, destino)
+
+
+def reaproveitar(arquivo: Path, pasta: Path) -> None:
+    """Copia (por hard link, quando possível) uma base publicada e seu layout particionado para `pasta`."""
+    _vincular(str(arquivo), str(pasta / arquivo.name))
+    particionado = diretorio_dataset(arquivo)
+    if particionado.is_dir():
+        shutil.copytree(particionado, diretorio_dataset(pasta / arquivo.name), copy_function=_vincular)
+
+
+def publicar_snapshot(raiz: Path, versao: str, pasta: Path, mantidos: int = SNAPSHOTS_MANTIDOS) -> Manifesto:
+    """
+    Fecha o snapshot gravado em `pasta` (renomeando o diretório temporário),
+    publica o manifest.json e remove os snapshots além dos `mantidos` mais
+    recentes.
+    """
+    final = pasta.with_name(versao)
+    arquivos = {}
+    for arquivo in sorted(pasta.glob("*.parquet")):
+        arquivos[arquivo.name] = {
+            "linhas": pq.ParquetFile(arquivo).metadata.num_rows,
+            "bytes": arquivo.stat().st_size,
+            "sha256": hash_arquivo(arquivo),
+            "particionado": diretorio_dataset(arquivo).is_dir(),
+        }
+    pasta.rename(final)
+
+    manifesto = Manifesto(
+        versao=versao,
+        criado_em=datetime.now().isoformat(timespec="microseconds"),
+        pasta=final.relative_to(raiz).as_posix(),
+        arquivos=arquivos,
+    )
+    tmp = raiz / (ARQUIVO_MANIFESTO + ".tmp")
+    tmp.write_text(json.dumps(asdict(manifesto), indent=2, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, raiz / ARQUIVO_MANIFESTO)
+
+    limpar_snapshots(raiz, max(mantidos, 1))
+    return manifesto
+
+
+def listar_snapshots(raiz: Path) -> list[Path]:
+    """Snapshots publicados, do mais antigo para o mais recente."""
+    pasta = raiz / DIR_SNAPSHOTS
+    if not pasta.exists():
+        return []
+    return sorted(p for p in pasta.iterdir() if p.is_dir() and not p.name.endswith(".tmp"))
+
+
+def limpar_snapshots(raiz: Path, mantidos: int = SNAPSHOTS_MANTIDOS, em_andamento: Path | None = None) -> None:
+    """
+    Remove os snapshots antigos, preservando os `mantidos` mais recentes e o
+    publicado, e os diretórios temporários (*.tmp) deixados por execuções que
+    falharam antes de publicar, exceto `em_andamento` (o que está sendo gravado).
+    """
+    manifesto = ler_manifesto(raiz)
+    atual = manifesto.caminho(raiz, "") if manifesto else None
+    for antigo in listar_snapshots(raiz)[:-mantidos]:
+        if atual is None or antigo.resolve() != atual.resolve():
+            shutil.rmtree(antigo, ignore_errors=True)
+    pasta = raiz / DIR_SNAPSHOTS
+    if not pasta.exists():
+        return
+    for temporario in pasta.glob("*.tmp"):
+        if temporario.is_dir() and (em_andamento is None or temporario.resolve() != em_andamento.resolve()):
+            shutil.rmtree(temporario, ignore_errors=True)
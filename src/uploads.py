@@ -0,0 +1,109 @@
+"""
+Recebimento das planilhas de origem enviadas pelas páginas.
+
+salvar_upload valida o cabeçalho da planilha, grava o .xlsx em data/origem/<base>
+com o nome que o loader procura (<Prefixo>-<data UTC>Z.xlsx, ver ORIGENS) e
+inicia, em uma thread, a conversão para o Parquet preparado
+(src.planilhas_preparadas). O loader executado depois parte desse Parquet em
+vez de ler o Excel novamente.
+"""
+
+from __future__ import annotations
+
+import io
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from src.excel_stream import ler_cabecalho
+from src.pipeline import ORIGENS, ensure_folder, validar_cabecalho
+from src.planilhas_preparadas import arquivo_preparado, planilha_preparada, preparar_planilha
+from src.utils import log
+
+PRONTO = "pronto"
+PREPARANDO = "preparando"
+PENDENTE = "pendente"
+
+_lock = threading.Lock()
+_preparando: dict[Path, threading.Thread] = {}
+_falhas: dict[Path, str] = {}
+
+
+def nome_upload(prefixo: str, agora: datetime | None = None) -> str:
+    agora = agora or datetime.utcnow()
+    return f"{prefixo}-{agora.strftime('%Y-%m-%dT%H_%M_%S.%f')[:23]}Z.xlsx"
+
+
+def salvar_upload(uploaded_file: Any, base: str) -> Path:
+    """
+    Valida e grava a planilha enviada para a `base` (chave de ORIGENS) e
+    inicia a preparação do Parquet. Lança ValueError se o cabeçalho não tiver
+    as colunas obrigatórias; nesse caso nada é gravado.
+    """
+    pasta, prefixo = ORIGENS[base]
+    conteudo = uploaded_file.getvalue()
+    try:
+        cabecalho = ler_cabecalho(io.BytesIO(conteudo))
+    except Exception as exc:
+        raise ValueError(f"Arquivo não é uma planilha .xlsx válida: {exc}") from exc
+    validar_cabecalho(cabecalho, base)
+
+    ensure_folder(pasta)
+    destino = pasta / nome_upload(prefixo)
+    destino.write_bytes(conteudo)
+    preparar_em_segundo_plano(destino)
+    return destino
+
+
+def _preparar(planilha: Path) -> None:
+    try:
+        preparar_planilha(planilha)
+        log(f"Planilha {planilha.name} preparada.")
+    except Exception as exc:
+        # sem o Parquet, o loader lê o .xlsx normalmente
+        log(f"Falha ao preparar {planilha.name}: {exc}")
+        with _lock:
+            _falhas[planilha] = str(exc)
+    finally:
+        with _lock:
+            _preparando.pop(planilha, None)
+
+
+def preparar_em_segundo_plano(planilha: Path) -> None:
+    with _lock:
+        if planilha in _preparando:
+            return
+        _falhas.pop(planilha, None)
+        thread = threading.Thread(target=_preparar, args=(planilha,), name=f"preparo-{planilha.name}", daemon=True)
+        _preparando[planilha] = thread
+    thread.start()
+
+
+def estado_preparo(planilha: Path) -> str:
+    """PRONTO, PREPARANDO ou PENDENTE (sem Parquet válido: o loader lerá o .xlsx)."""
+    with _lock:
+        if planilha in _preparando:
+            return PREPARANDO
+    return PRONTO if planilha_preparada(planilha) is not None else PENDENTE
+
+
+def falha_preparo(planilha: Path) -> str | None:
+    with _lock:
+        return _falhas.get(planilha)
+
+
+def listar_planilhas(pasta: Path) -> list[Path]:
+    """Planilhas de `pasta`, da mais recente para a mais antiga."""
+    ensure_folder(pasta)
+    return sorted(
+        [f for f in pasta.glob("*.xlsx") if not f.name.startswith("~$")],
+        key=lambda f: f.stat().st_mtime,
+        reverse=True,
+    )
+
+
+def excluir_planilha(planilha: Path) -> None:
+    """Remove a planilha e o Parquet preparado dela."""
+    planilha.unlink(missing_ok=True)
+    arquivo_preparado(planilha).unlink(missing_ok=True)
@@ -0,0 +1,13 @@
+import pytest
+
+from src.firebase_client import set_client
+from src.firestore_falso import ClienteFirestoreFalso
+
+
+@pytest.fixture
+def firestore():
+    """Cliente em memória no lugar do Firestore durante o teste."""
+    cliente = ClienteFirestoreFalso()
+    set_client(cliente)
+    yield cliente
+    set_client(None)
@@ -0,0 +1,46 @@
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from src.firebase_client import (
+    DOC_MANIFESTO,
+    chunks_collection,
+    load_dataframe_chunks,
+    save_dataframe_chunks,
+    save_table_chunks,
+)
+
+COLECAO = "siave_estrutural"
+
+
+def _base(linhas: int = 2000) -> pd.DataFrame:
+    return pd.DataFrame({"coturmacenso": [str(i) for i in range(linhas)], "turma": [f"T{i % 7}" for i in range(linhas)]})
+
+
+def test_blocos_remontam_a_base(firestore):
+    base = _base()
+    manifesto = save_table_chunks(COLECAO, pa.Table.from_pandas(base, preserve_index=False), chunk_size=1024)
+    assert len(manifesto["blocos"]) > 1
+    pd.testing.assert_frame_equal(load_dataframe_chunks(COLECAO), base, check_dtype=False)
+    assert list(load_dataframe_chunks(COLECAO, ["turma"]).columns) == ["turma"]
+
+
+def test_nova_versao_remove_os_blocos_anteriores(firestore):
+    save_dataframe_chunks(COLECAO, _base())
+    manifesto = save_dataframe_chunks(COLECAO, _base(10))
+    ids = set(firestore.collection(chunks_collection(COLECAO)).documentos)
+    assert ids == {*manifesto["blocos"], DOC_MANIFESTO}
+    assert len(load_dataframe_chunks(COLECAO)) == 10
+
+
+def test_bloco_corrompido_falha_no_sha256(firestore):
+    manifesto = save_table_chunks(COLECAO, pa.Table.from_pandas(_base(), preserve_index=False), chunk_size=1024)
+    blocos = firestore.collection(chunks_collection(COLECAO)).documentos
+    dados = blocos[manifesto["blocos"][0]]["dados"]
+    blocos[manifesto["blocos"][0]] = {**blocos[manifesto["blocos"][0]], "dados": bytes([dados[0] ^ 1]) + dados[1:]}
+    with pytest.raises(ValueError, match="sha256"):
+        load_dataframe_chunks(COLECAO)
+
+
+def test_sem_manifesto_devolve_none(firestore):
+    assert load_dataframe_chunks(COLECAO) is None
@@ -0,0 +1,47 @@
+import pandas as pd
+
+from src.cubo_estrutural import CuboEstrutural, montar_cubo
+
+# duas linhas por turma (a base estrutural repete turmas)
+BASE = pd.DataFrame(
+    [
+        ("GRE 1", "P1", "Recife", "Escola A", "1", "11", "5º ano", "manhã"),
+        ("GRE 1", "P1", "Recife", "Escola A", "1", "11", "5º ano", "manhã"),
+        ("GRE 1", "P1", "Recife", "Escola A", "1", "12", "9º ano", "tarde"),
+        ("GRE 1", "P2", "Olinda", "Escola B", "2", "21", "5º ano", "manhã"),
+        ("GRE 2", "P3", "Caruaru", "Escola C", "3", "31", "9º ano", "tarde"),
+        ("GRE 2", "P3", "Caruaru", "Escola C", "3", "32", "9º ano", "tarde"),
+        ("GRE 2", "P3", "Caruaru", "Escola C", "3", "32", "9º ano", "tarde"),
+    ],
+    columns=["GRE", "polo", "municipio", "escola", "coEscolaCenso", "coTurmaCenso", "serie", "turno"],
+)
+
+
+def _cubo() -> CuboEstrutural:
+    return CuboEstrutural(montar_cubo(BASE))
+
+
+def test_total_conta_valores_distintos():
+    total = _cubo().total()
+    assert (total["gres"], total["polos"], total["municipios"], total["escolas"], total["turmas"]) == (2, 3, 3, 3, 5)
+
+
+def test_fatiar_confere_com_groupby_na_base():
+    por_polo = _cubo().fatiar({"GRE": "GRE 1"}, ["polo"]).set_index("polo")
+    esperado = BASE[BASE["GRE"] == "GRE 1"].groupby("polo")["coTurmaCenso"].nunique()
+    assert por_polo["turmas"].to_dict() == esperado.to_dict()
+    assert por_polo["escolas"].to_dict() == {"P1": 1, "P2": 1}
+
+
+def test_fatiar_por_serie_e_turno():
+    detalhe = _cubo().fatiar({"GRE": "GRE 2", "polo": None}, ["serie", "turno"])
+    assert detalhe[["serie", "turno", "turmas"]].values.tolist() == [["9º ano", "tarde", 2]]
+
+
+def test_filtro_sem_linhas_devolve_tabela_vazia():
+    assert _cubo().fatiar({"GRE": "GRE 9"}, ["polo"]).empty
+
+
+def test_top_escolas_ordena_por_turmas():
+    top = _cubo().top_escolas({"GRE": None}, n=2)
+    assert top["escola"].tolist() == ["Escola A", "Escola C"]
@@ -0,0 +1,43 @@
+import pandas as pd
+
+from src.delta_ingestao import aplicar_delta, calcular_delta, chaves_registro
+
+CHAVE = ("aplicacaoid", ("coturmacenso", "diaaplicacao"))
+
+
+def _base(linhas: list[tuple]) -> pd.DataFrame:
+    return pd.DataFrame(linhas, columns=["aplicacaoid", "coturmacenso", "diaaplicacao", "status"])
+
+
+def test_calcular_delta_classifica_as_linhas():
+    anterior = _base([("1", "10", "1", "a"), ("2", "20", "1", "a"), ("3", "30", "1", "a")])
+    novo = _base([("1", "10", "1", "a"), ("2", "20", "1", "b"), ("4", "40", "1", "a")])
+    delta = calcular_delta(anterior, novo, *CHAVE)
+    assert list(delta.inseridos["aplicacaoid"]) == ["4"]
+    assert list(delta.atualizados["aplicacaoid"]) == ["2"]
+    assert list(delta.removidos["aplicacaoid"]) == ["3"]
+    assert delta.inalterados == 1
+    resumo = delta.resumo()
+    assert (resumo.inseridos, resumo.atualizados, resumo.removidos, resumo.vazio) == (1, 1, 1, False)
+
+
+def test_aplicar_delta_reproduz_a_base_nova():
+    anterior = _base([("1", "10", "1", "a"), ("2", "20", "1", "a"), ("3", "30", "1", "a")])
+    novo = _base([("1", "10", "1", "a"), ("2", "20", "1", "b"), ("4", "40", "1", "a")])
+    resultado = aplicar_delta(anterior, calcular_delta(anterior, novo, *CHAVE), *CHAVE)
+    pd.testing.assert_frame_equal(resultado, novo)
+
+
+def test_sem_id_usa_as_colunas_alternativas():
+    anterior = _base([(None, "10", "1", "a"), (None, "10", "2", "a")])
+    novo = _base([(None, "10", "1", "a"), (None, "10", "2", "b")])
+    delta = calcular_delta(anterior, novo, *CHAVE)
+    assert list(delta.atualizados["diaaplicacao"]) == ["2"]
+    assert list(chaves_registro(novo, *CHAVE)) == ["alt:10|1#0", "alt:10|2#0"]
+
+
+def test_dtypes_diferentes_nao_geram_atualizacoes():
+    # o Parquet publicado pode voltar com outros dtypes para os mesmos valores
+    anterior = pd.DataFrame({"aplicacaoid": ["1", "2"], "qtd": [1, 2]})
+    novo = pd.DataFrame({"aplicacaoid": ["1", "2"], "qtd": [1.0, 2.0]})
+    assert calcular_delta(anterior, novo, "aplicacaoid", ()).vazio
@@ -0,0 +1,55 @@
+from src.disjuntor import ABERTO, FECHADO, MEIO_ABERTO, Disjuntor
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self) -> float:
+        return self.agora
+
+
+def _disjuntor(relogio: Relogio) -> Disjuntor:
+    return Disjuntor("teste", limite=2, espera=10.0, relogio=relogio)
+
+
+def test_abre_depois_do_limite_de_falhas():
+    disjuntor = _disjuntor(Relogio())
+    disjuntor.registrar_falha()
+    assert disjuntor.estado == FECHADO and disjuntor.permitir()
+    disjuntor.registrar_falha()
+    assert disjuntor.estado == ABERTO and not disjuntor.permitir()
+
+
+def test_sucesso_zera_as_falhas():
+    disjuntor = _disjuntor(Relogio())
+    disjuntor.registrar_falha()
+    disjuntor.registrar_sucesso()
+    disjuntor.registrar_falha()
+    assert disjuntor.estado == FECHADO
+
+
+def test_meio_aberto_libera_uma_chamada_de_teste():
+    relogio = Relogio()
+    disjuntor = _disjuntor(relogio)
+    disjuntor.registrar_falha()
+    disjuntor.registrar_falha()
+    relogio.agora = 10.0
+    assert disjuntor.estado == MEIO_ABERTO
+    assert disjuntor.permitir()
+    assert not disjuntor.permitir()
+    disjuntor.registrar_sucesso()
+    assert disjuntor.estado == FECHADO and disjuntor.permitir()
+
+
+def test_falha_no_teste_reabre():
+    relogio = Relogio()
+    disjuntor = _disjuntor(relogio)
+    disjuntor.registrar_falha()
+    disjuntor.registrar_falha()
+    relogio.agora = 10.0
+    assert disjuntor.permitir()
+    disjuntor.registrar_falha()
+    assert disjuntor.estado == ABERTO
+    relogio.agora = 19.0
+    assert not disjuntor.permitir()
@@ -0,0 +1,56 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src import firestore_lotes
+from src.firebase_client import FirestoreWriteError, write_documents
+from src.firestore_falso import ClienteFirestoreFalso
+from src.firestore_lotes import ESPERA_INICIAL, TENTATIVAS, escrever_documentos
+
+
+@pytest.fixture
+def sem_espera(monkeypatch):
+    """Backoff de src.firestore_lotes sem dormir; devolve as esperas pedidas."""
+    esperas = []
+    monkeypatch.setattr(firestore_lotes, "time", SimpleNamespace(sleep=esperas.append, perf_counter=time.perf_counter))
+    return esperas
+
+
+def _operacoes(n: int):
+    return [(f"doc{i}", {"valor": i}) for i in range(n)]
+
+
+def test_lotes_respeitam_o_limite_de_documentos():
+    cliente = ClienteFirestoreFalso()
+    relatorio = escrever_documentos(cliente, "c", _operacoes(1200), workers=4)
+    assert relatorio.documentos == 1200
+    assert relatorio.lotes == 3
+    assert not relatorio.falhas
+    assert cliente.contagem() == {"c": 1200}
+
+
+def test_falhas_transitorias_sao_repetidas(firestore, sem_espera):
+    firestore.falhas_transitorias = 2
+    relatorio = write_documents("c", _operacoes(10))
+    assert relatorio.repeticoes == 2
+    assert firestore.commits_com_falha == 2
+    assert firestore.contagem() == {"c": 10}
+    # backoff exponencial, com jitter de 50 a 100% da espera
+    assert ESPERA_INICIAL / 2 <= sem_espera[0] <= ESPERA_INICIAL
+    assert ESPERA_INICIAL <= sem_espera[1] <= 2 * ESPERA_INICIAL
+
+
+def test_lote_que_continua_falhando_lanca_erro(firestore, sem_espera):
+    firestore.falhas_transitorias = TENTATIVAS
+    with pytest.raises(FirestoreWriteError) as erro:
+        write_documents("c", _operacoes(10))
+    assert erro.value.relatorio.documentos_com_falha == 10
+    assert firestore.contagem().get("c", 0) == 0
+
+
+def test_erro_permanente_nao_e_repetido(firestore, sem_espera):
+    # "/" não é aceito em IDs de documento (InvalidArgument)
+    with pytest.raises(FirestoreWriteError):
+        write_documents("c", [("a/b", {"valor": 1})])
+    assert sem_espera == []
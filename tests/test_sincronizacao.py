@@ -0,0 +1,85 @@
+from pathlib import Path
+
+import pandas as pd
+
+from src.delta_ingestao import calcular_delta, gravar_delta
+from src.firebase_client import CAMPO_ATUALIZACAO, read_control, write_control
+from src.pipeline import CHAVES_DELTA, sincronizar_base
+
+COLECAO = "siave_agendamentos"
+
+
+def _agendamentos(linhas: dict[str, str]) -> pd.DataFrame:
+    # {aplicacaoid: status}
+    return pd.DataFrame(
+        {
+            "aplicacaoid": list(linhas),
+            "coturmacenso": [f"9{i}" for i in linhas],
+            "diaaplicacao": ["1"] * len(linhas),
+            "status": list(linhas.values()),
+        }
+    )
+
+
+def _delta(anterior: pd.DataFrame, novo: pd.DataFrame, pasta: Path):
+    delta = calcular_delta(anterior, novo, *CHAVES_DELTA["agendamentos"])
+    return delta.resumo(gravar_delta(delta, pasta))
+
+
+def _documentos(firestore) -> dict[str, dict]:
+    # documentos da coleção por aplicacaoid
+    return {dados["aplicacaoid"]: dados for dados in firestore.collection(COLECAO).documentos.values()}
+
+
+def test_sincronizacao_completa_delta_e_remocao(firestore, tmp_path):
+    v1 = _agendamentos({"1": "agendado", "2": "agendado", "3": "agendado"})
+    assert sincronizar_base("agendamentos", v1, COLECAO)
+    docs_v1 = _documentos(firestore)
+    assert len(docs_v1) == 3
+    assert read_control(COLECAO)["documentos"] == 3
+
+    # delta: "2" atualizado, "4" inserido; "1" e "3" não são regravados
+    v2 = _agendamentos({"1": "agendado", "2": "aplicado", "3": "agendado", "4": "agendado"})
+    assert sincronizar_base("agendamentos", v2, COLECAO, _delta(v1, v2, tmp_path))
+    docs_v2 = _documentos(firestore)
+    assert len(docs_v2) == 4
+    assert docs_v2["2"]["status"] == "aplicado"
+    for inalterado in ("1", "3"):
+        assert docs_v2[inalterado][CAMPO_ATUALIZACAO] == docs_v1[inalterado][CAMPO_ATUALIZACAO]
+
+    # delta com remoção: "1" sai da base e da coleção
+    v3 = _agendamentos({"2": "aplicado", "3": "agendado", "4": "agendado"})
+    assert sincronizar_base("agendamentos", v3, COLECAO, _delta(v2, v3, tmp_path))
+    assert sorted(_documentos(firestore)) == ["2", "3", "4"]
+    assert read_control(COLECAO)["documentos"] == 3
+
+    # sem alterações e com a coleção em dia, nada é enviado
+    commits = firestore.commits
+    assert not sincronizar_base("agendamentos", v3, COLECAO, _delta(v3, v3, tmp_path))
+    assert firestore.commits == commits
+
+
+def test_sincronizacao_interrompida_reenvia_a_base_inteira(firestore, tmp_path):
+    v1 = _agendamentos({"1": "agendado", "2": "agendado"})
+    sincronizar_base("agendamentos", v1, COLECAO)
+    # falha depois da publicação: a coleção ficou em v1, com o controle em andamento
+    write_control(COLECAO, {"documentos": None, "modo": "documentos"})
+    v2 = _agendamentos({"1": "agendado", "2": "aplicado", "3": "agendado"})
+    v3 = _agendamentos({"1": "aplicado", "2": "aplicado", "3": "agendado"})
+
+    # o delta v2 -> v3 sozinho deixaria "2" e "3" desatualizados
+    assert sincronizar_base("agendamentos", v3, COLECAO, _delta(v2, v3, tmp_path))
+    assert {chave: d["status"] for chave, d in _documentos(firestore).items()} == {
+        "1": "aplicado",
+        "2": "aplicado",
+        "3": "agendado",
+    }
+    assert read_control(COLECAO)["documentos"] == 3
+
+
+def test_delta_vazio_com_contagem_divergente_reenvia(firestore, tmp_path):
+    v1 = _agendamentos({"1": "agendado", "2": "agendado"})
+    sincronizar_base("agendamentos", v1, COLECAO)
+    write_control(COLECAO, {"documentos": 5, "modo": "documentos"})
+    assert sincronizar_base("agendamentos", v1, COLECAO, _delta(v1, v1, tmp_path))
+    assert read_control(COLECAO)["documentos"] == 2